@@ -0,0 +1,103 @@
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional: segments are gzip-compressed without it
+    zstandard = None
+
+# "zstd" (needs the zstandard package) or "gzip"; existing segments stay
+# readable whichever is chosen, as the codec is part of the file name
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "zstd" if zstandard else "gzip").lower()
+ARCHIVE_ZSTD_LEVEL = 10
+ARCHIVE_GZIP_LEVEL = 9
+
+EXTENSIONS = {"zstd": ".ndjson.zst", "gzip": ".ndjson.gz"}
+
+# One archived session: (session row, summary row or None, message rows).
+# Message rows are (id, user_message, bot_response, timestamp, prompt_version).
+ArchivedSession = Tuple[Dict, Optional[Dict], List[tuple]]
+
+
+class SegmentArchive:
+    """Cold storage for inactive sessions: compressed NDJSON segment files.
+
+    Each session is written as its own compressed frame (a header line with
+    the session and its summary, then one line per message row), so one
+    session is read back with a seek and a small decompress, while the
+    frames of a segment still concatenate into a valid .gz / .zst file that
+    zcat or zstdcat can dump. The caller keeps the index of where each
+    session's frame is.
+    """
+
+    def __init__(self, directory: str, codec: str = ARCHIVE_COMPRESSION):
+        if codec == "zstd" and zstandard is None:
+            raise RuntimeError("ARCHIVE_COMPRESSION is zstd but zstandard is not installed (pip install zstandard)")
+        if codec not in EXTENSIONS:
+            raise ValueError(f"Unknown ARCHIVE_COMPRESSION {codec!r} (zstd or gzip)")
+        self.directory = directory
+        self.codec = codec
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL).compress(data)
+        return gzip.compress(data, compresslevel=ARCHIVE_GZIP_LEVEL, mtime=0)
+
+    @staticmethod
+    def _decompress(segment: str, frame: bytes) -> bytes:
+        if segment.endswith(EXTENSIONS["zstd"]):
+            if zstandard is None:
+                raise RuntimeError(f"Archive segment {segment} is zstd-compressed but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(frame)
+        return gzip.decompress(frame)
+
+    def path(self, segment: str) -> str:
+        return os.path.join(self.directory, segment)
+
+    def write_segment(self, sessions: Sequence[ArchivedSession]) -> Tuple[str, List[Tuple[int, int]], int]:
+        """Write sessions to a new segment file.
+
+        Returns the segment name, the (offset, length) of each session's
+        frame in order, and the uncompressed size. The file is complete and
+        synced before it appears under its name.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        segment = f"{stamp}-{uuid.uuid4().hex[:8]}{EXTENSIONS[self.codec]}"
+        frames = []
+        offset = raw_bytes = 0
+        tmp_path = self.path(segment) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for session, summary, rows in sessions:
+                lines = [json.dumps({"session": session, "summary": summary})]
+                lines.extend(json.dumps(list(row)) for row in rows)
+                data = ("\n".join(lines) + "\n").encode("utf-8")
+                frame = self._compress(data)
+                f.write(frame)
+                frames.append((offset, len(frame)))
+                offset += len(frame)
+                raw_bytes += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path(segment))
+        return segment, frames, raw_bytes
+
+    def read(self, segment: str, offset: int, length: int) -> ArchivedSession:
+        """Read one session's frame back"""
+        with open(self.path(segment), "rb") as f:
+            f.seek(offset)
+            frame = f.read(length)
+        lines = self._decompress(segment, frame).decode("utf-8").splitlines()
+        header = json.loads(lines[0])
+        return header["session"], header["summary"], [tuple(json.loads(line)) for line in lines[1:]]
+
+    def remove(self, segment: str):
+        """Delete a segment no session is indexed in any more"""
+        try:
+            os.remove(self.path(segment))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,303 @@
+import gzip
+import hashlib
+import io
+import logging
+import mimetypes
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import config
+
+# Resized image variants need Pillow and .br copies need brotli (both in
+# requirements.txt); without them build() warns and serves full-size images
+# and gzip only
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Hashed URLs never change content; everything else is revalidated with its ETag
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+TEXT_EXTENSIONS = (".html", ".css", ".js", ".mjs", ".svg", ".json", ".txt", ".xml")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+# Smaller files aren't worth compressing
+COMPRESS_MIN_BYTES = 512
+
+# <img> tags pointing at a file in /static
+IMG_TAG = re.compile(r'<img\b[^>]*\bsrc="/static/([^"?#]+)"[^>]*>')
+STATIC_URL = re.compile(r'(["\'(])/static/([^"\'?#)]+)')
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def image_formats() -> List[str]:
+    """Formats to produce resized variants in, best first; the PNG/JPEG fallback comes last"""
+    if Image is None:
+        return []
+    return [fmt for fmt in ("avif", "webp") if features.check(fmt)]
+
+
+@dataclass
+class Asset:
+    body: bytes
+    content_type: str
+    cache_control: str
+    etag: str
+    # Precompressed bodies by content-coding ("br", "gzip")
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+
+class AssetPipeline:
+    """Optimized, cacheable copies of the files in static/.
+
+    build() writes content-hashed copies to ASSET_BUILD_DIR, with gzip and
+    brotli versions of text files and resized AVIF/WebP/PNG variants of
+    images, and rewrites the HTML pages to reference them. Files already in
+    the build directory are reused, so only changed sources are processed
+    again. Everything is then served from memory.
+    """
+
+    def __init__(self, source_dir: str = "static", build_dir: str = config.ASSET_BUILD_DIR,
+                 widths: List[int] = config.ASSET_IMAGE_WIDTHS):
+        self.source_dir = source_dir
+        self.build_dir = build_dir
+        self.widths = sorted(widths)
+        self.assets: Dict[str, Asset] = {}  # URL path -> asset
+        self.urls: Dict[str, str] = {}  # source file name -> hashed URL
+        self.variants: Dict[str, Dict[str, List[Tuple[int, str]]]] = {}  # image -> format -> [(width, URL)]
+
+    def build(self, pages: Dict[str, str]) -> "AssetPipeline":
+        """Process every file in source_dir; `pages` maps extra URL paths (e.g. "/") to HTML file names"""
+        start = time.perf_counter()
+        if Image is None:
+            logger.warning("Pillow is not installed: images are served at full size, without resized variants "
+                           "(pip install -r requirements.txt)")
+        elif not image_formats():
+            logger.warning("Pillow has no AVIF or WebP support: resized image variants are PNG/JPEG only")
+        if brotli is None:
+            logger.warning("brotli is not installed: text assets are precompressed with gzip only "
+                           "(pip install -r requirements.txt)")
+        os.makedirs(self.build_dir, exist_ok=True)
+        names = sorted(
+            name for name in os.listdir(self.source_dir)
+            if not name.startswith(".") and os.path.isfile(os.path.join(self.source_dir, name))
+        )
+        try:
+            # HTML last, so it can reference the hashed names of everything else
+            for name in sorted(names, key=lambda name: name.endswith(".html")):
+                with open(os.path.join(self.source_dir, name), "rb") as f:
+                    data = f.read()
+                if name.endswith(".html"):
+                    data = self.rewrite_html(data.decode()).encode()
+                self._add(name, data)
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    self._add_image_variants(name, data)
+            for path, name in pages.items():
+                self.assets[path] = self.assets[f"/static/{name}"]
+        except Exception:
+            # Serve nothing rather than a half-built set (the app falls back to plain files)
+            self.assets.clear()
+            raise
+        logger.info(
+            f"Built {len(self.assets)} static assets in {time.perf_counter() - start:.2f}s "
+            f"(image formats: {', '.join(image_formats()) or 'none, Pillow not installed'}, "
+            f"brotli: {'yes' if brotli else 'no'})"
+        )
+        return self
+
+    def _write(self, file_name: str, produce: Callable[[], bytes]) -> bytes:
+        """Contents of a build file, produced and written only if it doesn't exist yet"""
+        path = os.path.join(self.build_dir, file_name)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+        data = produce()
+        # Write then rename, so a concurrently starting worker never reads a partial file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return data
+
+    def _add(self, name: str, data: bytes):
+        """Register a source file under its hashed URL (immutable) and its own name (revalidated)"""
+        digest = content_hash(data)
+        stem, ext = os.path.splitext(name)
+        hashed_name = f"{stem}.{digest}{ext}"
+        self._write(hashed_name, lambda: data)
+
+        encoded = {}
+        if name.lower().endswith(TEXT_EXTENSIONS) and len(data) >= COMPRESS_MIN_BYTES:
+            encoded["gzip"] = self._write(f"{hashed_name}.gz", lambda: gzip.compress(data, 9, mtime=0))
+            if brotli is not None:
+                encoded["br"] = self._write(f"{hashed_name}.br", lambda: brotli.compress(data, quality=11))
+        encoded = {coding: body for coding, body in encoded.items() if len(body) < len(data)}
+
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "image/svg+xml"):
+            content_type += "; charset=utf-8"
+        self.urls[name] = f"/static/{hashed_name}"
+        self.assets[f"/static/{hashed_name}"] = Asset(data, content_type, IMMUTABLE, digest, encoded)
+        self.assets[f"/static/{name}"] = Asset(data, content_type, REVALIDATE, digest, encoded)
+
+    def _add_image_variants(self, name: str, data: bytes):
+        formats = image_formats()
+        if not formats:
+            return
+        digest = content_hash(data)
+        stem, ext = os.path.splitext(name)
+        fallback = "png" if ext.lower() == ".png" else "jpeg"
+        with Image.open(os.path.join(self.source_dir, name)) as original:
+            original_width, original_height = original.size
+            widths = [width for width in self.widths if width < original_width]
+
+            variants = {}
+            for fmt in formats + [fallback]:
+                variants[fmt] = []
+                for width in widths:
+                    file_name = f"{stem}.{width}w.{digest}.{'jpg' if fmt == 'jpeg' else fmt}"
+                    body = self._write(file_name, lambda: self._resize(original, width, fmt))
+                    url = f"/static/{file_name}"
+                    self.assets[url] = Asset(body, f"image/{fmt}", IMMUTABLE, content_hash(body))
+                    variants[fmt].append((width, url))
+        self.variants[name] = variants
+
+    @staticmethod
+    def _resize(image, width: int, fmt: str) -> bytes:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+        if fmt == "jpeg" and resized.mode != "RGB":
+            resized = resized.convert("RGB")
+        buffer = io.BytesIO()
+        options = {"png": {"optimize": True}, "jpeg": {"quality": 85, "optimize": True},
+                   "webp": {"quality": 82, "method": 6}, "avif": {"quality": 60}}[fmt]
+        resized.save(buffer, format=fmt.upper(), **options)
+        return buffer.getvalue()
+
+    def rewrite_html(self, html: str) -> str:
+        """Point /static references at hashed URLs and serve images as <picture> with resized variants"""
+        def picture(match: "re.Match") -> str:
+            name, tag = match.group(1), match.group(0)
+            variants = self.variants.get(name)
+            if not variants:
+                return tag
+            # The <img> width attribute is the display size the browser picks a variant for
+            width = re.search(r'\bwidth="(\d+)"', tag)
+            sizes = f' sizes="{width.group(1)}px"' if width else ""
+            formats = list(variants)
+            sources = "".join(
+                f'<source type="image/{fmt}" srcset="{", ".join(f"{url} {w}w" for w, url in variants[fmt])}"{sizes}>'
+                for fmt in formats[:-1]
+            )
+            # Without <source> support, the smallest fallback that covers 2x screens
+            fallback = variants[formats[-1]]
+            target = int(width.group(1)) * 2 if width else fallback[-1][0]
+            src = next((url for w, url in fallback if w >= target), fallback[-1][1])
+            img = tag.replace(f'src="/static/{name}"', f'src="{src}" srcset="{", ".join(f"{url} {w}w" for w, url in fallback)}"{sizes}')
+            return f"<picture>{sources}{img}</picture>"
+
+        html = IMG_TAG.sub(picture, html)
+        return STATIC_URL.sub(lambda m: m.group(1) + self.urls.get(m.group(2), f"/static/{m.group(2)}"), html)
+
+    def respond(self, path: str, request_headers: Dict[str, str]) -> Optional[Tuple[int, List[Tuple[str, str]], bytes]]:
+        """(status, headers, body) for a GET of `path`, or None if it isn't an asset"""
+        asset = self.assets.get(path)
+        if asset is None:
+            return None
+
+        coding = negotiate_encoding(request_headers.get("accept-encoding", ""), asset.encoded)
+        etag = f'"{asset.etag}-{coding}"' if coding else f'"{asset.etag}"'
+        headers = [("Cache-Control", asset.cache_control), ("ETag", etag)]
+        if asset.encoded:
+            headers.append(("Vary", "Accept-Encoding"))
+
+        if etag_matches(request_headers.get("if-none-match", ""), etag):
+            return 304, headers, b""
+
+        body = asset.encoded[coding] if coding else asset.body
+        headers.append(("Content-Type", asset.content_type))
+        if coding:
+            headers.append(("Content-Encoding", coding))
+        headers.append(("Content-Length", str(len(body))))
+        return 200, headers, body
+
+
+def negotiate_encoding(accept_encoding: str, available: Dict[str, bytes]) -> Optional[str]:
+    """Best precompressed coding the client accepts: brotli, then gzip"""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip())
+    for coding in ("br", "gzip"):
+        if coding in available and (coding in accepted or "*" in accepted):
+            return coding
+    return None
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class StaticAssetMiddleware:
+    """Pure ASGI middleware answering asset GET/HEAD requests from memory.
+
+    Runs outside the HTTP middleware stack, so static hits skip the per-request
+    middleware work; `headers` are added to every response instead, and
+    `on_response(method, route, status, seconds)` is called for metrics.
+    """
+
+    def __init__(self, app, pipeline: AssetPipeline, headers: Dict[str, str],
+                 on_response: Optional[Callable[[str, str, int, float], None]] = None):
+        self.app = app
+        self.pipeline = pipeline
+        self.headers = [(name.encode(), value.encode()) for name, value in headers.items()]
+        self.on_response = on_response
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        request_headers = {name.decode().lower(): value.decode() for name, value in scope["headers"]}
+        result = self.pipeline.respond(scope["path"], request_headers)
+        if result is None:
+            return await self.app(scope, receive, send)
+
+        status, headers, body = result
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(name.lower().encode(), value.encode()) for name, value in headers] + self.headers,
+        })
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+        if self.on_response:
+            path = scope["path"]
+            route = "/static" if path.startswith("/static/") else path
+            self.on_response(scope["method"], route, status, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    # Build step for deploys: populate ASSET_BUILD_DIR so workers start without encoding images
+    logging.basicConfig(level=logging.INFO)
+    pipeline = AssetPipeline().build({})
+    for url in sorted(url for url, asset in pipeline.assets.items() if asset.cache_control == IMMUTABLE):
+        asset = pipeline.assets[url]
+        sizes = ", ".join(f"{coding} {len(body)}" for coding, body in asset.encoded.items())
+        print(f"{url:60} {len(asset.body):>9}{f'  ({sizes})' if sizes else ''}")
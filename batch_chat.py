@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Run a file of questions through POST /chat/batch and save the answers as NDJSON.
+
+Questions come one per line from a .txt file (blank lines and lines
+starting with # are skipped), as JSON lines (a string or an object with
+"message" and optional "id" / "session_id") from a .jsonl file, or as a
+JSON list from a .json file. Every question gets a fresh LLM call unless
+--use-cache lets the server reuse cached answers to similar questions.
+
+    BATCH_TOKEN=... python batch_chat.py questions.txt
+    python batch_chat.py questions.jsonl -o answers.jsonl --no-persist --concurrency 8
+    python batch_chat.py questions.txt --url https://your-app.example.com
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List, Union
+
+import requests
+
+
+def load_questions(path: str) -> List[Union[str, dict]]:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return json.load(f)
+        lines = [line.strip() for line in f]
+    if path.endswith(".jsonl"):
+        return [json.loads(line) for line in lines if line]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions with POST /chat/batch")
+    parser.add_argument("questions", help=".txt (one per line), .jsonl or .json file of questions")
+    parser.add_argument("--url", default="http://localhost:8000", help="the running app")
+    parser.add_argument("--token", default=os.getenv("BATCH_TOKEN"), help="the app's BATCH_TOKEN (default: $BATCH_TOKEN)")
+    parser.add_argument("-o", "--output", help="NDJSON file for the answers (default: stdout)")
+    parser.add_argument("--concurrency", type=int, help="questions answered at once (server caps it)")
+    parser.add_argument("--no-persist", action="store_true", help="don't create sessions or save messages")
+    parser.add_argument("--user-id", help="user the sessions are saved under")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="allow cached and shared answers (default: a fresh LLM call per question)")
+    args = parser.parse_args()
+
+    if not args.token:
+        sys.exit("Set --token or BATCH_TOKEN to the app's batch token")
+
+    questions = load_questions(args.questions)
+    payload = {"questions": questions, "persist": not args.no_persist, "use_cache": args.use_cache}
+    if args.concurrency:
+        payload["concurrency"] = args.concurrency
+    if args.user_id:
+        payload["user_id"] = args.user_id
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    answered = errors = 0
+    summary = None
+    try:
+        with requests.post(f"{args.url.rstrip('/')}/chat/batch", json=payload, stream=True,
+                           headers={"Authorization": f"Bearer {args.token}"}, timeout=(10, None)) as response:
+            if response.status_code != 200:
+                sys.exit(f"Batch failed with {response.status_code}: {response.text}")
+            # NDJSON is UTF-8, but the content type carries no charset
+            response.encoding = "utf-8"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                result = json.loads(line)
+                if "summary" in result:
+                    summary = result["summary"]
+                    continue
+                answered += 1
+                errors += "error" in result
+                output.write(line + "\n")
+                output.flush()
+                print(f"\r{answered}/{len(questions)} answered, {errors} errors", end="", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(file=sys.stderr)
+    if summary is None:
+        sys.exit(f"Batch ended early after {answered} of {len(questions)} answers")
+    print(f"{summary['questions']} questions in {time.perf_counter() - start:.1f}s "
+          f"({summary['errors']} errors, {summary['cached']} cached, concurrency {summary['concurrency']})",
+          file=sys.stderr)
+    if summary["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""
+Offline benchmark and load-test suite; nothing here needs network access or an API key.
+
+    stub_llm_server.py     Groq-compatible fake LLM with configurable latency and token rate
+    load_chat.py           starts the stub and the app, drives concurrent sessions and reports
+                           throughput, p50/p95/p99 latency and per-stage (DB, LLM) time
+    db_methods.py          latency and query plans of every DatabaseManager method on a large database
+    db_writes.py           sustained save_message throughput, with and without write-behind
+    db_cleanup.py          write latency while expired sessions are deleted
+    prompt_size.py         prompt size with the full resume vs retrieved sections
+    storage_roundtrip.py   the same workload on SQLite and PostgreSQL, checking results match
+    cold_start.py          first-chat latency after startup and after idling (connection warm-up, pings)
+    fairness.py            visitor latency while one client floods /chat (rate limits, fair queueing)
+    static_assets.py       embed page weight and repeat-visit cost (caching, compression, image variants)
+    archive.py             database size, backup time and latency before and after archiving old sessions
+
+Each script runs directly (python benchmarks/load_chat.py) or as a module
+(python -m benchmarks.load_chat).
+"""
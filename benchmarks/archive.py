@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Database size, backup time and read latency before and after archiving inactive sessions.
+
+Seeds --sessions sessions of --turns exchanges each, --inactive of them
+last active long ago, times the hot read and write paths and a full
+backup, runs DatabaseManager.archive_old_sessions, and times them again.
+Then reads archived sessions back: history from the segment (first read
+and cached), and a visitor returning to one (restore).
+
+    python benchmarks/archive.py
+    python benchmarks/archive.py --sessions 50000 --turns 20 --inactive 0.9
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.common import percentile
+
+
+def seed(db, sessions: int, turns: int, users: int, inactive: float):
+    rng = random.Random(42)
+    session_ids = [f"session-{i}" for i in range(sessions)]
+    old = set(rng.sample(session_ids, int(sessions * inactive)))
+    with db.connection() as conn:
+        conn.executemany(
+            "INSERT INTO sessions (id, user_id, last_activity, message_count) VALUES (?, ?, ?, ?)",
+            [(session_id, f"user-{i % users}", "2000-01-01 00:00:00" if session_id in old else None, turns)
+             for i, session_id in enumerate(session_ids)],
+        )
+        conn.execute("UPDATE sessions SET last_activity = CURRENT_TIMESTAMP WHERE last_activity IS NULL")
+        conn.executemany(
+            "INSERT INTO messages (session_id, user_message, bot_response) VALUES (?, ?, ?)",
+            ((session_id, f"What did you build at job {t} for {session_id}?",
+              f"At job {t} I built chat assistants and data pipelines in Python, FastAPI and SQLite. " * 3)
+             for session_id in session_ids for t in range(turns)),
+        )
+        conn.execute("ANALYZE")
+    active = [session_id for session_id in session_ids if session_id not in old]
+    return active, sorted(old)
+
+
+def timed(call, repeat: int) -> float:
+    """p50 in microseconds"""
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        call(i)
+        samples.append(time.perf_counter() - start)
+    return percentile(samples, 50) * 1e6
+
+
+def backup_seconds(db_path: str, target: str) -> float:
+    start = time.perf_counter()
+    with sqlite3.connect(db_path) as source, sqlite3.connect(target) as copy:
+        source.backup(copy)
+    elapsed = time.perf_counter() - start
+    os.remove(target)
+    return elapsed
+
+
+def measure(db, active, users: int, repeat: int, tmp: str) -> dict:
+    rng = random.Random(7)
+    live = db.create_session("live")
+
+    def uncached_context(i):
+        db.context_cache.clear()
+        db.get_conversation_context(rng.choice(active), 10)
+
+    db.flush()
+    return {
+        "database MB": os.path.getsize(db.db_path) / 2 ** 20,
+        "backup ms": backup_seconds(db.db_path, os.path.join(tmp, "backup.db")) * 1000,
+        "save_message us": timed(lambda i: db.save_message(live, "question", "answer"), repeat),
+        "get_session_history us": timed(lambda i: db.get_session_history(rng.choice(active)), repeat),
+        "get_conversation_context us": timed(uncached_context, repeat),
+        "get_user_sessions us": timed(lambda i: db.get_user_sessions(f"user-{rng.randrange(users)}"), repeat),
+        "ensure_session us": timed(lambda i: db.ensure_session(rng.choice(active), "x"), repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot database before and after archiving inactive sessions")
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--turns", type=int, default=10, help="exchanges per session")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--inactive", type=float, default=0.9, help="share of sessions last active long ago")
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Importing database opens DATABASE_PATH, so point it at the scratch dir
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "import.db")
+        from database import DatabaseManager
+
+        db = DatabaseManager(os.path.join(tmp, "bench.db"), write_behind=False)
+        start = time.perf_counter()
+        active, inactive = seed(db, args.sessions, args.turns, args.users, args.inactive)
+        print(f"seeded {args.sessions} sessions x {args.turns} exchanges in {time.perf_counter() - start:.1f}s")
+
+        before = measure(db, active, args.users, args.repeat, tmp)
+        # Full vacuum so the file size reflects what is left
+        stats = db.archive_old_sessions(days_old=7, vacuum="full")
+        after = measure(db, active, args.users, args.repeat, tmp)
+
+        print(f"archived {stats['sessions']} sessions / {stats['messages']} exchanges in {stats['seconds']:.1f}s: "
+              f"{stats['raw_bytes'] / 2 ** 20:.1f} MB of NDJSON in {stats['archived_bytes'] / 2 ** 20:.1f} MB "
+              f"({db.archive.codec}, {stats['segments']} segments)\n")
+        print(f"{'':32}{'before':>10}{'after':>10}")
+        for name in before:
+            print(f"{name:32}{before[name]:10.1f}{after[name]:10.1f}")
+
+        rng = random.Random(11)
+        sample = rng.sample(inactive, min(args.repeat, len(inactive)))
+        db.archive_cache.clear()
+        first = timed(lambda i: db.get_session_history(sample[i]), len(sample))
+        # The most recently read sessions are still in the archive cache
+        recent = sample[-min(len(sample), db.archive_cache.max_size):]
+        cached = timed(lambda i: db.get_session_history(recent[i % len(recent)]), len(sample))
+        restore = timed(lambda i: db.ensure_session(sample[i], "x"), len(sample))
+        print(f"\narchived session history, first read   p50 {first:8.1f} us")
+        print(f"archived session history, cached       p50 {cached:8.1f} us")
+        print(f"returning visitor (restore session)    p50 {restore:8.1f} us")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Latency of the first chat after startup and after an idle period.
+
+The stub LLM charges --connect-ms on every new connection (standing in for
+DNS and TLS setup) and closes connections left idle for --idle-timeout
+seconds. Each of --boots app starts sends one chat right away, a few more
+once warm, and then one after each of --idle-rounds idle periods longer
+than the idle timeout. The app pings its upstream connections every
+--ping-seconds (UPSTREAM_PING_SECONDS) while idle.
+
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --connect-ms 150 --idle-timeout 10 --ping-seconds 5
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.common import percentile, running_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="First-chat latency after startup and after idling")
+    parser.add_argument("--boots", type=int, default=3)
+    parser.add_argument("--warm-chats", type=int, default=5)
+    parser.add_argument("--idle-rounds", type=int, default=2)
+    parser.add_argument("--connect-ms", type=float, default=300.0, help="stub cost of a new connection")
+    parser.add_argument("--idle-timeout", type=float, default=4.0, help="stub closes connections idle this long")
+    parser.add_argument("--ping-seconds", type=float, help="UPSTREAM_PING_SECONDS (default: half the idle timeout)")
+    parser.add_argument("--latency", type=float, default=0.1, help="stub LLM time to first token, seconds")
+    args = parser.parse_args()
+
+    ping_seconds = args.ping_seconds if args.ping_seconds is not None else args.idle_timeout / 2
+    env = {"UPSTREAM_PING_SECONDS": str(ping_seconds)}
+    stub_args = ["--connect-ms", str(args.connect_ms), "--idle-timeout", str(args.idle_timeout)]
+    counter = itertools.count()
+    first, warm, after_idle = [], [], []
+
+    def chat(client: httpx.Client) -> float:
+        start = time.perf_counter()
+        client.post("/chat", json={"message": f"What do you work on? ({next(counter)})"}).raise_for_status()
+        return time.perf_counter() - start
+
+    for _ in range(args.boots):
+        with tempfile.TemporaryDirectory() as tmp:
+            with running_app(os.path.join(tmp, "bench.db"), args.latency, env=env, stub_args=stub_args) as url:
+                with httpx.Client(base_url=url, timeout=60) as client:
+                    first.append(chat(client))
+                    warm.extend(chat(client) for _ in range(args.warm_chats))
+                    for _ in range(args.idle_rounds):
+                        time.sleep(args.idle_timeout + 1)
+                        after_idle.append(chat(client))
+
+    print(f"stub: {args.latency * 1000:.0f} ms per completion, {args.connect_ms:.0f} ms per new connection, "
+          f"idle connections closed after {args.idle_timeout:.0f}s; app pings every {ping_seconds:.0f}s")
+    for name, samples in (("first after boot", first), ("warm", warm), ("after idle", after_idle)):
+        print(f"{name:18} p50 {percentile(samples, 50) * 1000:6.0f} ms   max {max(samples) * 1000:6.0f} ms   "
+              f"(n={len(samples)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Helpers shared by the benchmark scripts"""
+
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGE_SAMPLE = re.compile(r'^chat_stage_duration_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$', re.MULTILINE)
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+            time.sleep(0.1)
+
+
+@contextmanager
+def running_app(database_path: str, latency: float = 0.2, tokens_per_second: float = 0.0,
+                reply_tokens: int = 20, env: Optional[Dict[str, str]] = None,
+                stub_args: Sequence[str] = ()) -> Iterator[str]:
+    """Start the stub LLM server and the app on free ports; yields the app's base URL
+
+    `stub_args` are extra stub_llm_server.py options, e.g. fault injection.
+    """
+    stub_port, app_port = free_port(), free_port()
+    stub = subprocess.Popen([
+        sys.executable, os.path.join(REPO_ROOT, "benchmarks", "stub_llm_server.py"),
+        "--port", str(stub_port), "--latency", str(latency),
+        "--tokens-per-second", str(tokens_per_second), "--reply-tokens", str(reply_tokens), *stub_args,
+    ], stdout=subprocess.DEVNULL)
+    app_env = {
+        **os.environ,
+        "GROQ_API_KEY": "stub",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{stub_port}",
+        "DATABASE_PATH": database_path,
+        "CLEANUP_INTERVAL_HOURS": "0",
+        # Load tests come from one address; fairness.py turns the limits back on
+        "RATE_LIMIT_PER_MINUTE": "0",
+        "RATE_LIMIT_IP_PER_MINUTE": "0",
+        **(env or {}),
+    }
+    app = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--port", str(app_port), "--log-level", "warning", "--no-access-log",
+    ], cwd=REPO_ROOT, env=app_env, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(f"http://127.0.0.1:{stub_port}/")
+        wait_until_up(f"http://127.0.0.1:{app_port}/health")
+        yield f"http://127.0.0.1:{app_port}"
+    finally:
+        for process in (app, stub):
+            process.terminate()
+        for process in (app, stub):
+            process.wait(timeout=10)
+
+
+def stage_totals(metrics_text: str) -> Dict[str, Tuple[float, float]]:
+    """(total seconds, count) per chat stage from a /metrics scrape"""
+    totals: Dict[str, list] = {}
+    for kind, stage, value in STAGE_SAMPLE.findall(metrics_text):
+        totals.setdefault(stage, [0.0, 0.0])[kind == "count"] = float(value)
+    return {stage: (total[0], total[1]) for stage, total in totals.items()}
+
+
+def metric_samples(metrics_text: str, name: str) -> Dict[str, float]:
+    """Samples of a metric in a /metrics scrape, keyed by their label string"""
+    return {
+        labels: float(value)
+        for labels, value in re.findall(rf"^{name}(\{{[^}}]*\}})? (\S+)$", metrics_text, re.MULTILINE)
+    }
+
+
+def metric_total(metrics_text: str, name: str, label: str = "") -> float:
+    """Sum of the samples of a metric, optionally only those with `label` (e.g. 'outcome="ok"')"""
+    return sum(value for labels, value in metric_samples(metrics_text, name).items() if label in labels)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Write latency while expired sessions are being cleaned up.
+
+Seeds --expired messages in sessions with an old last_activity, then runs
+cleanup while another thread keeps saving messages to a live session, and
+reports how long those saves waited. "single" is the old one-transaction
+purge, "batched" is DatabaseManager.cleanup_old_sessions.
+
+    python benchmarks/db_cleanup.py --expired 500000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def seed(db, expired: int, sessions: int):
+    session_ids = [f"old-{i}" for i in range(sessions)]
+    with db.connection() as conn:
+        conn.executemany(
+            "INSERT INTO sessions (id, user_id, last_activity) VALUES (?, ?, '2000-01-01 00:00:00')",
+            [(session_id, "user") for session_id in session_ids],
+        )
+        conn.executemany(
+            "INSERT INTO messages (session_id, user_message, bot_response) VALUES (?, ?, ?)",
+            ((session_ids[i % sessions], f"question {i} " * 4, f"answer {i} " * 12) for i in range(expired)),
+        )
+
+
+def single_transaction_cleanup(db, days_old: int):
+    """The previous implementation: unbounded DELETEs in one transaction"""
+    with db.connection() as conn:
+        for table in ("messages", "session_summaries"):
+            conn.execute(
+                f"DELETE FROM {table} WHERE session_id IN "
+                "(SELECT id FROM sessions WHERE last_activity < datetime('now', ?))",
+                (f"-{days_old} days",),
+            )
+        conn.execute("DELETE FROM sessions WHERE last_activity < datetime('now', ?)", (f"-{days_old} days",))
+
+
+def run(mode: str, expired: int, sessions: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        # Importing database opens DATABASE_PATH, so point it at the scratch dir
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "import.db")
+        from database import DatabaseManager
+
+        db = DatabaseManager(os.path.join(tmp, "bench.db"), write_behind=False)
+        seed(db, expired, sessions)
+        live_session = db.create_session("live")
+        size_before = os.path.getsize(db.db_path)
+
+        latencies = []
+        done = threading.Event()
+
+        def writer():
+            while not done.is_set():
+                start = time.perf_counter()
+                db.save_message(live_session, "question", "answer")
+                latencies.append(time.perf_counter() - start)
+                time.sleep(0.001)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        time.sleep(0.05)
+        start = time.perf_counter()
+        if mode == "single":
+            single_transaction_cleanup(db, 30)
+        else:
+            db.cleanup_old_sessions(30)
+        elapsed = time.perf_counter() - start
+        done.set()
+        thread.join()
+        db.close()
+
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        worst = latencies[-1] * 1000
+        size_after = os.path.getsize(db.db_path)
+        print(f"{mode:8} cleanup {elapsed:6.2f}s  saves during cleanup: {len(latencies):6}  "
+              f"p99 {p99:7.1f} ms  max {worst:7.1f} ms  "
+              f"file {size_before / 1e6:.0f} -> {size_after / 1e6:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="save_message latency during cleanup")
+    parser.add_argument("--expired", type=int, default=500_000)
+    parser.add_argument("--sessions", type=int, default=20_000)
+    args = parser.parse_args()
+
+    for mode in ("single", "batched"):
+        run(mode, args.expired, args.sessions)
+
+
+if __name__ == "__main__":
+    main()
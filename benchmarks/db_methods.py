@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Latency and query plans of every DatabaseManager method on a large seeded database.
+
+Seeds --messages rows (default 1M) across --sessions sessions, times each
+method (p50/p95/p99 over --repeat calls), prints the EXPLAIN QUERY PLAN of
+every statement the read paths run, and fails if any of them scans a table
+or sorts with a temporary B-tree.
+
+    python benchmarks/db_methods.py --messages 1000000 --sessions 50000
+    python benchmarks/db_methods.py --only save_message "chat turn" --write-behind
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.common import percentile
+from database import CONTEXT_CACHE_SIZE, DatabaseManager
+
+BAD_PLAN_STEPS = ("SCAN messages", "SCAN sessions", "SCAN s", "SCAN m", "USE TEMP B-TREE")
+
+
+def seed(db, messages: int, sessions: int, users: int):
+    rng = random.Random(42)
+    session_ids = [f"session-{i}" for i in range(sessions)]
+    with db.connection() as conn:
+        conn.executemany(
+            "INSERT INTO sessions (id, user_id) VALUES (?, ?)",
+            [(session_id, f"user-{i % users}") for i, session_id in enumerate(session_ids)],
+        )
+        batch = []
+        for i in range(messages):
+            batch.append((rng.choice(session_ids), f"question {i} " * 4, f"answer {i} " * 12))
+            if len(batch) == 50000:
+                conn.executemany(
+                    "INSERT INTO messages (session_id, user_message, bot_response) VALUES (?, ?, ?)", batch
+                )
+                batch = []
+        if batch:
+            conn.executemany(
+                "INSERT INTO messages (session_id, user_message, bot_response) VALUES (?, ?, ?)", batch
+            )
+        conn.execute(
+            "UPDATE sessions SET message_count = "
+            "(SELECT COUNT(*) FROM messages WHERE messages.session_id = sessions.id)"
+        )
+        # Every tenth session has a rolling summary
+        conn.executemany(
+            "INSERT INTO session_summaries (session_id, summary, last_message_id) VALUES (?, ?, ?)",
+            [(session_id, "summary " * 50, 1) for session_id in session_ids[::10]],
+        )
+        conn.execute("ANALYZE")
+    return session_ids
+
+
+def capture_statements(db, call):
+    """Run call() and return the SQL statements it executed, with parameters bound"""
+    statements = []
+    with db.connection() as conn:
+        conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        with db.connection() as conn:
+            conn.set_trace_callback(None)
+    return [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+
+
+def timed(call, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DatabaseManager latency and query plans on a large database")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, default=50_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--long-session", type=int, default=5000,
+                        help="exchanges in one extra session used to time history pagination")
+    parser.add_argument("--write-behind", action="store_true", help="queue save_message rows (WRITE_BEHIND=true)")
+    parser.add_argument("--only", nargs="+", help="benchmark names to run (default: all)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "bench.db"), write_behind=args.write_behind)
+
+        start = time.perf_counter()
+        session_ids = seed(db, args.messages, args.sessions, args.users)
+        long_session = "session-long"
+        with db.connection() as conn:
+            conn.execute("INSERT INTO sessions (id, user_id) VALUES (?, ?)", (long_session, "user-0"))
+            conn.executemany(
+                "INSERT INTO messages (session_id, user_message, bot_response) VALUES (?, ?, ?)",
+                [(long_session, f"question {i} " * 4, f"answer {i} " * 12) for i in range(args.long_session)],
+            )
+        db.save_resume("resume " * 500)
+        print(f"seeded {args.messages} messages in {time.perf_counter() - start:.1f}s\n")
+
+        rng = random.Random(7)
+        summarized = session_ids[::10]
+        hot_sessions = session_ids[:50]  # a working set that fits the context cache
+        counter = iter(range(10 ** 9))
+
+        def uncached(call):
+            # Measure the database, not the context cache
+            def run():
+                db.context_cache.clear()
+                return call()
+            return run
+
+        def chat_turn():
+            session_id = db.ensure_session(rng.choice(hot_sessions), "user-0")
+            db.get_conversation_context(session_id, 8)
+            db.save_message(session_id, "what are your skills?", "answer " * 12, "v1")
+
+        # (call, check query plans)
+        checks = {
+            "get_conversation_context": (uncached(lambda: db.get_conversation_context(rng.choice(session_ids), 8)), True),
+            "get_conversation_context (cached)": (lambda: db.get_conversation_context(rng.choice(hot_sessions), 8), True),
+            "get_session_history": (lambda: db.get_session_history(rng.choice(session_ids)), True),
+            "get_session_history (long, full)": (lambda: db.get_session_history(long_session), True),
+            "get_session_history (long, limit=20)": (lambda: db.get_session_history(long_session, None, 20), True),
+            "get_session_history (long, before_id, limit=20)":
+                (lambda: db.get_session_history(long_session, args.messages + args.long_session // 2, 20), True),
+            "iter_session_history (long)": (lambda: sum(1 for _ in db.iter_session_history(long_session)), True),
+            "get_user_sessions": (lambda: db.get_user_sessions(f"user-{rng.randrange(args.users)}", 5), True),
+            "session_exists": (lambda: db.session_exists(rng.choice(session_ids)), True),
+            "get_summary": (lambda: db.get_summary(rng.choice(summarized)), True),
+            "get_messages_after": (lambda: db.get_messages_after(rng.choice(session_ids), 0, 50), True),
+            "get_resume_version": (db.get_resume_version, True),
+            "get_resume": (db.get_resume, True),
+            "create_session": (lambda: db.create_session(f"user-{rng.randrange(args.users)}"), False),
+            "ensure_session (existing)": (lambda: db.ensure_session(rng.choice(session_ids), "user-0"), True),
+            "save_message": (lambda: db.save_message(rng.choice(session_ids), "question", "answer " * 12, "v1"), False),
+            "save_summary": (lambda: db.save_summary(rng.choice(session_ids), "summary " * 50, next(counter)), False),
+            "save_resume": (lambda: db.save_resume("resume " * 500), False),
+            "chat turn": (chat_turn, False),
+        }
+        if args.only:
+            unknown = set(args.only) - set(checks)
+            if unknown:
+                parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+            checks = {name: check for name, check in checks.items() if name in args.only}
+
+        # Warm the context cache for the hot sessions
+        for session_id in hot_sessions:
+            db.get_conversation_context(session_id, 8)
+
+        failures = 0
+        print(f"{'':50} {'p50':>8} {'p95':>8} {'p99':>8}  (us)")
+        for name, (call, check_plan) in checks.items():
+            samples = timed(call, args.repeat)
+            print(f"{name:50} {percentile(samples, 50) * 1e6:8.0f} {percentile(samples, 95) * 1e6:8.0f} "
+                  f"{percentile(samples, 99) * 1e6:8.0f}")
+            if not check_plan:
+                continue
+            db.context_cache.max_size = 0  # plans of the uncached path; a hit only checks the message count
+            for sql in capture_statements(db, call):
+                with db.connection() as conn:
+                    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+                for step in plan:
+                    bad = step.startswith(BAD_PLAN_STEPS)
+                    failures += bad
+                    if bad:
+                        print(f"    !! {step}")
+            db.context_cache.max_size = CONTEXT_CACHE_SIZE
+        flushed = db.flush()
+        db.close()
+
+    if args.write_behind:
+        print(f"\n{flushed} queued rows flushed at the end")
+    if failures:
+        print(f"\n{failures} query plan step(s) scan a table or sort in a temp B-tree")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Sustained save_message throughput, with and without write-behind batching.
+
+    python benchmarks/db_writes.py --messages 20000 --threads 4
+    SQLITE_SYNCHRONOUS=FULL python benchmarks/db_writes.py   # fsync on every commit
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def run(write_behind: bool, messages: int, threads: int, sessions: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        # Importing database opens DATABASE_PATH, so point it at the scratch dir
+        os.environ["DATABASE_PATH"] = os.path.join(tmp, "import.db")
+        from database import DatabaseManager
+
+        db = DatabaseManager(os.path.join(tmp, "bench.db"), write_behind=write_behind)
+        session_ids = [db.create_session(f"user-{i}") for i in range(sessions)]
+        per_thread = messages // threads
+
+        def writer(offset: int):
+            for i in range(per_thread):
+                session_id = session_ids[(offset + i) % len(session_ids)]
+                db.save_message(session_id, f"question {i}", f"answer {i}")
+
+        start = time.perf_counter()
+        workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        db.close()  # includes the final flush
+        elapsed = time.perf_counter() - start
+
+        return per_thread * threads / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="save_message throughput")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--sessions", type=int, default=100)
+    args = parser.parse_args()
+
+    for write_behind in (False, True):
+        rate = run(write_behind, args.messages, args.threads, args.sessions)
+        label = "write-behind" if write_behind else "direct"
+        print(f"{label:13} {rate:8.0f} messages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+One aggressive client against everyone else: rate limiting and fair sharing of LLM slots.
+
+A bot fires --bot-requests messages with --bot-concurrency in flight, all
+under one user_id, while --visitors ordinary visitors (each from their own
+address) send --visitor-messages messages one after another. Reports the
+visitors' latency and statuses, and how the bot's requests were answered.
+The app runs with a small LLM_MAX_CONCURRENCY so calls have to queue.
+
+    python benchmarks/fairness.py                   # rate limits on (default settings)
+    python benchmarks/fairness.py --no-rate-limit   # only the fair-share queue protects visitors
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import config
+from benchmarks.common import percentile, running_app
+
+
+async def send(client: httpx.AsyncClient, payload: dict, address: str):
+    """POST /chat as a client at `address` (uvicorn trusts X-Forwarded-For from localhost)"""
+    start = time.perf_counter()
+    response = await client.post("/chat", json=payload, headers={"X-Forwarded-For": address})
+    return response, time.perf_counter() - start
+
+
+async def run(url: str, args):
+    bot_latencies = {}  # status -> latencies
+    visitor_statuses, visitor_latencies = Counter(), []
+
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+        pending = iter(range(args.bot_requests))
+
+        async def bot():
+            for i in pending:
+                response, seconds = await send(client, {"message": f"spam {i}", "user_id": "bot"}, "10.0.0.1")
+                bot_latencies.setdefault(response.status_code, []).append(seconds)
+
+        async def visitor(v: int):
+            await asyncio.sleep(0.5)  # arrive once the bot has filled the queue
+            session_id = None
+            for m in range(args.visitor_messages):
+                payload = {"message": f"question {m} from visitor {v}", "user_id": f"visitor-{v}",
+                           "session_id": session_id}
+                response, seconds = await send(client, payload, f"10.1.0.{v}")
+                visitor_statuses[response.status_code] += 1
+                visitor_latencies.append(seconds)
+                if response.status_code == 200:
+                    session_id = response.json()["session_id"]
+
+        start = time.perf_counter()
+        await asyncio.gather(*(bot() for _ in range(args.bot_concurrency)),
+                             *(visitor(v) for v in range(args.visitors)))
+        elapsed = time.perf_counter() - start
+
+    def statuses(counter: Counter) -> str:
+        return ", ".join(f"{status}: {count}" for status, count in sorted(counter.items()))
+
+    print(f"elapsed:          {elapsed:.1f}s")
+    for status, latencies in sorted(bot_latencies.items()):
+        print(f"bot {status}:          {len(latencies)} requests, p50 {percentile(latencies, 50) * 1000:.0f} ms")
+    print(f"visitors:         {statuses(visitor_statuses)}")
+    for pct in (50, 95, 99):
+        print(f"visitor p{pct}:      {percentile(visitor_latencies, pct) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Visitor latency while one client floods /chat")
+    parser.add_argument("--url", help="an already running app (default: start one with the stub LLM)")
+    parser.add_argument("--bot-requests", type=int, default=300)
+    parser.add_argument("--bot-concurrency", type=int, default=60)
+    parser.add_argument("--visitors", type=int, default=10)
+    parser.add_argument("--visitor-messages", type=int, default=3)
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="LLM_MAX_CONCURRENCY for the app")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub LLM time to first token, seconds")
+    parser.add_argument("--no-rate-limit", action="store_true", help="turn the per-visitor and per-IP limits off")
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run(args.url, args))
+        return
+    env = {"LLM_MAX_CONCURRENCY": str(args.llm_concurrency), "LLM_MAX_QUEUE": "1000"}
+    if not args.no_rate_limit:
+        # running_app turns the limits off; restore the app's settings
+        env["RATE_LIMIT_PER_MINUTE"] = str(config.RATE_LIMIT_PER_MINUTE)
+        env["RATE_LIMIT_IP_PER_MINUTE"] = str(config.RATE_LIMIT_IP_PER_MINUTE)
+    with tempfile.TemporaryDirectory() as tmp:
+        with running_app(os.path.join(tmp, "bench.db"), args.latency, env=env) as url:
+            asyncio.run(run(url, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test for the /chat endpoint.
+
+By default it starts the stub LLM server and the app on a scratch database,
+so it runs offline with no setup:
+
+    python benchmarks/load_chat.py -c 50 -n 500
+    python benchmarks/load_chat.py --scenario returning --sessions 100 --history-turns 10
+    python benchmarks/load_chat.py --scenario long --latency 0.5 --tokens-per-second 200
+
+Scenarios: "new" sends every request as a first turn of a new session,
+"returning" spreads requests over --sessions existing sessions with
+--history-turns exchanges each, and "long" does the same with long
+histories (default 500 exchanges). --same-message makes every request ask
+the identical question, like visitors arriving from a shared link.
+
+Faults can be injected into the stub to see how retries, circuit breakers
+and model fallback hold up (set LLM_* variables for the app in the
+environment):
+
+    LLM_MODELS=primary,backup python benchmarks/load_chat.py --stub-args="--error-rate 0.3 --down-models primary"
+
+Pass --url to load test an app that is already running instead; history is
+then seeded through /chat, which is slow for long histories.
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import shlex
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.common import metric_samples, metric_total, percentile, running_app, stage_totals
+
+# Stages that are database work
+DB_STAGES = ("session", "context", "persist")
+DEFAULT_HISTORY_TURNS = {"new": 0, "returning": 5, "long": 500}
+
+
+def seed_database(database_path: str, sessions: int, turns: int) -> List[str]:
+    """Create sessions with history directly in the database, before the app starts"""
+    from database import DatabaseManager
+
+    db = DatabaseManager(database_path, write_behind=False)
+    session_ids = []
+    for s in range(sessions):
+        session_id = db.create_session(f"bench-user-{s}")
+        with db.connection() as conn:
+            conn.executemany(
+                "INSERT INTO messages (session_id, user_message, bot_response) VALUES (?, ?, ?)",
+                [(session_id, f"earlier question {t}", f"earlier answer {t} " * 20) for t in range(turns)],
+            )
+            conn.execute("UPDATE sessions SET message_count = ? WHERE id = ?", (turns, session_id))
+        session_ids.append(session_id)
+    db.close()
+    return session_ids
+
+
+async def seed_over_http(client: httpx.AsyncClient, sessions: int, turns: int) -> List[str]:
+    async def one(s: int) -> str:
+        session_id = None
+        for t in range(turns):
+            response = await client.post("/chat", json={
+                "message": f"earlier question {t}", "session_id": session_id, "user_id": f"bench-user-{s}",
+            })
+            response.raise_for_status()
+            session_id = response.json()["session_id"]
+        return session_id
+
+    return list(await asyncio.gather(*(one(s) for s in range(sessions))))
+
+
+async def run(url: str, concurrency: int, total: int, session_ids: Optional[List[str]],
+              sessions_to_seed: int = 0, history_turns: int = 0, same_message: bool = False,
+              stream: bool = False):
+    latencies = []
+    errors = 0
+    statuses = Counter()
+    counter = iter(range(total))
+    sessions = itertools.cycle(session_ids) if session_ids else None
+
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+        if sessions is None and history_turns:
+            print(f"seeding {history_turns} turns per session over HTTP...")
+            session_ids = await seed_over_http(client, sessions_to_seed, history_turns)
+            sessions = itertools.cycle(session_ids)
+
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                payload = {"message": "What are your skills?" if same_message else f"What are your skills? ({i})"}
+                if sessions is not None:
+                    payload["session_id"] = next(sessions)
+                start = time.perf_counter()
+                if stream:
+                    async with client.stream("POST", "/chat/stream", json=payload) as response:
+                        body = (await response.aread()).decode()
+                    failed = response.status_code != 200 or "event: error" in body
+                else:
+                    response = await client.post("/chat", json=payload)
+                    failed = response.status_code != 200
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] += 1
+                if failed:
+                    errors += 1
+
+        before_text = (await client.get("/metrics")).text
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        after_text = (await client.get("/metrics")).text
+        before, after = stage_totals(before_text), stage_totals(after_text)
+
+    print(f"requests:    {total} ({errors} errors), concurrency {concurrency}")
+    print(f"statuses:    {', '.join(f'{status}: {count}' for status, count in sorted(statuses.items()))}")
+    print(f"throughput:  {total / elapsed:.1f} req/s")
+    ok = 'outcome="ok"'
+    llm_calls = metric_total(after_text, "llm_requests_total", ok) - metric_total(before_text, "llm_requests_total", ok)
+    print(f"LLM calls:   {llm_calls:.0f} completed upstream")
+    before_llm = metric_samples(before_text, "llm_requests_total")
+    for labels, value in sorted(metric_samples(after_text, "llm_requests_total").items()):
+        if value - before_llm.get(labels, 0.0):
+            print(f"  {labels:60} {value - before_llm.get(labels, 0.0):6.0f}")
+    degraded = metric_total(after_text, "chat_degraded_replies_total") - metric_total(before_text, "chat_degraded_replies_total")
+    if degraded:
+        print(f"degraded:    {degraded:.0f} cached answers served while no model could answer")
+    for pct in (50, 95, 99):
+        print(f"latency p{pct}: {percentile(latencies, pct) * 1000:.0f} ms")
+
+    # Mean time per request in each stage, from the app's own histograms
+    print("stage means:")
+    db_time = 0.0
+    for stage, (seconds, count) in sorted(after.items()):
+        seconds -= before.get(stage, (0.0, 0.0))[0]
+        count -= before.get(stage, (0.0, 0.0))[1]
+        if count:
+            print(f"  {stage:16} {seconds / count * 1000:8.2f} ms  (n={count:.0f})")
+        if stage in DB_STAGES:
+            db_time += seconds
+    print(f"DB time:     {db_time / total * 1000:.2f} ms per request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /chat endpoint")
+    parser.add_argument("--url", help="an already running app (default: start one with the stub LLM)")
+    parser.add_argument("-c", "--concurrency", type=int, default=50)
+    parser.add_argument("-n", "--requests", type=int, default=500)
+    parser.add_argument("--scenario", choices=sorted(DEFAULT_HISTORY_TURNS), default="new")
+    parser.add_argument("--sessions", type=int, help="returning sessions (default: the concurrency)")
+    parser.add_argument("--history-turns", type=int, help="exchanges already in each returning session")
+    parser.add_argument("--same-message", action="store_true", help="every request asks the same question")
+    parser.add_argument("--stream", action="store_true", help="use /chat/stream instead of /chat")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub LLM time to first token, seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="stub LLM generation speed")
+    parser.add_argument("--reply-tokens", type=int, default=20, help="stub LLM reply length")
+    parser.add_argument("--stub-args", default="", help="extra stub_llm_server.py options, e.g. fault injection")
+    args = parser.parse_args()
+
+    history_turns = args.history_turns if args.history_turns is not None else DEFAULT_HISTORY_TURNS[args.scenario]
+    if args.scenario == "new":
+        history_turns = 0
+    sessions = args.sessions or args.concurrency
+
+    if args.url:
+        asyncio.run(run(args.url, args.concurrency, args.requests, None, sessions, history_turns,
+                        args.same_message, args.stream))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, "bench.db")
+        session_ids = seed_database(database_path, sessions, history_turns) if history_turns else None
+        with running_app(database_path, args.latency, args.tokens_per_second, args.reply_tokens,
+                         stub_args=shlex.split(args.stub_args)) as url:
+            asyncio.run(run(url, args.concurrency, args.requests, session_ids,
+                            same_message=args.same_message, stream=args.stream))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Prompt size and LLM latency with the full resume vs. retrieved sections.
+
+Token counts are estimated offline. Pass --url to also time completions
+against a stub server that charges for prompt size, e.g.
+
+    python benchmarks/stub_llm_server.py --latency 0.1 --prefill-ms-per-1k 50 &
+    python benchmarks/prompt_size.py --url http://127.0.0.1:9100
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from prompts import estimate_tokens, prompt_builder  # noqa: E402
+
+QUESTIONS = [
+    "What are your skills?",
+    "Where did you study?",
+    "Tell me about your friends",
+    "What projects have you built with Django?",
+    "What is your current job?",
+    "What are your hobbies?",
+    "Do you know React?",
+    "How can I contact you?",
+    "Hi there!",
+    "What chatbots have you built?",
+]
+
+
+async def time_completions(url: str, prompts):
+    from groq import AsyncGroq
+
+    client = AsyncGroq(api_key="stub", base_url=url)
+    start = time.perf_counter()
+    for question, system_prompt in prompts:
+        await client.chat.completions.create(
+            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": question}],
+            model="stub",
+        )
+    return (time.perf_counter() - start) / len(prompts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-resume and retrieval prompts")
+    parser.add_argument("--url", help="stub LLM server to time completions against")
+    args = parser.parse_args()
+
+    prompt = prompt_builder.current
+    full = [(q, prompt.system_prompt) for q in QUESTIONS]
+    retrieved = [(q, prompt.for_question(q)) for q in QUESTIONS]
+
+    for label, prompts in (("full resume", full), ("retrieval", retrieved)):
+        tokens = [estimate_tokens(system_prompt) for _, system_prompt in prompts]
+        line = f"{label:12} avg {sum(tokens) / len(tokens):6.0f} tokens (min {min(tokens)}, max {max(tokens)})"
+        if args.url:
+            latency = asyncio.run(time_completions(args.url, prompts))
+            line += f", avg latency {latency * 1000:.0f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
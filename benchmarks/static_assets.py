@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Embed page weight and repeat-visit cost of the widget's static pages.
+
+Loads a page (default /iframe) the way a browser on a 2x screen would: the
+HTML with Accept-Encoding: br, gzip, then the image it references (the
+first <picture> source the browser supports, at the size it would pick).
+The repeat visit replays the same resources with the validators from the
+first: fresh cached responses (immutable, or max-age not yet expired) are
+not requested at all, the rest are revalidated with If-None-Match /
+If-Modified-Since.
+
+    python benchmarks/static_assets.py
+    python benchmarks/static_assets.py --page /demo --repeat 200
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.common import percentile, running_app
+
+BROWSER_HEADERS = {"Accept-Encoding": "br, gzip, deflate", "Accept": "image/avif,image/webp,*/*"}
+SUPPORTED_TYPES = ("image/avif", "image/webp")
+PIXEL_RATIO = 2
+
+
+def pick_image(tag_html: str) -> str:
+    """The URL a browser picks from an <img> or a <picture>"""
+    sizes = re.search(r'sizes="(\d+)px"', tag_html)
+    target = int(sizes.group(1)) * PIXEL_RATIO if sizes else 10 ** 6
+    srcsets = [
+        srcset for type_, srcset in re.findall(r'<source type="([^"]+)" srcset="([^"]+)"', tag_html)
+        if type_ in SUPPORTED_TYPES
+    ]
+    if not srcsets:
+        srcsets = re.findall(r'<img[^>]*\bsrcset="([^"]+)"', tag_html)
+    if srcsets:
+        candidates = [(int(width), url) for url, width in re.findall(r"(\S+) (\d+)w", srcsets[0])]
+        return next((url for width, url in sorted(candidates) if width >= target), max(candidates)[1])
+    return re.search(r'<img[^>]*\bsrc="([^"]+)"', tag_html).group(1)
+
+
+def subresources(html: str) -> List[str]:
+    """Same-origin images the page loads"""
+    urls = [pick_image(picture) for picture in re.findall(r"<picture>.*?</picture>", html, re.DOTALL)]
+    html = re.sub(r"<picture>.*?</picture>", "", html, flags=re.DOTALL)
+    urls += [url for url in re.findall(r'<img[^>]*\bsrc="(/[^"]+)"', html)]
+    return urls
+
+
+def is_fresh(response: httpx.Response) -> bool:
+    """Whether a browser reuses the cached response without asking the server"""
+    cache_control = response.headers.get("cache-control", "")
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return False
+    if "immutable" in cache_control:
+        return True
+    max_age = re.search(r"max-age=(\d+)", cache_control)
+    return bool(max_age and int(max_age.group(1)) > 0)
+
+
+def fetch(client: httpx.Client, url: str, headers: Dict[str, str]) -> Tuple[httpx.Response, float]:
+    start = time.perf_counter()
+    response = client.get(url, headers={**BROWSER_HEADERS, **headers})
+    return response, time.perf_counter() - start
+
+
+def visit(client: httpx.Client, page: str):
+    """First visit then repeat visit; returns (bytes, seconds, requests) for each"""
+    first_bytes, first_time = 0, 0.0
+    response, seconds = fetch(client, page, {})
+    response.raise_for_status()
+    cached = [(page, response)]
+    first_bytes += response.num_bytes_downloaded
+    first_time += seconds
+    for url in subresources(response.text):
+        response, seconds = fetch(client, url, {})
+        response.raise_for_status()
+        cached.append((url, response))
+        first_bytes += response.num_bytes_downloaded
+        first_time += seconds
+
+    repeat_bytes, repeat_time, repeat_requests = 0, 0.0, 0
+    for url, previous in cached:
+        if is_fresh(previous):
+            continue
+        validators = {}
+        if "etag" in previous.headers:
+            validators["If-None-Match"] = previous.headers["etag"]
+        if "last-modified" in previous.headers:
+            validators["If-Modified-Since"] = previous.headers["last-modified"]
+        response, seconds = fetch(client, url, validators)
+        repeat_bytes += response.num_bytes_downloaded
+        repeat_time += seconds
+        repeat_requests += 1
+    return (first_bytes, first_time, len(cached)), (repeat_bytes, repeat_time, repeat_requests)
+
+
+def run(url: str, page: str, repeat: int):
+    with httpx.Client(base_url=url, timeout=30) as client:
+        first_visits, repeat_visits = [], []
+        for _ in range(repeat):
+            first, again = visit(client, page)
+            first_visits.append(first)
+            repeat_visits.append(again)
+
+        response = client.get(page, headers=BROWSER_HEADERS)
+        print(f"page {page}: {response.headers.get('content-encoding', 'identity')}, "
+              f"Cache-Control: {response.headers.get('cache-control', '-')}")
+        for resource in subresources(response.text):
+            headers = client.get(resource, headers=BROWSER_HEADERS).headers
+            print(f"  {resource}: {headers.get('content-type')}, Cache-Control: {headers.get('cache-control', '-')}")
+
+    for name, visits in (("first visit", first_visits), ("repeat visit", repeat_visits)):
+        total_bytes, _, requests = visits[0]
+        seconds = [visit_time for _, visit_time, _ in visits]
+        print(f"{name + ':':14} {total_bytes / 1024:8.1f} KiB over the wire, {requests} request(s), "
+              f"p50 {percentile(seconds, 50) * 1000:.2f} ms, p99 {percentile(seconds, 99) * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Page weight and repeat-visit cost of the static pages")
+    parser.add_argument("--url", help="an already running app (default: start one with the stub LLM)")
+    parser.add_argument("--page", default="/iframe")
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.url:
+        run(args.url, args.page, args.repeat)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        with running_app(os.path.join(tmp, "bench.db"), env={"ASSET_BUILD_DIR": os.path.join(tmp, "assets")}) as url:
+            run(url, args.page, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
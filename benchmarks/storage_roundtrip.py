@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Runs the same chat workload against each storage backend, checks that they
+return the same results and reports per-operation latency.
+
+    python benchmarks/storage_roundtrip.py
+    python benchmarks/storage_roundtrip.py --postgres postgresql://localhost/myagent_bench
+
+The PostgreSQL database should be a scratch one: the run deletes every
+session in it at the end.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from storage import create_store
+
+
+def strip(value):
+    """Drop ids and timestamps, which legitimately differ between backends"""
+    if isinstance(value, list):
+        return [strip(item) for item in value]
+    if isinstance(value, dict):
+        return {key: strip(item) for key, item in value.items()
+                if key not in ("id", "timestamp", "created_at", "last_activity", "last_message_id", "version",
+                               "seconds", "batches", "pages_freed")}
+    return value
+
+
+async def workload(store, sessions: int, turns: int):
+    timings = defaultdict(list)
+    results = []
+
+    async def timed(name, call):
+        start = time.perf_counter()
+        result = await call
+        timings[name].append(time.perf_counter() - start)
+        return result
+
+    await store.open()
+    user_id = "bench-user"
+    session_ids = []
+    for s in range(sessions):
+        session_id = await timed("ensure_session (new)", store.ensure_session(None, user_id))
+        session_ids.append(session_id)
+        for t in range(turns):
+            await timed("ensure_session (existing)", store.ensure_session(session_id, user_id))
+            await timed("get_conversation_context", store.get_conversation_context(session_id, 8))
+            await timed("save_message", store.save_message(session_id, f"q{s}.{t}", f"a{s}.{t}", "v1"))
+
+    for session_id in session_ids:
+        results.append(await timed("get_conversation_context", store.get_conversation_context(session_id, 8)))
+        page = await timed("get_session_history (limit=5)", store.get_session_history(session_id, None, 5))
+        results.append(page)
+        before_id = min(m["id"] for m in page)
+        results.append(await timed("get_session_history (before_id)",
+                                   store.get_session_history(session_id, before_id, 5)))
+        results.append(await timed("get_session_history (full)", store.get_session_history(session_id)))
+        results.append([m async for m in store.iter_session_history(session_id, batch_size=7)])
+
+        messages = await timed("get_messages_after", store.get_messages_after(session_id, 0, 3))
+        results.append(messages)
+        await timed("save_summary", store.save_summary(session_id, "summary", messages[-1]["id"]))
+        results.append(await timed("get_summary", store.get_summary(session_id)))
+
+    first = await store.save_resume("resume v1")
+    second = await store.save_resume("resume v2")
+    results.append(second > first)
+    results.append(await timed("get_resume_version", store.get_resume_version()) == second)
+    results.append(await store.get_resume())
+
+    results.append(await timed("get_user_sessions", store.get_user_sessions(user_id, 5)))
+    results.append(await store.session_exists(session_ids[0]))
+    results.append(await timed("cleanup_old_sessions", store.cleanup_old_sessions(-1, "off")))
+    results.append(await store.session_exists(session_ids[0]))
+    await store.close()
+    return strip(results), timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Storage backend consistency and latency")
+    parser.add_argument("--postgres", help="PostgreSQL URL of a scratch database")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=12)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        urls = {"sqlite": f"sqlite:///{os.path.join(tmp, 'bench.db')}"}
+        if args.postgres:
+            urls["postgres"] = args.postgres
+
+        outcomes = {}
+        for name, url in urls.items():
+            results, timings = asyncio.run(workload(create_store(url), args.sessions, args.turns))
+            outcomes[name] = results
+            print(f"{name}:")
+            for op, samples in timings.items():
+                samples.sort()
+                print(f"  {op:34} p50 {samples[len(samples) // 2] * 1e6:7.0f} us   n={len(samples)}")
+
+    if len(outcomes) > 1 and outcomes["sqlite"] != outcomes["postgres"]:
+        print("\nbackends returned different results")
+        sys.exit(1)
+    print("\nresults match" if len(outcomes) > 1 else "")
+
+
+if __name__ == "__main__":
+    main()
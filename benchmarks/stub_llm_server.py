@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Minimal Groq-compatible chat completion server for local benchmarks.
+
+Every request sleeps for --latency seconds (plus --prefill-ms-per-1k per
+thousand prompt tokens, plus --reply-tokens at --tokens-per-second) and
+returns a canned answer, so the app can be load-tested without an API key
+or network access.
+
+Faults can be injected to exercise retries, timeouts, circuit breakers and
+model fallback: random 5xx errors, 429s with Retry-After, hung requests,
+models that are always down and a full outage window.
+
+--connect-ms delays the first response on every new connection, standing in
+for DNS and TLS setup, and --idle-timeout closes keep-alive connections left
+idle that long, like the load balancers in front of the real API.
+
+    python benchmarks/stub_llm_server.py --port 9100 --latency 0.5
+    python benchmarks/stub_llm_server.py --error-rate 0.2 --rate-limit-rate 0.1 --down-models model-a
+    GROQ_BASE_URL=http://127.0.0.1:9100 GROQ_API_KEY=stub uvicorn main:app
+"""
+
+import argparse
+import json
+import random
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Sequence, Tuple
+
+REPLY = "I'm Nafis, a software engineer from Mumbai who builds chatbots and AI agents."
+
+
+def make_reply(tokens: int) -> str:
+    """The canned answer repeated to roughly `tokens` tokens (~4 characters each)"""
+    if tokens <= len(REPLY) // 4:
+        return REPLY
+    return " ".join([REPLY] * (tokens * 4 // (len(REPLY) + 1) + 1))
+
+
+class Faults:
+    """Failures to inject; each rate is a per-request probability"""
+
+    def __init__(self, error_rate: float = 0.0, rate_limit_rate: float = 0.0, hang_rate: float = 0.0,
+                 hang_seconds: float = 60.0, retry_after: Optional[float] = None,
+                 down_models: Sequence[str] = (), outage: Optional[Tuple[float, float]] = None):
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.retry_after = retry_after
+        self.down_models = set(down_models)
+        self.outage = outage  # (start, end) seconds after startup
+        self.started = time.monotonic()
+
+    def pick(self, model: str) -> Optional[str]:
+        """The fault for one request: "down", "error", "rate_limit", "hang" or None"""
+        if model in self.down_models:
+            return "down"
+        if self.outage and self.outage[0] <= time.monotonic() - self.started < self.outage[1]:
+            return "down"
+        roll = random.random()
+        for fault, rate in (("error", self.error_rate), ("rate_limit", self.rate_limit_rate),
+                            ("hang", self.hang_rate)):
+            if roll < rate:
+                return fault
+            roll -= rate
+        return None
+
+
+def prompt_tokens(payload: dict) -> int:
+    """Rough prompt size, ~4 characters per token"""
+    return sum(len(m.get("content") or "") for m in payload.get("messages", [])) // 4
+
+
+def usage(payload: dict, reply: str) -> dict:
+    tokens = prompt_tokens(payload)
+    return {"prompt_tokens": tokens, "completion_tokens": len(reply) // 4,
+            "total_tokens": tokens + len(reply) // 4}
+
+
+def make_handler(latency: float, prefill_ms_per_1k: float = 0.0, tokens_per_second: float = 0.0,
+                 reply: str = REPLY, faults: Optional[Faults] = None, connect_ms: float = 0.0,
+                 idle_timeout: Optional[float] = None):
+    # Time to generate the reply at the configured token rate
+    generation = len(reply) / 4 / tokens_per_second if tokens_per_second > 0 else 0.0
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Idle keep-alive connections are closed after this many seconds
+        timeout = idle_timeout
+
+        def setup(self):
+            # Connection setup cost, paid once per connection
+            time.sleep(connect_ms / 1000)
+            super().setup()
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            fault = faults.pick(payload.get("model")) if faults else None
+            if fault == "down":
+                return self.send_api_error(503, "Service unavailable")
+            if fault == "error":
+                return self.send_api_error(random.choice((500, 502, 503)), "Injected server error")
+            if fault == "rate_limit":
+                return self.send_api_error(429, "Rate limit reached", faults.retry_after)
+            if fault == "hang":
+                time.sleep(faults.hang_seconds)  # the client should have timed out by now
+            tokens = prompt_tokens(payload)
+            time.sleep(tokens / 1000 * prefill_ms_per_1k / 1000)
+            if payload.get("stream"):
+                return self.send_stream(payload)
+            time.sleep(latency + generation)
+
+            body = json.dumps({
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage(payload, reply),
+            }).encode()
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_api_error(self, status: int, message: str, retry_after: Optional[float] = None):
+            """Error body in the OpenAI/Groq format"""
+            body = json.dumps({"error": {"message": message, "type": "stub_error"}}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if retry_after is not None:
+                self.send_header("Retry-After", str(retry_after))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_stream(self, payload):
+            """Send the reply word by word as chat.completion.chunk events"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            # Chunked, so the connection stays open for the next request
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            words = reply.split(" ")
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            time.sleep(latency)  # time to first token
+            for i, word in enumerate(words):
+                time.sleep(generation / len(words))
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": payload.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": word if i == 0 else " " + word},
+                        "finish_reason": None,
+                    }],
+                }
+                if i == len(words) - 1:
+                    # Groq reports streaming usage on the last chunk
+                    chunk["x_groq"] = {"id": completion_id, "usage": usage(payload, reply)}
+                self.write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.write_chunk(b"data: [DONE]\n\n")
+            self.write_chunk(b"")
+
+        def write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            """The model list (used to warm up and keep connections alive); any other path is a readiness probe"""
+            body = b""
+            if self.path.endswith("/models"):
+                body = json.dumps({"object": "list", "data": [
+                    {"id": "stub", "object": "model", "created": 0, "owned_by": "stub"}
+                ]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Groq chat completion server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per completion")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=0.0,
+                        help="extra milliseconds per 1000 prompt tokens")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="generation speed for the reply (0: the reply costs no extra time)")
+    parser.add_argument("--reply-tokens", type=int, default=20, help="approximate length of the reply")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 5xx")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests failing with 429")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="fraction of requests that hang")
+    parser.add_argument("--hang-seconds", type=float, default=60.0)
+    parser.add_argument("--down-models", default="", help="comma-separated models that always return 503")
+    parser.add_argument("--outage", help="START:END seconds after startup during which every request gets 503")
+    parser.add_argument("--connect-ms", type=float, default=0.0,
+                        help="extra delay on each new connection (DNS/TLS setup)")
+    parser.add_argument("--idle-timeout", type=float, help="close keep-alive connections idle this many seconds")
+    args = parser.parse_args()
+
+    faults = Faults(
+        args.error_rate, args.rate_limit_rate, args.hang_rate, args.hang_seconds, args.retry_after,
+        [model for model in args.down_models.split(",") if model],
+        tuple(float(value) for value in args.outage.split(":")) if args.outage else None,
+    )
+
+    # The default listen backlog of 5 drops connections under bursty load
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(
+        args.latency, args.prefill_ms_per_1k, args.tokens_per_second, make_reply(args.reply_tokens), faults,
+        args.connect_ms, args.idle_timeout,
+    ))
+    server.daemon_threads = True
+    print(f"Stub LLM listening on http://{args.host}:{args.port} (latency {args.latency}s)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional per-entry TTL and hit/miss counters"""
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Callers may hold the lock to make a read-modify-write atomic
+        self.lock = threading.RLock()
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+
+    def _lookup(self, key: Hashable) -> Optional[tuple]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at = item[0]
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value, counting the hit or miss"""
+        with self.lock:
+            item = self._lookup(key)
+            if item is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value without touching counters or LRU order"""
+        with self.lock:
+            item = self._lookup(key)
+            return default if item is None else item[1]
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries if full"""
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self.lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self.lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[1]
+
+    def clear(self):
+        with self.lock:
+            self._data.clear()
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of the live (key, value) pairs"""
+        with self.lock:
+            return [(key, item[1]) for key in list(self._data) if (item := self._lookup(key))]
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.lock:
+            return self._lookup(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        """Size and hit/miss counters, for sizing the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Words that carry no meaning for matching visitor questions
+STOPWORDS = frozenset("""
+a about an and are can could do does for how i in is it me of on or please
+tell the to what whats where which who would you your youre
+""".split())
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower().replace("'", "")))
+
+
+def _terms(normalized: str) -> Counter:
+    return Counter(word for word in normalized.split() if word not in STOPWORDS)
+
+
+class ResponseCache:
+    """Cache of answers keyed by normalized question and system prompt version.
+    
+    Lookups try an exact match first and can then fall back to the most
+    TF-IDF-similar cached question, if it scores at least `similarity`.
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None, similarity: float = 0.0):
+        self.similarity = similarity
+        self.entries = LRUCache(max_size, ttl=ttl)  # (question, version) -> answer
+        self.lookups = 0
+        self.exact_hits = 0
+        self.similar_hits = 0
+
+    def get(self, question: str, version: str, allow_similar: bool = True,
+            similarity: Optional[float] = None) -> Optional[str]:
+        """Cached answer, if any; `similarity` overrides the configured threshold"""
+        match = self.lookup(question, version, allow_similar, similarity)
+        return match[1] if match else None
+
+    def lookup(self, question: str, version: str, allow_similar: bool = True,
+               similarity: Optional[float] = None) -> Optional[Tuple[str, str]]:
+        """The matched (normalized) cached question and its answer, if any"""
+        normalized = normalize_question(question)
+        self.lookups += 1
+
+        answer = self.entries.get((normalized, version))
+        if answer is not None:
+            self.exact_hits += 1
+            return normalized, answer
+
+        similarity = self.similarity if similarity is None else similarity
+        if allow_similar and similarity > 0:
+            match = self._most_similar(normalized, version, similarity)
+            if match is not None:
+                self.similar_hits += 1
+                return match
+        return None
+
+    def set(self, question: str, version: str, answer: str):
+        self.entries.set((normalize_question(question), version), answer)
+
+    def clear(self):
+        self.entries.clear()
+
+    def _most_similar(self, normalized: str, version: str, similarity: float) -> Optional[Tuple[str, str]]:
+        """The cached question with the highest TF-IDF cosine similarity, and its answer"""
+        query = _terms(normalized)
+        if not query:
+            return None
+        candidates = [(_terms(key[0]), (key[0], answer)) for key, answer in self.entries.items() if key[1] == version]
+        if not candidates:
+            return None
+
+        # Document frequencies over the cached questions plus the query
+        document_count = len(candidates) + 1
+        df = Counter(query.keys())
+        for terms, _ in candidates:
+            df.update(terms.keys())
+
+        def weigh(terms: Counter) -> Dict[str, float]:
+            return {term: count * (math.log(document_count / df[term]) + 1) for term, count in terms.items()}
+
+        def norm(vector: Dict[str, float]) -> float:
+            return math.sqrt(sum(weight * weight for weight in vector.values()))
+
+        query_vector = weigh(query)
+        query_norm = norm(query_vector)
+        best_score, best_match = 0.0, None
+        for terms, match in candidates:
+            vector = weigh(terms)
+            dot = sum(weight * vector.get(term, 0.0) for term, weight in query_vector.items())
+            score = dot / (query_norm * norm(vector)) if dot else 0.0
+            if score > best_score:
+                best_score, best_match = score, match
+
+        return best_match if best_score >= similarity else None
+
+    def stats(self) -> Dict:
+        """Hit counters, for sizing the cache and tuning the similarity threshold"""
+        hits = self.exact_hits + self.similar_hits
+        return {
+            "size": len(self.entries),
+            "max_size": self.entries.max_size,
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "hit_rate": round(hits / self.lookups, 4) if self.lookups else 0.0,
+        }
@@ -0,0 +1,143 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+
+class SharedReply:
+    """An LLM reply that any number of requests can follow as it is produced.
+
+    The producer appends text chunks; each follower replays the chunks so far
+    and then waits for more, so late joiners still get the whole reply. Each
+    follower calls `close()` once when it is done or gives up.
+    """
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.error: Optional[BaseException] = None
+        self.finished = False
+        self.followers = 0
+        # Called when the last follower leaves before the reply is finished
+        self.on_abandoned: Optional[Callable[[], None]] = None
+        self._started = asyncio.Event()
+        self._changed = asyncio.Event()
+
+    def start(self):
+        """Mark the upstream call as accepted (streaming responses have begun)"""
+        self._started.set()
+
+    def append(self, text: str):
+        self.parts.append(text)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.error = error
+        self.finished = True
+        self._started.set()
+        self._notify()
+
+    def _notify(self):
+        # Wake current waiters; later ones wait on a fresh event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_started(self):
+        """Wait until the upstream call is under way; raises if it failed before that"""
+        await self._started.wait()
+        if self.error is not None and not self.parts:
+            raise self.error
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self.parts):
+                yield self.parts[index]
+                index += 1
+            if self.finished:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+    async def text(self) -> str:
+        """The complete reply, once the producer is done; stops following afterwards"""
+        try:
+            return "".join([part async for part in self])
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Stop following; when nobody is left, an unfinished producer is cancelled"""
+        self.followers -= 1
+        if self.followers <= 0 and not self.finished and self.on_abandoned is not None:
+            self.on_abandoned()
+
+
+class ReplyCoalescer:
+    """Single-flight LLM calls: concurrent requests with the same key share one reply.
+
+    The producer runs as its own task, so it isn't cancelled when the request
+    that started it disconnects while others still follow the reply. Once
+    every follower has closed, the producer is cancelled, freeing the
+    upstream call and its LLM slot.
+    """
+
+    def __init__(self):
+        self._replies: Dict[Hashable, SharedReply] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.calls = 0
+        self.shared = 0
+        self.abandoned = 0
+
+    def join(self, key: Hashable, produce: Callable[[SharedReply], Awaitable[None]]) -> Tuple[SharedReply, bool]:
+        """Follow the in-flight reply for `key`, or start `produce` for it.
+
+        Returns the reply and whether it was already in flight; the caller
+        must `close()` the reply when it stops following it.
+        """
+        reply = self._replies.get(key)
+        if reply is not None:
+            reply.followers += 1
+            self.shared += 1
+            return reply, True
+
+        reply = self._replies[key] = SharedReply()
+        reply.followers = 1
+        self.calls += 1
+        task = asyncio.create_task(self._run(key, reply, produce))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        reply.on_abandoned = lambda: self._abandon(key, reply, task)
+        return reply, False
+
+    def _abandon(self, key: Hashable, reply: SharedReply, task: asyncio.Task):
+        # Requests arriving before the cancellation lands start a fresh call
+        if self._replies.get(key) is reply:
+            del self._replies[key]
+        self.abandoned += 1
+        task.cancel()
+
+    async def _run(self, key: Hashable, reply: SharedReply, produce: Callable[[SharedReply], Awaitable[None]]):
+        try:
+            await produce(reply)
+        except BaseException as e:
+            # Every follower raises it; the endpoints log it
+            reply.finish(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        else:
+            reply.finish()
+        finally:
+            # New requests after this point start a fresh call (or hit the response cache)
+            if self._replies.get(key) is reply:
+                del self._replies[key]
+
+    def stats(self) -> Dict:
+        """Upstream calls started, requests that shared one instead, and calls cancelled with no one left"""
+        return {"in_flight": len(self._replies), "calls": self.calls, "shared": self.shared,
+                "abandoned": self.abandoned}
+
+    async def close(self):
+        """Cancel in-flight producers (call on shutdown)"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
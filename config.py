@@ -6,6 +6,148 @@ load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 MODEL_NAME = "meta-llama/llama-4-scout-17b-16e-instruct"  # Groq's Llama 4 model
 
+# Models to try in order (comma-separated): the first serves all traffic,
+# the next takes over when it keeps failing or its circuit breaker is open
+LLM_MODELS = [model.strip() for model in os.getenv("LLM_MODELS", MODEL_NAME).split(",") if model.strip()]
+
+# Each API attempt times out after LLM_TIMEOUT seconds and a whole call,
+# retries and fallbacks included, gives up after LLM_DEADLINE seconds
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "45"))
+
+# Rate limits (429), server errors and timeouts are retried up to
+# LLM_MAX_RETRIES times per model, with jittered exponential backoff
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_MS = float(os.getenv("LLM_RETRY_BASE_MS", "250"))
+LLM_RETRY_MAX_MS = float(os.getenv("LLM_RETRY_MAX_MS", "4000"))
+
+# A model's circuit opens when LLM_BREAKER_FAILURE_RATE of its last
+# LLM_BREAKER_WINDOW attempts failed; it is then skipped for
+# LLM_BREAKER_RESET_SECONDS, after which one trial call is let through
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_FAILURE_RATE = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# LLM concurrency limits: requests beyond MAX_CONCURRENCY wait in a queue of
+# at most MAX_QUEUE entries, anything past that is rejected with a 503.
+# Queued requests are served round-robin across visitors, not first come first served
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "256"))
+
+# Upstream (Groq) HTTP connection pool: at most UPSTREAM_MAX_CONNECTIONS
+# connections, idle ones kept for reuse for UPSTREAM_KEEPALIVE_SECONDS.
+# HTTP/2 (one multiplexed connection) is used if the h2 package is installed
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "40"))
+UPSTREAM_KEEPALIVE_SECONDS = float(os.getenv("UPSTREAM_KEEPALIVE_SECONDS", "90"))
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "true").lower() in ("1", "true", "yes")
+# At startup UPSTREAM_WARM_CONNECTIONS connections are opened with a cheap
+# request (0 disables), and while no chats use them they are pinged every
+# UPSTREAM_PING_SECONDS so they don't go cold (0 disables)
+UPSTREAM_WARM_CONNECTIONS = int(os.getenv("UPSTREAM_WARM_CONNECTIONS", "2"))
+UPSTREAM_PING_SECONDS = float(os.getenv("UPSTREAM_PING_SECONDS", "30"))
+
+# Chat rate limits (token buckets): each visitor (user_id, else session_id,
+# else client IP) may send RATE_LIMIT_PER_MINUTE messages a minute with
+# bursts of RATE_LIMIT_BURST, and each client IP RATE_LIMIT_IP_PER_MINUTE
+# with bursts of RATE_LIMIT_IP_BURST. Excess requests get a 429; 0 disables
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "10"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "5"))
+RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", "60"))
+RATE_LIMIT_IP_BURST = float(os.getenv("RATE_LIMIT_IP_BURST", "20"))
+# "memory" keeps buckets per worker; "sqlite" shares them between the
+# workers on a host through the RATE_LIMIT_DATABASE file
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_DATABASE = os.getenv("RATE_LIMIT_DATABASE", "rate_limits.db")
+# Reverse proxies in front of the app that append the address they received
+# a request from to X-Forwarded-For; the client IP is the entry the
+# outermost one appended. Entries to the left of it are written by the
+# client and never trusted. 0 uses the connecting address
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+# Send only the RESUME_TOP_K resume sections most relevant to the question
+# (BM25 over "=== SECTION ===" blocks) instead of the whole resume
+RESUME_RETRIEVAL = os.getenv("RESUME_RETRIEVAL", "true").lower() in ("1", "true", "yes")
+RESUME_TOP_K = int(os.getenv("RESUME_TOP_K", "3"))
+
+# Conversation history sent with each request is chosen by token budget:
+# up to CONTEXT_MAX_MESSAGES recent messages, newest first, until the
+# estimated CONTEXT_TOKEN_BUDGET is used (the oldest turn kept may be trimmed)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+CONTEXT_MAX_MESSAGES = int(os.getenv("CONTEXT_MAX_MESSAGES", "20"))
+
+# Rolling summaries of long sessions: every SUMMARY_EVERY_TURNS turns a
+# background LLM call folds everything but the last SUMMARY_KEEP_TURNS turns
+# into a stored summary, which is sent once history no longer fits the prompt
+SUMMARY_EVERY_TURNS = int(os.getenv("SUMMARY_EVERY_TURNS", "6"))  # 0 disables
+SUMMARY_KEEP_TURNS = int(os.getenv("SUMMARY_KEEP_TURNS", "4"))
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "2"))
+
+# Cache of answers to first-turn questions, keyed by normalized question and
+# prompt version. SIMILARITY is the TF-IDF cosine score needed to reuse the
+# answer to a differently worded question (0 disables fuzzy matching)
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "500"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "86400"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.8"))
+# While no model can answer, a cached answer to a question at least this
+# similar (the response cache's own threshold by default) is served instead
+# of the "temporarily unavailable" error (0 disables)
+DEGRADED_SIMILARITY = float(os.getenv("DEGRADED_SIMILARITY", "0.8"))
+
+# Concurrent first-turn requests with the same normalized question and
+# prompt version share one LLM call (each still gets its own session)
+COALESCE_FIRST_TURN = os.getenv("COALESCE_FIRST_TURN", "true").lower() in ("1", "true", "yes")
+
+# Several workers (uvicorn --workers N) can share one database: they look
+# sessions up in it rather than trusting their context caches, which are
+# checked against each session's message count, and a scheduled cleanup or
+# archive runs in one worker at a time (the others skip that round).
+# Still kept per worker, so run a single worker where they matter:
+# - the response cache: each worker fills its own; a resume update clears
+#   all of them within RESUME_POLL_SECONDS
+# - the summary cache: another worker's new summary is seen within 5
+#   minutes, and SUMMARY_EVERY_TURNS counts each worker's turns separately
+# - the WRITE_BEHIND queue: other workers see a message only once it is
+#   flushed, so a visitor's next turn handled elsewhere within
+#   WRITE_BEHIND_INTERVAL_MS can miss it from its context (keep it off)
+# - "memory" rate limit buckets: each worker allows the full burst (use
+#   RATE_LIMIT_BACKEND=sqlite)
+
+# Sessions inactive for CLEANUP_DAYS_OLD days are deleted in the background
+# every CLEANUP_INTERVAL_HOURS (0 disables; DELETE /sessions/cleanup still works)
+CLEANUP_INTERVAL_HOURS = float(os.getenv("CLEANUP_INTERVAL_HOURS", "24"))
+CLEANUP_DAYS_OLD = int(os.getenv("CLEANUP_DAYS_OLD", "30"))
+
+# Sessions inactive for ARCHIVE_DAYS_OLD days are moved out of the database
+# into compressed archive segments every ARCHIVE_INTERVAL_HOURS (0 disables;
+# POST /sessions/archive still works). History reads find them there, and a
+# visitor who comes back moves their session back. SQLite backend only.
+ARCHIVE_INTERVAL_HOURS = float(os.getenv("ARCHIVE_INTERVAL_HOURS", "24"))
+ARCHIVE_DAYS_OLD = int(os.getenv("ARCHIVE_DAYS_OLD", "7"))
+
+# Resume updates are stored in the database; each worker checks for a newer
+# version this often (0 disables polling; the worker that handled the update
+# switches immediately either way)
+RESUME_POLL_SECONDS = float(os.getenv("RESUME_POLL_SECONDS", "2"))
+
+# POST /chat/batch is off unless BATCH_TOKEN is set; callers send it as
+# "Authorization: Bearer <token>". A batch takes at most BATCH_MAX_QUESTIONS
+# questions, each charged to the rate limits, and answers up to
+# BATCH_MAX_CONCURRENCY of them at a time
+BATCH_TOKEN = os.getenv("BATCH_TOKEN", "")
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+# Largest page (in exchanges) the paginated history endpoint will return
+HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", "200"))
+
+# Serve static/ through the asset pipeline: content-hashed copies with
+# gzip/brotli versions and resized image variants, built into
+# ASSET_BUILD_DIR at startup (or ahead of time with `python assets.py`)
+STATIC_PIPELINE = os.getenv("STATIC_PIPELINE", "true").lower() in ("1", "true", "yes")
+ASSET_BUILD_DIR = os.getenv("ASSET_BUILD_DIR", ".assets")
+# Widths (px) of the WebP/AVIF/PNG variants made of each image
+ASSET_IMAGE_WIDTHS = [int(width) for width in os.getenv("ASSET_IMAGE_WIDTHS", "72,144,288").split(",") if width.strip()]
+
 # Resume content will be stored here
 RESUME_CONTENT = """
 NAFIS AHMED KHAN
@@ -1,50 +1,371 @@
 import sqlite3
 import json
 import uuid
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Iterator, AsyncIterator, NamedTuple, Optional, Tuple
 import os
 
-DATABASE_PATH = "chat_sessions.db"
+try:
+    import fcntl
+except ImportError:  # not on Windows: scheduled jobs then run in every worker
+    fcntl = None
+
+from archive import SegmentArchive
+from cache import LRUCache
+from storage import ChatStore, history_messages
+
+logger = logging.getLogger(__name__)
+
+DATABASE_PATH = os.getenv("DATABASE_PATH", "chat_sessions.db")
+
+# Connection tuning (see https://www.sqlite.org/pragma.html)
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # NORMAL is durable enough under WAL
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_STATEMENT_CACHE = 128
+
+# Upper bound for "id < ?" when no pagination cursor is given
+MAX_ROW_ID = 2 ** 63 - 1
+
+# Threads that run database calls for AsyncDatabaseManager
+DB_THREADS = int(os.getenv("DB_THREADS", "1"))
+
+# Write-behind mode: save_message queues rows in memory and a background
+# thread writes them in one transaction every INTERVAL_MS or MAX_ROWS rows
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_INTERVAL_MS = int(os.getenv("WRITE_BEHIND_INTERVAL_MS", "50"))
+WRITE_BEHIND_MAX_ROWS = int(os.getenv("WRITE_BEHIND_MAX_ROWS", "500"))
+
+# In-process cache of the most recent turns per session, so building the
+# prompt for an active conversation doesn't touch the disk
+CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", "1000"))  # sessions, 0 disables
+CONTEXT_CACHE_TURNS = int(os.getenv("CONTEXT_CACHE_TURNS", "10"))  # user/bot exchanges per session
+CONTEXT_CACHE_TTL = float(os.getenv("CONTEXT_CACHE_TTL", "900"))  # seconds
+
+# Cleanup deletes expired sessions in short transactions of at most
+# CLEANUP_BATCH_ROWS messages or CLEANUP_BATCH_SESSIONS sessions, pausing
+# CLEANUP_BATCH_PAUSE_MS between them so other writers get the lock
+CLEANUP_BATCH_ROWS = int(os.getenv("CLEANUP_BATCH_ROWS", "1000"))
+CLEANUP_BATCH_SESSIONS = int(os.getenv("CLEANUP_BATCH_SESSIONS", "200"))
+CLEANUP_BATCH_PAUSE_MS = int(os.getenv("CLEANUP_BATCH_PAUSE_MS", "10"))
+# Space reclaimed after cleanup: "off", "incremental" (CLEANUP_VACUUM_PAGES
+# pages per step) or "full" (one VACUUM, which also converts older
+# databases to incremental auto-vacuum)
+CLEANUP_VACUUM = os.getenv("CLEANUP_VACUUM", "incremental").lower()
+CLEANUP_VACUUM_PAGES = int(os.getenv("CLEANUP_VACUUM_PAGES", "200"))
+
+# Archival moves inactive sessions out of the database into compressed
+# segment files in ARCHIVE_DIR (default: "<database>.archive" next to it),
+# ARCHIVE_BATCH_SESSIONS sessions per segment; the last ARCHIVE_CACHE_SIZE
+# sessions read back from segments are kept in memory
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "")
+ARCHIVE_BATCH_SESSIONS = int(os.getenv("ARCHIVE_BATCH_SESSIONS", "200"))
+ARCHIVE_CACHE_SIZE = int(os.getenv("ARCHIVE_CACHE_SIZE", "100"))
+
+def _inactive_cutoff(days_old: int) -> str:
+    """Timestamp `days_old` days ago, in UTC and CURRENT_TIMESTAMP's format so it compares with last_activity"""
+    return (datetime.now(timezone.utc) - timedelta(days=days_old)).strftime('%Y-%m-%d %H:%M:%S')
+
+def _migration_base_schema(cursor: sqlite3.Cursor):
+    # Create sessions table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            title TEXT DEFAULT 'New Chat'
+        )
+    ''')
+    
+    # Create messages table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            user_message TEXT NOT NULL,
+            bot_response TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions (id)
+        )
+    ''')
+    
+    # Create index for better performance
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_session_user ON sessions(user_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id)')
+
+def _migration_prompt_version(cursor: sqlite3.Cursor):
+    # Resume/prompt version that produced each answer
+    # (databases created before migrations existed may already have it)
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(messages)')]
+    if 'prompt_version' not in columns:
+        cursor.execute('ALTER TABLE messages ADD COLUMN prompt_version TEXT')
+
+def _migration_session_summaries(cursor: sqlite3.Cursor):
+    # Rolling summary of each long session, covering messages up to last_message_id
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS session_summaries (
+            session_id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            last_message_id INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES sessions (id)
+        )
+    ''')
+
+def _migration_composite_indexes(cursor: sqlite3.Cursor):
+    # History and context read one session's messages in id order, and the
+    # sessions list reads a user's sessions by recent activity; these indexes
+    # serve both without a sort and replace their single-column prefixes
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_session_id ON messages(session_id, id)')
+    cursor.execute('DROP INDEX IF EXISTS idx_messages_session')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user_activity ON sessions(user_id, last_activity DESC)')
+    cursor.execute('DROP INDEX IF EXISTS idx_session_user')
+
+def _migration_message_count(cursor: sqlite3.Cursor):
+    # Denormalized so listing sessions doesn't join and count messages
+    cursor.execute('ALTER TABLE sessions ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('''
+        UPDATE sessions
+        SET message_count = (SELECT COUNT(*) FROM messages WHERE messages.session_id = sessions.id)
+    ''')
+
+def _migration_session_activity_index(cursor: sqlite3.Cursor):
+    # Cleanup finds expired sessions by last_activity across all users
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_activity ON sessions(last_activity)')
+
+def _migration_resume_versions(cursor: sqlite3.Cursor):
+    # Resume shared by every worker; the highest version is the current one
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resume_versions (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def _migration_archived_sessions(cursor: sqlite3.Cursor):
+    # Index of sessions moved to archive segments: the session row plus where
+    # its compressed frame is; the session's messages and summary are in the frame
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archived_sessions (
+            session_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            title TEXT,
+            created_at TIMESTAMP,
+            last_activity TIMESTAMP,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            segment TEXT NOT NULL,
+            frame_offset INTEGER NOT NULL,
+            frame_length INTEGER NOT NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_archived_user_activity ON archived_sessions(user_id, last_activity DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_archived_activity ON archived_sessions(last_activity)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_archived_segment ON archived_sessions(segment)')
+
+# Schema migrations, applied in order; never edit or reorder released entries
+MIGRATIONS = [
+    _migration_base_schema,
+    _migration_prompt_version,
+    _migration_session_summaries,
+    _migration_composite_indexes,
+    _migration_message_count,
+    _migration_session_activity_index,
+    _migration_resume_versions,
+    _migration_archived_sessions,
+]
+
+class PendingMessage(NamedTuple):
+    """A message queued by write-behind; fields in messages-table INSERT order"""
+    session_id: str
+    user_message: str
+    bot_response: str
+    timestamp: str
+    prompt_version: Optional[str]
 
 class DatabaseManager:
-    def __init__(self):
+    def __init__(self, db_path: str = DATABASE_PATH, write_behind: bool = WRITE_BEHIND,
+                 archive_dir: str = ARCHIVE_DIR):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
         self.init_database()
+        
+        # session_id -> (message count, last CONTEXT_CACHE_TURNS (user_message, bot_response) rows);
+        # the count is checked against the sessions row, which other workers update too
+        self.context_cache = LRUCache(CONTEXT_CACHE_SIZE, ttl=CONTEXT_CACHE_TTL)
+        self.context_cache_stale = 0
+        
+        # Cold tier: archived sessions, and the message rows of recently read ones
+        self.archive = SegmentArchive(archive_dir or f"{db_path}.archive")
+        self.archive_cache = LRUCache(ARCHIVE_CACHE_SIZE)
+        self.archive_reads = 0
+        self.archive_restores = 0
+        
+        # Messages queued by write-behind, oldest first
+        self.write_behind = write_behind
+        self._pending: List[PendingMessage] = []
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._flusher = None
+        if write_behind:
+            self._flusher = threading.Thread(target=self._flush_loop, name="db-write-behind", daemon=True)
+            self._flusher.start()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with WAL journaling and tuned pragmas"""
+        # cached_statements keeps compiled statements around for reuse
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=SQLITE_STATEMENT_CACHE
+        )
+        # Only takes effect for a new database (or at the next VACUUM), so it must come first
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={SQLITE_SYNCHRONOUS}')
+        conn.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}')
+        conn.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+        conn.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """Check out this thread's persistent connection.
+        
+        Commits when the block succeeds and rolls back if it raises.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    
+    def close(self):
+        """Flush queued messages and close every pooled connection (call on shutdown)"""
+        if self._flusher:
+            self._stopping.set()
+            self._flush_wakeup.set()
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+        
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+    
+    def _flush_loop(self):
+        while not self._stopping.is_set():
+            self._flush_wakeup.wait(WRITE_BEHIND_INTERVAL_MS / 1000)
+            self._flush_wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # Rows stay queued and are retried on the next tick
+                logger.error(f"Error flushing queued messages: {str(e)}")
+    
+    def flush(self) -> int:
+        """Write all queued messages in a single transaction, returning the count of rows written"""
+        with self._flush_lock:
+            with self._pending_lock:
+                batch = list(self._pending)
+            if not batch:
+                return 0
+            
+            last_activity = {}
+            message_counts = {}
+            for message in batch:
+                last_activity[message.session_id] = message.timestamp
+                message_counts[message.session_id] = message_counts.get(message.session_id, 0) + 1
+            
+            with self.connection() as conn:
+                # Rows for sessions another worker deleted or archived meanwhile are dropped:
+                # orphan rows would hide the archived history
+                written = conn.executemany('''
+                    INSERT INTO messages (session_id, user_message, bot_response, timestamp, prompt_version)
+                    SELECT ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM sessions WHERE id = ?)
+                ''', [message + (message.session_id,) for message in batch]).rowcount
+                conn.executemany('''
+                    UPDATE sessions 
+                    SET last_activity = ?, message_count = message_count + ?
+                    WHERE id = ?
+                ''', [
+                    (timestamp, message_counts[session_id], session_id)
+                    for session_id, timestamp in last_activity.items()
+                ])
+            
+            if written < len(batch):
+                logger.warning(f"Dropped {len(batch) - written} queued messages for sessions no longer in the database")
+            
+            # Only drop rows once they are committed, so readers never miss them
+            with self._pending_lock:
+                del self._pending[:len(batch)]
+            return written
+    
+    @contextmanager
+    def _consistent_read(self):
+        """Hold off flushes so a read sees each queued row exactly once"""
+        if not self.write_behind:
+            yield
+            return
+        with self._flush_lock:
+            yield
+    
+    def _pending_for(self, session_id: str) -> List[Tuple[str, str, str, Optional[str]]]:
+        """Queued (user_message, bot_response, timestamp, prompt_version) rows for a session"""
+        if not self.write_behind:
+            return []
+        with self._pending_lock:
+            return [
+                (message.user_message, message.bot_response, message.timestamp, message.prompt_version)
+                for message in self._pending if message.session_id == session_id
+            ]
     
     def init_database(self):
-        """Initialize SQLite database with required tables"""
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        # Create sessions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                title TEXT DEFAULT 'New Chat'
-            )
-        ''')
-        
-        # Create messages table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT NOT NULL,
-                user_message TEXT NOT NULL,
-                bot_response TEXT NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (session_id) REFERENCES sessions (id)
-            )
-        ''')
-        
-        # Create index for better performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_session_user ON sessions(user_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id)')
-        
-        conn.commit()
-        conn.close()
+        """Create or upgrade the schema by applying pending migrations in order.
+        
+        The schema version lives in PRAGMA user_version. Each migration runs in
+        its own IMMEDIATE transaction and re-checks the version, so several
+        workers starting at once apply each migration exactly once.
+        """
+        conn = self._connect()
+        conn.isolation_level = None  # manage transactions explicitly
+        try:
+            for number, migration in enumerate(MIGRATIONS, start=1):
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    if conn.execute('PRAGMA user_version').fetchone()[0] < number:
+                        migration(conn.cursor())
+                        conn.execute(f'PRAGMA user_version = {number}')
+                    conn.execute('COMMIT')
+                except BaseException:
+                    conn.execute('ROLLBACK')
+                    raise
+        finally:
+            conn.close()
     
     def generate_session_id(self) -> str:
         """Generate unique session ID"""
@@ -57,79 +378,152 @@ class DatabaseManager:
     def create_session(self, user_id: str, title: str = "New Chat") -> str:
         """Create new chat session"""
         session_id = self.generate_session_id()
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
+        with self.connection() as conn:
+            conn.execute('''
+                INSERT INTO sessions (id, user_id, title)
+                VALUES (?, ?, ?)
+            ''', (session_id, user_id, title))
         
-        cursor.execute('''
-            INSERT INTO sessions (id, user_id, title)
-            VALUES (?, ?, ?)
-        ''', (session_id, user_id, title))
-        
-        conn.commit()
-        conn.close()
+        # A new session has no history yet
+        self.context_cache.set(session_id, (0, []))
         return session_id
     
-    def save_message(self, session_id: str, user_message: str, bot_response: str):
+    def ensure_session(self, session_id: Optional[str], user_id: str, title: str = "New Chat") -> str:
+        """Return session_id if it exists, otherwise create a new session"""
+        # Checked in the database, not the context cache: another worker may have archived or deleted it
+        if session_id and self._claim_session(session_id):
+            return session_id
+        # A visitor coming back to an archived conversation continues it in the hot tables
+        if session_id and self.restore_session(session_id):
+            return session_id
+        return self.create_session(user_id, title)
+    
+    def save_message(self, session_id: str, user_message: str, bot_response: str,
+                     prompt_version: Optional[str] = None):
         """Save user message and bot response to database"""
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        # Save the message
-        cursor.execute('''
-            INSERT INTO messages (session_id, user_message, bot_response)
-            VALUES (?, ?, ?)
-        ''', (session_id, user_message, bot_response))
-        
-        # Update session last activity
-        cursor.execute('''
-            UPDATE sessions 
-            SET last_activity = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (session_id,))
-        
-        conn.commit()
-        conn.close()
-    
-    def get_session_history(self, session_id: str) -> List[Dict]:
-        """Get chat history for a specific session"""
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT user_message, bot_response, timestamp
-            FROM messages
-            WHERE session_id = ?
-            ORDER BY timestamp ASC
-        ''', (session_id,))
-        
-        messages = []
-        for row in cursor.fetchall():
-            messages.extend([
-                {"role": "user", "content": row[0], "timestamp": row[2]},
-                {"role": "assistant", "content": row[1], "timestamp": row[2]}
-            ])
-        
-        conn.close()
-        return messages
+        # Holding the cache lock stops a concurrent cache fill from missing this row
+        with self.context_cache.lock:
+            if self.write_behind:
+                # Same format as CURRENT_TIMESTAMP, taken now rather than at flush time
+                timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                with self._pending_lock:
+                    self._pending.append(
+                        PendingMessage(session_id, user_message, bot_response, timestamp, prompt_version)
+                    )
+                    if len(self._pending) >= WRITE_BEHIND_MAX_ROWS:
+                        self._flush_wakeup.set()
+            else:
+                with self.connection() as conn:
+                    # Save the message, unless another worker deleted or archived the session
+                    # meanwhile: an orphan row would hide the archived history
+                    if not conn.execute('''
+                        INSERT INTO messages (session_id, user_message, bot_response, prompt_version)
+                        SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM sessions WHERE id = ?)
+                    ''', (session_id, user_message, bot_response, prompt_version, session_id)).rowcount:
+                        logger.warning(f"Not saving message to session {session_id}: it is no longer in the database")
+                        self.context_cache.pop(session_id)
+                        return
+                    
+                    # Update session last activity and message count
+                    conn.execute('''
+                        UPDATE sessions 
+                        SET last_activity = CURRENT_TIMESTAMP, message_count = message_count + 1
+                        WHERE id = ?
+                    ''', (session_id,))
+            
+            # Keep the cached context in step with what was just written
+            cached = self.context_cache.peek(session_id)
+            if cached is not None:
+                count, rows = cached
+                rows = rows[-(CONTEXT_CACHE_TURNS - 1):] if CONTEXT_CACHE_TURNS > 1 else []
+                rows.append((user_message, bot_response))
+                self.context_cache.set(session_id, (count + 1, rows))
+    
+    def get_session_history(self, session_id: str, before_id: Optional[int] = None,
+                            limit: Optional[int] = None) -> List[Dict]:
+        """Get chat history for a specific session.
+        
+        With `limit`, returns only the latest `limit` exchanges older than
+        `before_id` (keyset pagination: pass the smallest id of one page as
+        `before_id` to get the page before it). Messages not yet written by
+        write-behind have id None and only appear on the latest page.
+        """
+        with self._consistent_read(), self.connection() as conn:
+            rows = conn.execute('''
+                SELECT id, user_message, bot_response, timestamp, prompt_version
+                FROM messages
+                WHERE session_id = ? AND id < ?
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (session_id, before_id or MAX_ROW_ID, -1 if limit is None else limit)).fetchall()
+            rows.reverse()  # Chronological order
+            if before_id is None:
+                rows.extend((None,) + row for row in self._pending_for(session_id))
+        
+        # Archived sessions have no rows here; read them from their segment
+        if not rows:
+            archived = self._archived_rows(session_id)
+            if archived:
+                rows = [row for row in archived if row[0] < (before_id or MAX_ROW_ID)]
+        
+        if limit is not None:
+            rows = rows[-limit:] if limit else []
+        return history_messages(rows)
+    
+    def iter_session_history(self, session_id: str, batch_size: int = 500) -> Iterator[Dict]:
+        """Yield a session's messages oldest first, reading batch_size exchanges at a time"""
+        after_id = 0
+        while True:
+            rows, done = self._history_batch(session_id, after_id, batch_size)
+            yield from history_messages(rows)
+            if done:
+                return
+            after_id = rows[-1][0]
+    
+    def _history_batch(self, session_id: str, after_id: int, limit: int) -> Tuple[List[tuple], bool]:
+        """Up to `limit` rows with id > after_id; once the table is exhausted, queued rows too"""
+        # Each batch is its own short read, so no transaction stays open between batches
+        with self._consistent_read(), self.connection() as conn:
+            rows = conn.execute('''
+                SELECT id, user_message, bot_response, timestamp, prompt_version
+                FROM messages
+                WHERE session_id = ? AND id > ?
+                ORDER BY id ASC
+                LIMIT ?
+            ''', (session_id, after_id, limit)).fetchall()
+            done = len(rows) < limit
+            if done:
+                rows.extend((None,) + row for row in self._pending_for(session_id))
+        
+        if not rows:
+            archived = self._archived_rows(session_id)
+            if archived:
+                rows = [row for row in archived if row[0] > after_id][:limit]
+                done = len(rows) < limit
+        return rows, done
     
     def get_user_sessions(self, user_id: str, limit: int = 5) -> List[Dict]:
         """Get recent sessions for a user (last 4-5 sessions)"""
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT s.id, s.title, s.created_at, s.last_activity,
-                   COUNT(m.id) as message_count
-            FROM sessions s
-            LEFT JOIN messages m ON s.id = m.session_id
-            WHERE s.user_id = ?
-            GROUP BY s.id
-            ORDER BY s.last_activity DESC
-            LIMIT ?
-        ''', (user_id, limit))
+        with self.connection() as conn:
+            rows = conn.execute('''
+                SELECT id, title, created_at, last_activity, message_count
+                FROM sessions
+                WHERE user_id = ?
+                ORDER BY last_activity DESC
+                LIMIT ?
+            ''', (user_id, limit)).fetchall()
+            # Archived sessions are listed too; merging two short lists beats sorting a UNION
+            rows += conn.execute('''
+                SELECT session_id, title, created_at, last_activity, message_count
+                FROM archived_sessions
+                WHERE user_id = ?
+                ORDER BY last_activity DESC
+                LIMIT ?
+            ''', (user_id, limit)).fetchall()
+        rows = sorted(rows, key=lambda row: row[3], reverse=True)[:limit]
         
         sessions = []
-        for row in cursor.fetchall():
+        for row in rows:
             sessions.append({
                 "id": row[0],
                 "title": row[1],
@@ -137,66 +531,604 @@ class DatabaseManager:
                 "last_activity": row[3],
                 "message_count": row[4]
             })
-        
-        conn.close()
         return sessions
     
     def session_exists(self, session_id: str) -> bool:
-        """Check if session exists"""
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
+        """Check if session exists (in the database or the archive)"""
+        with self.connection() as conn:
+            row = conn.execute('''
+                SELECT 1 FROM sessions WHERE id = ?
+                UNION ALL
+                SELECT 1 FROM archived_sessions WHERE session_id = ?
+            ''', (session_id, session_id)).fetchone()
+        return row is not None
+    
+    def _claim_session(self, session_id: str) -> bool:
+        """Whether the session is in the sessions table, marking it active if it has idled an hour.
+        
+        A session about to get a message then isn't picked by a scheduled
+        archive or cleanup (in any worker) while the reply is generated.
+        """
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT last_activity < datetime('now', '-1 hour') FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            if row[0]:
+                conn.execute('UPDATE sessions SET last_activity = CURRENT_TIMESTAMP WHERE id = ?', (session_id,))
+        return True
+    
+    def _session_is_hot(self, session_id: str) -> bool:
+        with self.connection() as conn:
+            row = conn.execute('SELECT 1 FROM sessions WHERE id = ?', (session_id,)).fetchone()
+        return row is not None
+    
+    def cleanup_old_sessions(self, days_old: int = 30, vacuum: str = CLEANUP_VACUUM) -> Dict:
+        """Clean up sessions older than specified days, in short batches.
         
-        cursor.execute('SELECT 1 FROM sessions WHERE id = ?', (session_id,))
-        exists = cursor.fetchone() is not None
+        Returns counts of deleted rows, pages reclaimed and seconds spent.
+        """
+        start = time.perf_counter()
+        cutoff_date = _inactive_cutoff(days_old)
+        stats = {"sessions": 0, "messages": 0, "summaries": 0, "archived_sessions": 0, "segments_removed": 0,
+                 "batches": 0, "pages_freed": 0}
+        self.flush()
         
-        conn.close()
-        return exists
+        while self._cleanup_batch(cutoff_date, stats):
+            time.sleep(CLEANUP_BATCH_PAUSE_MS / 1000)
+        while self._cleanup_archive_batch(cutoff_date, stats):
+            time.sleep(CLEANUP_BATCH_PAUSE_MS / 1000)
+        while True:
+            freed = self._vacuum(vacuum)
+            stats["pages_freed"] += freed
+            if vacuum != "incremental" or not freed:
+                break
+            time.sleep(CLEANUP_BATCH_PAUSE_MS / 1000)
+        
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
     
-    def cleanup_old_sessions(self, days_old: int = 30):
-        """Clean up sessions older than specified days"""
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
+    def _cleanup_batch(self, cutoff_date: str, stats: Dict) -> bool:
+        """Delete one bounded batch of expired rows; False once nothing is left"""
+        session_ids = []
+        with self.connection() as conn:
+            # Messages first (foreign key constraint); the activity check runs in
+            # the same statement, so a session revived meanwhile keeps its messages
+            deleted = conn.execute('''
+                DELETE FROM messages
+                WHERE id IN (
+                    SELECT m.id FROM sessions s
+                    JOIN messages m ON m.session_id = s.id
+                    WHERE s.last_activity < ?
+                    LIMIT ?
+                )
+            ''', (cutoff_date, CLEANUP_BATCH_ROWS)).rowcount
+            stats["messages"] += deleted
+            
+            if not deleted:
+                session_ids = [row[0] for row in conn.execute('''
+                    SELECT id FROM sessions
+                    WHERE last_activity < ?
+                    LIMIT ?
+                ''', (cutoff_date, CLEANUP_BATCH_SESSIONS))]
+                if not session_ids:
+                    return False
+                
+                placeholders = ",".join("?" * len(session_ids))
+                stats["summaries"] += conn.execute(
+                    f'DELETE FROM session_summaries WHERE session_id IN ({placeholders})', session_ids
+                ).rowcount
+                stats["sessions"] += conn.execute(
+                    f'DELETE FROM sessions WHERE id IN ({placeholders})', session_ids
+                ).rowcount
         
-        cutoff_date = datetime.now() - timedelta(days=days_old)
+        for session_id in session_ids:
+            self.context_cache.pop(session_id)
+        stats["batches"] += 1
+        self._checkpoint()
+        return True
+    
+    def _vacuum(self, mode: str) -> int:
+        """Reclaim free pages ("incremental": one step of CLEANUP_VACUUM_PAGES); returns pages freed"""
+        if mode not in ("incremental", "full"):
+            return 0
+        with self.connection() as conn:
+            before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            incremental = conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+            if mode == "full":
+                if before or not incremental:
+                    conn.execute('VACUUM')
+            elif not incremental:
+                logger.warning("Database predates incremental auto-vacuum; run cleanup once with vacuum=full")
+                return 0
+            elif before:
+                # execute() would step the pragma once, freeing a single page
+                conn.executescript(f'PRAGMA incremental_vacuum({CLEANUP_VACUUM_PAGES})')
+            freed = before - conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if freed:
+            self._checkpoint()
+        return freed
+    
+    def _checkpoint(self):
+        """Copy the WAL back into the database now, so the cost of a large
+        checkpoint isn't paid by whichever request commits next"""
+        with self.connection() as conn:
+            conn.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchall()
+    
+    @contextmanager
+    def job_lock(self, name: str) -> Iterator[bool]:
+        """Yields whether this process got the `name` job's lock, a file lock next to the database.
         
-        # Delete old messages first (foreign key constraint)
-        cursor.execute('''
-            DELETE FROM messages 
-            WHERE session_id IN (
-                SELECT id FROM sessions 
-                WHERE last_activity < ?
-            )
-        ''', (cutoff_date,))
+        Doesn't wait: a worker that finds another one running the job skips it.
+        """
+        if fcntl is None:
+            yield True
+            return
+        with open(f"{self.db_path}.{name}.lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def archive_old_sessions(self, days_old: int = 7, vacuum: str = CLEANUP_VACUUM) -> Dict:
+        """Move sessions inactive for days_old days into archive segments, in short batches.
+        
+        Each batch writes one segment of up to ARCHIVE_BATCH_SESSIONS sessions,
+        then swaps their rows for index entries in one short transaction.
+        Returns counts of archived rows, uncompressed and compressed bytes,
+        pages reclaimed and seconds spent.
+        """
+        start = time.perf_counter()
+        cutoff_date = _inactive_cutoff(days_old)
+        stats = {"sessions": 0, "messages": 0, "segments": 0, "raw_bytes": 0, "archived_bytes": 0,
+                 "batches": 0, "pages_freed": 0}
         
-        # Delete old sessions
-        cursor.execute('''
-            DELETE FROM sessions 
-            WHERE last_activity < ?
-        ''', (cutoff_date,))
+        while self._archive_batch(cutoff_date, stats):
+            time.sleep(CLEANUP_BATCH_PAUSE_MS / 1000)
+        while True:
+            freed = self._vacuum(vacuum)
+            stats["pages_freed"] += freed
+            if vacuum != "incremental" or not freed:
+                break
+            time.sleep(CLEANUP_BATCH_PAUSE_MS / 1000)
         
-        conn.commit()
-        conn.close()
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+    
+    def _archive_batch(self, cutoff_date: str, stats: Dict) -> bool:
+        """Archive one segment's worth of inactive sessions; False once none are left"""
+        # Queued rows would otherwise land after their session had moved out
+        self.flush()
+        with self.connection() as conn:
+            sessions = [
+                dict(zip(("id", "user_id", "title", "created_at", "last_activity", "message_count"), row))
+                for row in conn.execute('''
+                    SELECT id, user_id, title, created_at, last_activity, message_count
+                    FROM sessions
+                    WHERE last_activity < ?
+                    ORDER BY last_activity
+                    LIMIT ?
+                ''', (cutoff_date, ARCHIVE_BATCH_SESSIONS))
+            ]
+            if not sessions:
+                return False
+            
+            session_ids = [session["id"] for session in sessions]
+            placeholders = ",".join("?" * len(session_ids))
+            rows: Dict[str, List[tuple]] = {}
+            for row in conn.execute(f'''
+                SELECT session_id, id, user_message, bot_response, timestamp, prompt_version
+                FROM messages
+                WHERE session_id IN ({placeholders})
+                ORDER BY session_id, id
+            ''', session_ids):
+                rows.setdefault(row[0], []).append(row[1:])
+            summaries = {
+                row[0]: {"summary": row[1], "last_message_id": row[2], "updated_at": row[3]}
+                for row in conn.execute(f'''
+                    SELECT session_id, summary, last_message_id, updated_at
+                    FROM session_summaries
+                    WHERE session_id IN ({placeholders})
+                ''', session_ids)
+            }
+        
+        # The segment is written and synced before any row leaves the database
+        segment, frames, raw_bytes = self.archive.write_segment([
+            (session, summaries.get(session["id"]), rows.get(session["id"], [])) for session in sessions
+        ])
+        
+        archived = []
+        with self._consistent_read(), self.connection() as conn:
+            for session, (offset, length) in zip(sessions, frames):
+                # A session written to since it was read stays (its frame is dead weight in the segment)
+                if self._pending_for(session["id"]) or not conn.execute('''
+                    DELETE FROM sessions WHERE id = ? AND last_activity = ? AND message_count = ?
+                ''', (session["id"], session["last_activity"], session["message_count"])).rowcount:
+                    continue
+                conn.execute('DELETE FROM messages WHERE session_id = ?', (session["id"],))
+                conn.execute('DELETE FROM session_summaries WHERE session_id = ?', (session["id"],))
+                conn.execute('''
+                    INSERT INTO archived_sessions
+                        (session_id, user_id, title, created_at, last_activity, message_count,
+                         segment, frame_offset, frame_length)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (session["id"], session["user_id"], session["title"], session["created_at"],
+                      session["last_activity"], session["message_count"], segment, offset, length))
+                archived.append(session["id"])
+        
+        if archived:
+            stats["sessions"] += len(archived)
+            stats["messages"] += sum(len(rows.get(session_id, [])) for session_id in archived)
+            stats["segments"] += 1
+            stats["raw_bytes"] += raw_bytes
+            stats["archived_bytes"] += frames[-1][0] + frames[-1][1]
+        else:
+            self.archive.remove(segment)
+        for session_id in archived:
+            self.context_cache.pop(session_id)
+        stats["batches"] += 1
+        self._checkpoint()
+        return True
+    
+    def _archive_entry(self, session_id: str) -> Optional[Tuple[str, int, int]]:
+        """(segment, offset, length) of an archived session's frame, None if it isn't archived"""
+        with self.connection() as conn:
+            return conn.execute('''
+                SELECT segment, frame_offset, frame_length FROM archived_sessions WHERE session_id = ?
+            ''', (session_id,)).fetchone()
+    
+    def _archived_rows(self, session_id: str) -> Optional[List[tuple]]:
+        """Message rows of an archived session, read from its segment; None if it isn't archived"""
+        rows = self.archive_cache.get(session_id)
+        if rows is None:
+            entry = self._archive_entry(session_id)
+            if entry is None:
+                return None
+            rows = self.archive.read(*entry)[2]
+            self.archive_reads += 1
+            self.archive_cache.set(session_id, rows)
+        return rows
+    
+    def restore_session(self, session_id: str) -> bool:
+        """Move an archived session back into the database; False if it isn't archived"""
+        entry = self._archive_entry(session_id)
+        if entry is None:
+            return False
+        session, summary, rows = self.archive.read(*entry)
+        self.archive_reads += 1
+        
+        with self.connection() as conn:
+            # Only the worker that removes the index entry restores the session
+            if not conn.execute('DELETE FROM archived_sessions WHERE session_id = ?', (session_id,)).rowcount:
+                restored = False
+            else:
+                restored = True
+                # Coming back counts as activity, so the next archive run doesn't move it straight out again
+                conn.execute('''
+                    INSERT INTO sessions (id, user_id, title, created_at, last_activity, message_count)
+                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+                ''', (session["id"], session["user_id"], session["title"], session["created_at"],
+                      session["message_count"]))
+                conn.executemany('''
+                    INSERT INTO messages (id, session_id, user_message, bot_response, timestamp, prompt_version)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', [(row[0], session_id) + tuple(row[1:]) for row in rows])
+                if summary is not None:
+                    conn.execute('''
+                        INSERT INTO session_summaries (session_id, summary, last_message_id, updated_at)
+                        VALUES (?, ?, ?, ?)
+                    ''', (session_id, summary["summary"], summary["last_message_id"], summary["updated_at"]))
+                segment_empty = conn.execute(
+                    'SELECT 1 FROM archived_sessions WHERE segment = ? LIMIT 1', (entry[0],)
+                ).fetchone() is None
+        
+        if not restored:
+            # Another worker restored it first
+            return self._session_is_hot(session_id)
+        if segment_empty:
+            self.archive.remove(entry[0])
+        self.archive_cache.pop(session_id)
+        self.context_cache.pop(session_id)
+        self.archive_restores += 1
+        return True
+    
+    def _cleanup_archive_batch(self, cutoff_date: str, stats: Dict) -> bool:
+        """Drop one batch of expired archived sessions, and segments left empty; False once none are left"""
+        with self.connection() as conn:
+            expired = conn.execute('''
+                SELECT session_id, segment FROM archived_sessions
+                WHERE last_activity < ?
+                LIMIT ?
+            ''', (cutoff_date, CLEANUP_BATCH_SESSIONS)).fetchall()
+            if not expired:
+                return False
+            conn.executemany('DELETE FROM archived_sessions WHERE session_id = ?', [(row[0],) for row in expired])
+            empty_segments = [
+                segment for segment in {row[1] for row in expired}
+                if conn.execute('SELECT 1 FROM archived_sessions WHERE segment = ? LIMIT 1', (segment,)).fetchone() is None
+            ]
+        
+        for segment in empty_segments:
+            self.archive.remove(segment)
+        for session_id, _ in expired:
+            self.archive_cache.pop(session_id)
+        stats["archived_sessions"] += len(expired)
+        stats["segments_removed"] += len(empty_segments)
+        stats["batches"] += 1
+        return True
+    
+    def archive_stats(self) -> Dict:
+        """Archive location, codec and how often sessions were read back from it"""
+        return {
+            "enabled": True,
+            "directory": self.archive.directory,
+            "compression": self.archive.codec,
+            "reads": self.archive_reads,
+            "restores": self.archive_restores,
+            "cache": self.archive_cache.stats(),
+        }
     
     def get_conversation_context(self, session_id: str, max_messages: int = 10) -> List[Dict]:
         """Get recent conversation context for AI model"""
-        conn = sqlite3.connect(DATABASE_PATH)
-        cursor = conn.cursor()
+        limit = max_messages // 2  # Divide by 2 since each row has user + bot message
         
-        cursor.execute('''
-            SELECT user_message, bot_response
-            FROM messages
-            WHERE session_id = ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-        ''', (session_id, max_messages // 2))  # Divide by 2 since each row has user + bot message
+        if limit <= CONTEXT_CACHE_TURNS:
+            with self.context_cache.lock:
+                # Other workers write, archive and delete sessions too: cached rows are used
+                # only while the session's message count is unchanged (a primary-key lookup)
+                count = self._message_count(session_id)
+                cached = self.context_cache.peek(session_id)
+                if cached is not None and cached[0] != count:
+                    self.context_cache.pop(session_id)
+                    self.context_cache_stale += 1
+                cached = self.context_cache.get(session_id)
+                if cached is not None:
+                    rows = cached[1]
+                elif count is not None:
+                    rows = self._recent_rows(session_id, CONTEXT_CACHE_TURNS)
+                    self.context_cache.set(session_id, (count, rows))
+                else:
+                    # Archived (or unknown) sessions stay out of the cache
+                    rows = [row[1:3] for row in self._archived_rows(session_id) or []]
+            rows = rows[-limit:] if limit else []
+        else:
+            rows = self._recent_rows(session_id, limit)
+            if not rows:
+                rows = [row[1:3] for row in self._archived_rows(session_id) or []][-limit:]
         
         context = []
-        for row in reversed(cursor.fetchall()):  # Reverse to get chronological order
+        for row in rows:
             context.append({"role": "user", "content": row[0]})
             context.append({"role": "assistant", "content": row[1]})
-        
-        conn.close()
         return context
+    
+    def _message_count(self, session_id: str) -> Optional[int]:
+        """Exchanges in a session, this worker's queued ones included; None if it isn't in the sessions table"""
+        with self._consistent_read(), self.connection() as conn:
+            row = conn.execute('SELECT message_count FROM sessions WHERE id = ?', (session_id,)).fetchone()
+            if row is None:
+                return None
+            return row[0] + len(self._pending_for(session_id))
+    
+    def _recent_rows(self, session_id: str, limit: int) -> List[Tuple[str, str]]:
+        """Last `limit` (user_message, bot_response) rows in chronological order"""
+        with self._consistent_read(), self.connection() as conn:
+            rows = conn.execute('''
+                SELECT user_message, bot_response
+                FROM messages
+                WHERE session_id = ?
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (session_id, limit)).fetchall()
+            rows.reverse()  # Chronological order
+            
+            # Queued rows are newer than anything already written
+            rows.extend(row[:2] for row in self._pending_for(session_id))
+        return rows[-limit:] if limit else []
+    
+    def context_cache_stats(self) -> Dict:
+        """Hit/miss counters of the conversation context cache, and entries found stale"""
+        return {**self.context_cache.stats(), "stale": self.context_cache_stale}
+    
+    def get_summary(self, session_id: str) -> Optional[Dict]:
+        """Get the rolling summary of a session, if one has been written"""
+        with self.connection() as conn:
+            row = conn.execute('''
+                SELECT summary, last_message_id
+                FROM session_summaries
+                WHERE session_id = ?
+            ''', (session_id,)).fetchone()
+        
+        if row is None:
+            return None
+        return {"summary": row[0], "last_message_id": row[1]}
+    
+    def save_summary(self, session_id: str, summary: str, last_message_id: int):
+        """Store a session's rolling summary, covering messages up to last_message_id"""
+        with self.connection() as conn:
+            conn.execute('''
+                INSERT INTO session_summaries (session_id, summary, last_message_id)
+                VALUES (?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET
+                    summary = excluded.summary,
+                    last_message_id = excluded.last_message_id,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', (session_id, summary, last_message_id))
+    
+    def get_messages_after(self, session_id: str, after_id: int, limit: int = 50) -> List[Dict]:
+        """Get written messages with id greater than after_id, oldest first"""
+        with self.connection() as conn:
+            rows = conn.execute('''
+                SELECT id, user_message, bot_response
+                FROM messages
+                WHERE session_id = ? AND id > ?
+                ORDER BY id ASC
+                LIMIT ?
+            ''', (session_id, after_id, limit)).fetchall()
+        
+        return [{"id": row[0], "user_message": row[1], "bot_response": row[2]} for row in rows]
+    
+    def save_resume(self, content: str) -> int:
+        """Store a new resume version and return its number"""
+        with self.connection() as conn:
+            cursor = conn.execute('INSERT INTO resume_versions (content) VALUES (?)', (content,))
+            return cursor.lastrowid
+    
+    def get_resume_version(self) -> Optional[int]:
+        """Number of the latest resume version, None if none was stored"""
+        with self.connection() as conn:
+            return conn.execute('SELECT MAX(version) FROM resume_versions').fetchone()[0]
+    
+    def get_resume(self) -> Optional[Dict]:
+        """Latest resume as {"version", "content"}, None if none was stored"""
+        with self.connection() as conn:
+            row = conn.execute('''
+                SELECT version, content FROM resume_versions
+                ORDER BY version DESC
+                LIMIT 1
+            ''').fetchone()
+        return {"version": row[0], "content": row[1]} if row else None
 
-# Global database manager instance
-db_manager = DatabaseManager()
+class AsyncDatabaseManager(ChatStore):
+    """SQLite storage backend: awaitable wrapper around DatabaseManager.
+    
+    Calls are queued to dedicated database thread(s), so disk I/O never
+    blocks the event loop. Each thread keeps its own pooled connection.
+    """
+    
+    def __init__(self, manager: DatabaseManager, threads: int = DB_THREADS):
+        self.manager = manager
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="db")
+    
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+    
+    def generate_session_id(self) -> str:
+        return self.manager.generate_session_id()
+    
+    def generate_user_id(self) -> str:
+        return self.manager.generate_user_id()
+    
+    async def create_session(self, user_id: str, title: str = "New Chat") -> str:
+        return await self._run(self.manager.create_session, user_id, title)
+    
+    async def ensure_session(self, session_id: Optional[str], user_id: str, title: str = "New Chat") -> str:
+        return await self._run(self.manager.ensure_session, session_id, user_id, title)
+    
+    async def save_message(self, session_id: str, user_message: str, bot_response: str,
+                           prompt_version: Optional[str] = None):
+        return await self._run(self.manager.save_message, session_id, user_message, bot_response, prompt_version)
+    
+    async def get_session_history(self, session_id: str, before_id: Optional[int] = None,
+                                  limit: Optional[int] = None) -> List[Dict]:
+        return await self._run(self.manager.get_session_history, session_id, before_id, limit)
+    
+    async def iter_session_history(self, session_id: str, batch_size: int = 500) -> AsyncIterator[Dict]:
+        """Async version of DatabaseManager.iter_session_history"""
+        after_id = 0
+        while True:
+            rows, done = await self._run(self.manager._history_batch, session_id, after_id, batch_size)
+            for message in history_messages(rows):
+                yield message
+            if done:
+                return
+            after_id = rows[-1][0]
+    
+    async def get_user_sessions(self, user_id: str, limit: int = 5) -> List[Dict]:
+        return await self._run(self.manager.get_user_sessions, user_id, limit)
+    
+    async def session_exists(self, session_id: str) -> bool:
+        return await self._run(self.manager.session_exists, session_id)
+    
+    async def cleanup_old_sessions(self, days_old: int = 30, vacuum: str = CLEANUP_VACUUM) -> Dict:
+        """Async version of DatabaseManager.cleanup_old_sessions.
+        
+        Each batch is a separate call on the database threads, so requests
+        queued meanwhile run between batches instead of after the whole purge.
+        """
+        start = time.perf_counter()
+        cutoff_date = _inactive_cutoff(days_old)
+        stats = {"sessions": 0, "messages": 0, "summaries": 0, "archived_sessions": 0, "segments_removed": 0,
+                 "batches": 0, "pages_freed": 0}
+        await self.flush()
+        
+        while await self._run(self.manager._cleanup_batch, cutoff_date, stats):
+            await asyncio.sleep(CLEANUP_BATCH_PAUSE_MS / 1000)
+        while await self._run(self.manager._cleanup_archive_batch, cutoff_date, stats):
+            await asyncio.sleep(CLEANUP_BATCH_PAUSE_MS / 1000)
+        while True:
+            freed = await self._run(self.manager._vacuum, vacuum)
+            stats["pages_freed"] += freed
+            if vacuum != "incremental" or not freed:
+                break
+            await asyncio.sleep(CLEANUP_BATCH_PAUSE_MS / 1000)
+        
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+    
+    async def archive_old_sessions(self, days_old: int = 7, vacuum: str = CLEANUP_VACUUM) -> Dict:
+        """Async version of DatabaseManager.archive_old_sessions, one database call per batch"""
+        start = time.perf_counter()
+        cutoff_date = _inactive_cutoff(days_old)
+        stats = {"sessions": 0, "messages": 0, "segments": 0, "raw_bytes": 0, "archived_bytes": 0,
+                 "batches": 0, "pages_freed": 0}
+        
+        while await self._run(self.manager._archive_batch, cutoff_date, stats):
+            await asyncio.sleep(CLEANUP_BATCH_PAUSE_MS / 1000)
+        while True:
+            freed = await self._run(self.manager._vacuum, vacuum)
+            stats["pages_freed"] += freed
+            if vacuum != "incremental" or not freed:
+                break
+            await asyncio.sleep(CLEANUP_BATCH_PAUSE_MS / 1000)
+        
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+    
+    def archive_stats(self) -> Dict:
+        return self.manager.archive_stats()
+    
+    @asynccontextmanager
+    async def exclusive_job(self, name: str) -> AsyncIterator[bool]:
+        # Opening and locking the file doesn't block, so it stays on the event loop
+        with self.manager.job_lock(name) as acquired:
+            yield acquired
+    
+    async def get_conversation_context(self, session_id: str, max_messages: int = 10) -> List[Dict]:
+        return await self._run(self.manager.get_conversation_context, session_id, max_messages)
+    
+    def context_cache_stats(self) -> Dict:
+        return self.manager.context_cache_stats()
+    
+    async def get_summary(self, session_id: str) -> Optional[Dict]:
+        return await self._run(self.manager.get_summary, session_id)
+    
+    async def save_summary(self, session_id: str, summary: str, last_message_id: int):
+        return await self._run(self.manager.save_summary, session_id, summary, last_message_id)
+    
+    async def get_messages_after(self, session_id: str, after_id: int, limit: int = 50) -> List[Dict]:
+        return await self._run(self.manager.get_messages_after, session_id, after_id, limit)
+    
+    async def save_resume(self, content: str) -> int:
+        return await self._run(self.manager.save_resume, content)
+    
+    async def get_resume_version(self) -> Optional[int]:
+        return await self._run(self.manager.get_resume_version)
+    
+    async def get_resume(self) -> Optional[Dict]:
+        return await self._run(self.manager.get_resume)
+    
+    async def flush(self) -> int:
+        return await self._run(self.manager.flush)
+    
+    async def close(self):
+        """Finish queued calls, then close the pooled connections"""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        self.manager.close()
@@ -0,0 +1,65 @@
+import asyncio
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable
+
+
+class FairScheduler:
+    """Concurrency limit that hands free slots to waiting visitors round-robin.
+
+    Waiters queue per key (the visitor). When a slot frees up it goes to the
+    oldest waiter of the next visitor in turn, so a visitor with many queued
+    requests gets one slot per round instead of all of them, as with FIFO.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self.waiting = 0
+        self._queues: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+
+    def locked(self) -> bool:
+        return self.in_use >= self.limit
+
+    async def acquire(self, key: Hashable = ""):
+        if self.in_use < self.limit and not self.waiting:
+            self.in_use += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(future)
+        self.waiting += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the waiter was cancelled: hand the slot on
+                self.release()
+            else:
+                self._remove(key, future)
+            raise
+
+    def release(self):
+        self.in_use -= 1
+        while self._queues and self.in_use < self.limit:
+            key, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            self.waiting -= 1
+            # The visitor goes to the back of the line, or leaves it if nothing else is queued
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            if not future.done():
+                self.in_use += 1
+                future.set_result(None)
+
+    def _remove(self, key: Hashable, future: asyncio.Future):
+        queue = self._queues.get(key)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            self.waiting -= 1
+            if not queue:
+                del self._queues[key]
+
+    def stats(self) -> Dict:
+        return {"in_use": self.in_use, "waiting": self.waiting, "visitors_waiting": len(self._queues)}
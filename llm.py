@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import time
+from typing import List, Dict, Optional, Tuple
+
+from groq import AsyncGroq, NotFoundError
+
+import config
+from fairshare import FairScheduler
+from metrics import LLM_REQUESTS, LLM_TOKENS, LLM_CIRCUIT_OPEN
+from resilience import CircuitBreaker, is_retryable, retry_delay
+
+logger = logging.getLogger(__name__)
+
+
+class LLMOverloadedError(Exception):
+    """Raised when too many requests are already waiting for an LLM slot"""
+
+
+class LLMUnavailableError(Exception):
+    """Raised when no model could answer: circuits open, retries exhausted or the deadline passed"""
+
+
+def record_usage(model: str, usage):
+    """Count the prompt/completion tokens of one API call"""
+    if usage is not None:
+        LLM_TOKENS.labels(model, "prompt").inc(usage.prompt_tokens or 0)
+        LLM_TOKENS.labels(model, "completion").inc(usage.completion_tokens or 0)
+
+
+class CompletionStream:
+    """Text chunks of a streaming completion; close() frees the upstream request and LLM slot"""
+
+    def __init__(self, upstream, release, model: str = config.MODEL_NAME,
+                 breaker: Optional[CircuitBreaker] = None):
+        self._upstream = upstream
+        self._release = release
+        self._closed = False
+        self.model = model
+        self.breaker = breaker
+        self.usage = None
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._upstream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                # Groq reports usage on the last chunk, under x_groq
+                usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+                if usage is not None:
+                    self.usage = usage
+            record_usage(self.model, self.usage)
+            LLM_REQUESTS.labels(self.model, "ok").inc()
+        except Exception as e:
+            LLM_REQUESTS.labels(self.model, "error").inc()
+            # Tokens were already sent, so a mid-stream failure isn't retried
+            if self.breaker is not None and is_retryable(e):
+                self.breaker.record_failure()
+            raise
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Abort the upstream HTTP response (if still open) and release the slot"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            await self._upstream.close()
+        finally:
+            self._release()
+
+
+class LLMClient:
+    """Async Groq client with bounded concurrency and a bounded wait queue.
+
+    Free slots go to waiting visitors round-robin (see FairScheduler), so one
+    visitor's burst of requests can't hold up everyone else's.
+
+    Each call tries config.LLM_MODELS in order: retryable failures (429,
+    5xx, timeouts) are retried with jittered backoff within an overall
+    deadline, and a model whose circuit breaker is open is skipped. The Groq
+    client itself should be created with max_retries=0.
+    """
+
+    def __init__(self, client: AsyncGroq, max_concurrency: int = config.LLM_MAX_CONCURRENCY,
+                 max_queue: int = config.LLM_MAX_QUEUE, models: List[str] = config.LLM_MODELS,
+                 timeout: float = config.LLM_TIMEOUT, deadline: float = config.LLM_DEADLINE,
+                 max_retries: int = config.LLM_MAX_RETRIES):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.models = models
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.scheduler = FairScheduler(max_concurrency)
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        breaker = self.breakers.get(model)
+        if breaker is None:
+            def on_change(state: str):
+                LLM_CIRCUIT_OPEN.labels(model).set(0 if state == "closed" else 1)
+                logger.warning(f"Circuit breaker for {model} is now {state}")
+
+            breaker = self.breakers[model] = CircuitBreaker(
+                config.LLM_BREAKER_WINDOW, config.LLM_BREAKER_FAILURE_RATE, config.LLM_BREAKER_RESET_SECONDS, on_change
+            )
+        return breaker
+
+    async def _create(self, models: List[str], **kwargs) -> Tuple[str, object]:
+        """Create a completion on the first model that answers; returns (model, response)"""
+        deadline = time.monotonic() + self.deadline
+        last_error: Optional[BaseException] = None
+        for model in models:
+            breaker = self.breaker(model)
+            if not breaker.allow():
+                LLM_REQUESTS.labels(model, "circuit_open").inc()
+                continue
+
+            for attempt in range(self.max_retries + 1):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMUnavailableError(f"No answer within {self.deadline:.0f}s") from last_error
+                try:
+                    # The SDK timeout bounds each read; wait_for bounds the whole attempt
+                    response = await asyncio.wait_for(
+                        self.client.chat.completions.create(
+                            model=model, timeout=min(self.timeout, remaining), **kwargs
+                        ),
+                        min(self.timeout, remaining),
+                    )
+                except Exception as e:
+                    LLM_REQUESTS.labels(model, "error").inc()
+                    if not is_retryable(e) and not isinstance(e, NotFoundError):
+                        breaker.record_success()  # the API is up, the request was bad
+                        raise
+                    last_error = e
+                    # Unknown or retired models (404) go straight to the next model
+                    if isinstance(e, NotFoundError) or attempt == self.max_retries:
+                        break
+                    delay = retry_delay(attempt, e, config.LLM_RETRY_BASE_MS, config.LLM_RETRY_MAX_MS)
+                    if delay >= deadline - time.monotonic():
+                        break  # no time to wait; try the next model instead
+                    logger.warning(f"LLM call to {model} failed ({str(e) or type(e).__name__}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                breaker.record_success()
+                return model, response
+
+            # Out of retries on this model. The breaker counts calls, not
+            # attempts, so errors that a retry absorbs don't open it
+            breaker.record_failure()
+
+        if last_error is None:
+            raise LLMUnavailableError("Circuit breakers are open for every model")
+        raise LLMUnavailableError(f"Every model failed: {str(last_error) or type(last_error).__name__}") from last_error
+
+    @property
+    def in_flight(self) -> int:
+        return self.scheduler.in_use
+
+    @property
+    def waiting(self) -> int:
+        return self.scheduler.waiting
+
+    async def _acquire(self, model: str, visitor: str):
+        """Wait for a free LLM slot, failing fast if the queue is full"""
+        if self.scheduler.locked() and self.waiting >= self.max_queue:
+            LLM_REQUESTS.labels(model, "overloaded").inc()
+            raise LLMOverloadedError(
+                f"LLM queue is full ({self.waiting} waiting, {self.in_flight} in flight)"
+            )
+        await self.scheduler.acquire(visitor)
+
+    def _release(self):
+        self.scheduler.release()
+
+    async def complete(self, messages: List[Dict], model: Optional[str] = None,
+                       temperature: float = 0.7, max_tokens: int = 1000, visitor: str = ""):
+        """Run a chat completion without blocking the event loop.
+
+        Tries config.LLM_MODELS in order unless a `model` is given. `visitor`
+        is who the call is for, when it has to queue for a slot.
+        """
+        models = [model] if model else self.models
+        await self._acquire(models[0], visitor)
+        try:
+            model, completion = await self._create(
+                models,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+        finally:
+            self._release()
+        LLM_REQUESTS.labels(model, "ok").inc()
+        record_usage(model, completion.usage)
+        return completion
+
+    async def stream(self, messages: List[Dict], model: Optional[str] = None,
+                     temperature: float = 0.7, max_tokens: int = 1000, visitor: str = "") -> CompletionStream:
+        """Start a streaming chat completion.
+
+        Retries and fallbacks apply until the response starts. The LLM slot is
+        held until the returned stream is exhausted or closed, so callers must
+        always close it (e.g. when the client disconnects).
+        """
+        models = [model] if model else self.models
+        await self._acquire(models[0], visitor)
+        try:
+            model, upstream = await self._create(
+                models,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+            )
+        except BaseException:
+            self._release()
+            raise
+        return CompletionStream(upstream, self._release, model, self.breaker(model))
+
+    def stats(self) -> Dict:
+        """Current concurrency usage, for health checks"""
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "visitors_waiting": self.scheduler.stats()["visitors_waiting"],
+            "models": {model: self.breaker(model).stats() for model in self.models},
+        }
@@ -1,27 +1,111 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from groq import Groq
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse
+from pydantic import BaseModel, Field
 import config
+import asyncio
+import json
 import logging
-from typing import Optional, List
+import math
+import secrets
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Tuple, Union
 
 # Import for iframe security headers
 from fastapi import Response
 
-# Import database manager
-from database import db_manager
+# Storage backend (SQLite by default, PostgreSQL when DATABASE_URL points at one)
+from storage import create_store
+from database import CLEANUP_VACUUM, MAX_ROW_ID
+
+from llm import LLMClient, LLMOverloadedError, LLMUnavailableError
+from prompts import prompt_builder, build_context_window, message_tokens
+from cache import ResponseCache, normalize_question
+from coalesce import ReplyCoalescer, SharedReply
+from summaries import SessionSummarizer
+from resume_sync import ResumeSync
+from assets import AssetPipeline, StaticAssetMiddleware
+from ratelimit import create_rate_limiter
+from upstream import UpstreamPool
+from metrics import (
+    REGISTRY, CONTENT_TYPE, Counter, Gauge, HTTP_REQUESTS, HTTP_LATENCY, HTTP_IN_PROGRESS,
+    CHAT_STAGE_LATENCY, CHAT_CACHED_REPLIES, CHAT_COALESCED_REPLIES, CHAT_DEGRADED_REPLIES, CHAT_RATE_LIMITED
+)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+async def scheduled_cleanup():
+    """Delete expired sessions every CLEANUP_INTERVAL_HOURS"""
+    while True:
+        await asyncio.sleep(config.CLEANUP_INTERVAL_HOURS * 3600)
+        try:
+            # Every worker wakes up; the first to take the lock does the work
+            async with db_manager.exclusive_job("cleanup") as acquired:
+                if not acquired:
+                    logger.info("Scheduled cleanup skipped: another worker is running it")
+                    continue
+                stats = await db_manager.cleanup_old_sessions(config.CLEANUP_DAYS_OLD)
+            summarizer.clear()
+            logger.info(f"Scheduled cleanup: {stats}")
+        except Exception as e:
+            logger.error(f"Error in scheduled cleanup: {str(e)}")
+
+async def scheduled_archive():
+    """Move inactive sessions to the archive every ARCHIVE_INTERVAL_HOURS"""
+    while True:
+        await asyncio.sleep(config.ARCHIVE_INTERVAL_HOURS * 3600)
+        try:
+            async with db_manager.exclusive_job("archive") as acquired:
+                if not acquired:
+                    logger.info("Scheduled archive skipped: another worker is running it")
+                    continue
+                stats = await db_manager.archive_old_sessions(config.ARCHIVE_DAYS_OLD)
+            logger.info(f"Scheduled archive: {stats}")
+        except NotImplementedError as e:
+            logger.info(f"Scheduled archive disabled: {str(e)}")
+            return
+        except Exception as e:
+            logger.error(f"Error in scheduled archive: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await db_manager.open()
+    await resume_sync.start()
+    if upstream is not None:
+        await upstream.start()
+    if config.STATIC_PIPELINE:
+        try:
+            # Image encoding is CPU-bound; later starts reuse the build directory
+            await asyncio.to_thread(asset_pipeline.build, PAGES)
+        except Exception as e:
+            logger.error(f"Error building static assets, serving them unoptimized: {str(e)}")
+    cleanup_task = asyncio.create_task(scheduled_cleanup()) if config.CLEANUP_INTERVAL_HOURS > 0 else None
+    archive_task = asyncio.create_task(scheduled_archive()) if config.ARCHIVE_INTERVAL_HOURS > 0 else None
+    yield
+    for task in (cleanup_task, archive_task):
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    await resume_sync.close()
+    await first_turn_replies.close()
+    await rate_limiter.close()
+    await summarizer.close()
+    if upstream is not None:
+        await upstream.close()
+    # Close pooled database connections on shutdown
+    await db_manager.close()
+
 app = FastAPI(
     title="Nafis Ahmed Khan AI Agent",
     description="An AI agent that answers questions about Nafis Ahmed Khan based on his resume",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware for web frontend
@@ -33,18 +117,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Iframe security headers, added to every response
+FRAME_HEADERS = {
+    # Allow iframe embedding from any origin
+    "X-Frame-Options": "SAMEORIGIN",
+    "Content-Security-Policy": "frame-ancestors 'self' *",
+    # Additional headers for iframe compatibility
+    "X-Content-Type-Options": "nosniff",
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+}
+
 # Middleware to add iframe security headers
 @app.middleware("http")
 async def add_iframe_headers(request, call_next):
     response = await call_next(request)
-    
-    # Allow iframe embedding from any origin
-    response.headers["X-Frame-Options"] = "SAMEORIGIN"
-    response.headers["Content-Security-Policy"] = "frame-ancestors 'self' *"
-    
-    # Additional headers for iframe compatibility
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+    response.headers.update(FRAME_HEADERS)
     
     # Ensure proper CORS for iframe requests
     if request.method == "OPTIONS":
@@ -53,14 +140,106 @@ async def add_iframe_headers(request, call_next):
     
     return response
 
+# Request counts and latency per route; streamed responses are timed until headers are sent
+@app.middleware("http")
+async def record_metrics(request, call_next):
+    HTTP_IN_PROGRESS.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_PROGRESS.dec()
+        # Route templates rather than raw paths keep label cardinality bounded
+        route = request.scope.get("route")
+        if route is not None:
+            path = route.path
+        else:
+            path = "/static" if request.url.path.startswith("/static/") else "unmatched"
+        HTTP_REQUESTS.labels(request.method, path, str(status)).inc()
+        HTTP_LATENCY.labels(request.method, path).observe(time.perf_counter() - start)
+
+def record_static_metrics(method: str, route: str, status: int, seconds: float):
+    HTTP_REQUESTS.labels(method, route, str(status)).inc()
+    HTTP_LATENCY.labels(method, route).observe(seconds)
+
+# HTML pages served at their own paths, besides /static/<name>
+PAGES = {"/": "index.html", "/iframe": "index.html", "/demo": "iframe-demo.html"}
+asset_pipeline = AssetPipeline()
+# Added last, so it runs first: asset hits are answered from memory before the
+# HTTP middleware above, with the frame headers added directly
+app.add_middleware(StaticAssetMiddleware, pipeline=asset_pipeline, headers=FRAME_HEADERS,
+                   on_response=record_static_metrics)
+
 # Initialize Groq client
 if not config.GROQ_API_KEY:
     logger.error("GROQ_API_KEY not found in environment variables")
+    upstream = None
     groq_client = None
+    llm_client = None
 else:
-    groq_client = Groq(api_key=config.GROQ_API_KEY)
+    # Connection pool warmed at startup, kept alive while idle and closed on shutdown
+    upstream = UpstreamPool(config.GROQ_API_KEY)
+    # Retries and timeouts are handled by LLMClient, per model and within a deadline
+    groq_client = upstream.client
+    llm_client = LLMClient(groq_client)
+
+# Session storage
+db_manager = create_store()
+
+# Answers to repeated opening questions
+response_cache = ResponseCache(
+    config.RESPONSE_CACHE_SIZE,
+    ttl=config.RESPONSE_CACHE_TTL,
+    similarity=config.RESPONSE_CACHE_SIMILARITY
+)
+
+# LLM calls for opening questions that are in flight, shared by identical requests
+first_turn_replies = ReplyCoalescer()
+
+# Per-visitor and per-IP admission control for the chat endpoints
+rate_limiter = create_rate_limiter(
+    {
+        "visitor": (config.RATE_LIMIT_PER_MINUTE, config.RATE_LIMIT_BURST),
+        "ip": (config.RATE_LIMIT_IP_PER_MINUTE, config.RATE_LIMIT_IP_BURST),
+    },
+    config.RATE_LIMIT_BACKEND,
+    config.RATE_LIMIT_DATABASE
+)
+
+# Background rolling summaries of long sessions
+summarizer = SessionSummarizer(db_manager, llm_client)
 
-# Mount static files
+# Resume shared by all workers through the database; answers cached for an
+# older resume are stale once it changes
+resume_sync = ResumeSync(db_manager, prompt_builder, on_change=response_cache.clear)
+
+def upstream_connection_count(state: str) -> float:
+    """Pooled upstream connections in `state`; NaN when the pool can't be read"""
+    if upstream is None:
+        return 0
+    count = upstream.connections()[state]
+    return math.nan if count is None else count
+
+# Metrics read from existing counters when /metrics is scraped
+Gauge("llm_in_flight", "LLM calls in progress", func=lambda: llm_client.in_flight if llm_client else 0)
+Gauge("llm_waiting", "Requests waiting for an LLM slot", func=lambda: llm_client.waiting if llm_client else 0)
+Gauge("upstream_connections", "Open connections to the LLM API",
+      func=lambda: upstream_connection_count("total"))
+Gauge("upstream_idle_connections", "Idle connections to the LLM API, ready for reuse",
+      func=lambda: upstream_connection_count("idle"))
+Counter("response_cache_lookups_total", "Response cache lookups", func=lambda: response_cache.lookups)
+Counter("response_cache_hits_total", "Response cache hits (exact and similar)",
+        func=lambda: response_cache.exact_hits + response_cache.similar_hits)
+Counter("context_cache_hits_total", "Context cache hits",
+        func=lambda: db_manager.context_cache_stats().get("hits", 0))
+Counter("context_cache_misses_total", "Context cache misses",
+        func=lambda: db_manager.context_cache_stats().get("misses", 0))
+Gauge("resume_version", "Stored resume version this worker is using", func=lambda: resume_sync.version or 0)
+
+# Mount static files (used when the asset pipeline is off or for files added after startup)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 class ChatRequest(BaseModel):
@@ -72,6 +251,23 @@ class ChatResponse(BaseModel):
     response: str
     session_id: str
     
+class BatchQuestion(BaseModel):
+    message: str
+    # Continue an existing session; by default each question starts a new one
+    session_id: Optional[str] = None
+    # Echoed back, to match answers to questions
+    id: Optional[str] = None
+
+class BatchChatRequest(BaseModel):
+    questions: List[Union[str, BatchQuestion]]
+    user_id: Optional[str] = None
+    # Questions answered at once (at most BATCH_MAX_CONCURRENCY)
+    concurrency: Optional[int] = Field(None, ge=1)
+    # False answers without creating sessions or saving messages
+    persist: bool = True
+    # False gives every question its own LLM call instead of a cached or shared reply
+    use_cache: bool = True
+    
 class ResumeUpdateRequest(BaseModel):
     resume_content: str
 
@@ -87,6 +283,8 @@ class SessionResponse(BaseModel):
 class SessionHistoryResponse(BaseModel):
     session_id: str
     messages: List[dict]
+    # Pass as before_id to get the previous page; None when there are no older messages
+    next_before_id: Optional[int] = None
     
 class UserSessionsResponse(BaseModel):
     sessions: List[dict]
@@ -107,78 +305,460 @@ async def widget_demo():
 
 @app.get("/api")
 async def api_info():
+    endpoints = {
+        "/chat": "POST - Send a message to chat with the AI agent",
+        "/chat/stream": "POST - Same as /chat, streaming the reply as Server-Sent Events",
+        "/update-resume": "POST - Update the resume content",
+        "/health": "GET - Check API health",
+        "/metrics": "GET - Metrics in the Prometheus text format"
+    }
+    # Only listed where it is switched on
+    if config.BATCH_TOKEN:
+        endpoints["/chat/batch"] = "POST - Answer many questions concurrently, streaming the answers as NDJSON"
     return {
         "message": "Welcome to Nafis Ahmed Khan's AI Agent API",
         "description": "Ask me anything about Nafis's professional background, skills, and experience!",
-        "endpoints": {
-            "/chat": "POST - Send a message to chat with the AI agent",
-            "/update-resume": "POST - Update the resume content",
-            "/health": "GET - Check API health"
-        }
+        "endpoints": endpoints
     }
 
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
-        "groq_configured": groq_client is not None
+        "groq_configured": groq_client is not None,
+        "prompt_version": prompt_builder.version,
+        "resume_version": resume_sync.version,
+        "llm": llm_client.stats() if llm_client else None,
+        "upstream": upstream.stats() if upstream else None,
+        "context_cache": db_manager.context_cache_stats(),
+        "archive": db_manager.archive_stats(),
+        "response_cache": response_cache.stats(),
+        "coalescing": first_turn_replies.stats(),
+        "rate_limit": rate_limiter.stats()
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Request, stage latency, token and cache metrics for Prometheus to scrape"""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@dataclass
+class ChatContext:
+    session_id: str
+    messages: List[Dict]
+    prompt_version: str
+    first_turn: bool
+    prompt_tokens: int
+    # Who the LLM call is for, so queued calls are served fairly across visitors
+    visitor: str = ""
+
+async def prepare_chat(request: ChatRequest, visitor: str = "", persist: bool = True) -> ChatContext:
+    """Resolve the chat session and build the messages array for the model.
+    
+    With persist=False nothing is written: an unknown or missing session
+    gets a throwaway id instead of a new session row.
+    """
+    # Handle session management
+    session_id = request.session_id
+    user_id = request.user_id or db_manager.generate_user_id()
+    
+    # Create new session if none provided or the given one doesn't exist
+    with CHAT_STAGE_LATENCY.labels("session").time():
+        if persist:
+            session_id = await db_manager.ensure_session(session_id, user_id, "New Chat")
+        elif session_id and not await db_manager.session_exists(session_id):
+            session_id = None
+    
+    # Get conversation context from database
+    with CHAT_STAGE_LATENCY.labels("context").time():
+        if session_id:
+            conversation_history = await db_manager.get_conversation_context(
+                session_id, max_messages=config.CONTEXT_MAX_MESSAGES
+            )
+        else:
+            conversation_history = []
+            session_id = str(uuid.uuid4())
+    
+    with CHAT_STAGE_LATENCY.labels("prompt").time():
+        # Keep as much recent history as fits the token budget
+        window = build_context_window(conversation_history, config.CONTEXT_TOKEN_BUDGET)
+        
+        # System prompt is pre-rendered with the resume; take prompt and version together
+        prompt = prompt_builder.current
+        
+        # Pick resume sections using the previous question too, so short
+        # follow-ups ("tell me more") stay on topic
+        previous_questions = [m["content"] for m in conversation_history if m["role"] == "user"]
+        query = " ".join(previous_questions[-1:] + [request.message])
+        
+        # Build messages array with conversation history
+        messages = [{"role": "system", "content": prompt.for_question(query)}]
+        
+        # Older turns that didn't make it into the window are covered by the summary
+        history_cut = window.dropped_turns or len(conversation_history) >= config.CONTEXT_MAX_MESSAGES
+        summary = await summarizer.get(session_id) if history_cut and summarizer.enabled else None
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        
+        messages.extend(window.messages)
+        messages.append({"role": "user", "content": request.message})
+    
+    prompt_tokens = sum(message_tokens(message) for message in messages)
+    logger.info(
+        f"Prompt for session {session_id}: ~{prompt_tokens} tokens "
+        f"({window.tokens} history, {window.dropped_turns} turns dropped"
+        f"{', oldest trimmed' if window.trimmed else ''})"
+    )
+    
+    return ChatContext(
+        session_id, messages, prompt.version,
+        first_turn=not conversation_history,
+        prompt_tokens=prompt_tokens,
+        visitor=visitor
+    )
+
+def join_first_turn_reply(request: ChatRequest, context: ChatContext, stream: bool) -> SharedReply:
+    """Share one LLM call between concurrent identical opening questions.
+
+    Keyed by normalized question and prompt version, like the response cache;
+    the first request starts the call and the finished reply is cached.
+    """
+    async def produce(reply: SharedReply):
+        if stream:
+            tokens = await llm_client.stream(context.messages, visitor=context.visitor)
+            reply.start()
+            try:
+                async for token in tokens:
+                    reply.append(token)
+            finally:
+                await tokens.close()
+        else:
+            chat_completion = await llm_client.complete(context.messages, visitor=context.visitor)
+            reply.start()
+            reply.append(chat_completion.choices[0].message.content)
+        response_cache.set(request.message, context.prompt_version, "".join(reply.parts))
+    
+    key = (normalize_question(request.message), context.prompt_version)
+    reply, shared = first_turn_replies.join(key, produce)
+    if shared:
+        CHAT_COALESCED_REPLIES.inc()
+    return reply
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """Format a Server-Sent Event with a JSON payload"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def client_ip(http_request: Request) -> str:
+    """The client's address: the one the outermost of TRUSTED_PROXY_HOPS proxies saw"""
+    peer = http_request.client.host if http_request.client else "unknown"
+    if config.TRUSTED_PROXY_HOPS <= 0:
+        return peer
+    forwarded = [hop.strip() for header in http_request.headers.getlist("x-forwarded-for")
+                 for hop in header.split(",") if hop.strip()]
+    # Proxies append; everything left of their entries came from the client
+    if len(forwarded) < config.TRUSTED_PROXY_HOPS:
+        return peer
+    return forwarded[-config.TRUSTED_PROXY_HOPS]
+
+async def admit(http_request: Request, user_id: Optional[str] = None, session_id: Optional[str] = None,
+                cost: int = 1) -> str:
+    """Take `cost` tokens (one per message) from the visitor's and the client IP's rate limit buckets.
+
+    Returns the visitor key; raises a 429 with Retry-After when either is short.
+    """
+    ip = client_ip(http_request)
+    visitor = user_id or session_id or ip
+    limited = await rate_limiter.check({"visitor": visitor, "ip": ip}, cost)
+    if limited is not None:
+        scope, wait = limited
+        CHAT_RATE_LIMITED.labels(scope).inc()
+        logger.warning(f"Rate limited {scope} {visitor if scope == 'visitor' else ip} for {wait:.1f}s")
+        raise HTTPException(
+            status_code=429,
+            detail="You're sending messages too quickly. Please wait a moment and try again.",
+            headers={"Retry-After": str(math.ceil(wait))}
+        )
+    return visitor
+
+def overloaded_error() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many requests in progress. Please try again shortly.",
+        headers={"Retry-After": "1"}
+    )
+
+def unavailable_error() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="The assistant is temporarily unavailable. Please try again shortly.",
+        headers={"Retry-After": str(int(config.LLM_BREAKER_RESET_SECONDS))}
+    )
+
+def degraded_answer(request: ChatRequest, context: ChatContext, error: LLMUnavailableError) -> str:
+    """A cached answer to the same (or a similar enough) question, for when no model can answer.
+
+    Follow-up questions only reuse exact matches; re-raises if nothing fits.
+    """
+    # Disabled: fail without a lookup, which would count as a cache miss
+    if config.DEGRADED_SIMILARITY <= 0:
+        raise error
+    answer = response_cache.get(
+        request.message, context.prompt_version,
+        allow_similar=context.first_turn, similarity=config.DEGRADED_SIMILARITY
+    )
+    if answer is None:
+        raise error
+    logger.warning(f"Serving a cached answer, LLM unavailable: {str(error)}")
+    CHAT_DEGRADED_REPLIES.inc()
+    return answer
+
+async def answer_chat(request: ChatRequest, visitor: str = "", persist: bool = True,
+                      use_cache: bool = True) -> Tuple[ChatResponse, Optional[str]]:
+    """Answer one message: the path shared by /chat and /chat/batch.
+    
+    Also returns the cached question whose answer was reused, if any. With
+    use_cache=False every message gets its own LLM call: no cached or
+    shared replies, and no cached fallback when the LLM is unavailable.
+    """
+    context = await prepare_chat(request, visitor, persist)
+    
+    # Opening questions without history can be answered from the cache
+    response_text = cached_question = None
+    if context.first_turn and use_cache:
+        match = response_cache.lookup(request.message, context.prompt_version)
+        if match is not None:
+            cached_question, response_text = match
+    
+    if response_text is None:
+        try:
+            with CHAT_STAGE_LATENCY.labels("llm").time():
+                if context.first_turn and use_cache and config.COALESCE_FIRST_TURN:
+                    response_text = await join_first_turn_reply(request, context, stream=False).text()
+                else:
+                    # Make API call to Groq
+                    chat_completion = await llm_client.complete(context.messages, visitor=context.visitor)
+                    response_text = chat_completion.choices[0].message.content
+                    if context.first_turn:
+                        response_cache.set(request.message, context.prompt_version, response_text)
+        except LLMUnavailableError as e:
+            if not use_cache:
+                raise
+            response_text = degraded_answer(request, context, e)
+    else:
+        CHAT_CACHED_REPLIES.inc()
+    
+    # Save the conversation to database
+    if persist:
+        with CHAT_STAGE_LATENCY.labels("persist").time():
+            await db_manager.save_message(context.session_id, request.message, response_text, context.prompt_version)
+        summarizer.record_turn(context.session_id)
+    
+    return ChatResponse(response=response_text, session_id=context.session_id), cached_question
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     if not groq_client:
         raise HTTPException(
             status_code=500, 
             detail="API not properly configured. Please set GROQ_API_KEY environment variable."
         )
+    visitor = await admit(http_request, request.user_id, request.session_id)
     
     try:
-        # Handle session management
-        session_id = request.session_id
-        user_id = request.user_id or db_manager.generate_user_id()
-        
-        # Create new session if none provided
-        if not session_id:
-            session_id = db_manager.create_session(user_id, "New Chat")
-        elif not db_manager.session_exists(session_id):
-            session_id = db_manager.create_session(user_id, "New Chat")
-        
-        # Get conversation context from database
-        conversation_history = db_manager.get_conversation_context(session_id, max_messages=8)
-        
-        # Prepare the system prompt with resume content
-        system_prompt = config.SYSTEM_PROMPT.format(resume_content=config.RESUME_CONTENT)
-        
-        # Build messages array with conversation history
-        messages = [{"role": "system", "content": system_prompt}]
-        messages.extend(conversation_history)
-        messages.append({"role": "user", "content": request.message})
-        
-        # Make API call to Groq
-        chat_completion = groq_client.chat.completions.create(
-            messages=messages,
-            model=config.MODEL_NAME,
-            temperature=0.7,
-            max_tokens=1000,
-        )
-        
-        response_text = chat_completion.choices[0].message.content
-        
-        # Save the conversation to database
-        db_manager.save_message(session_id, request.message, response_text)
-        
-        return ChatResponse(response=response_text, session_id=session_id)
+        reply, _ = await answer_chat(request, visitor)
+        return reply
         
+    except LLMOverloadedError as e:
+        logger.warning(f"Rejecting chat request: {str(e)}")
+        raise overloaded_error()
+    except LLMUnavailableError as e:
+        logger.error(f"LLM unavailable for chat request: {str(e)}")
+        raise unavailable_error()
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """Stream the reply as Server-Sent Events.
+
+    Emits a `session` event, one `data` event per token chunk, then `done`
+    (or `error`). The reply is saved once the stream completes; if the client
+    disconnects first, the upstream request is aborted and nothing is saved.
+    """
+    if not groq_client:
+        raise HTTPException(
+            status_code=500, 
+            detail="API not properly configured. Please set GROQ_API_KEY environment variable."
+        )
+    visitor = await admit(http_request, request.user_id, request.session_id)
+    
+    try:
+        context = await prepare_chat(request, visitor)
+        cached = response_cache.get(request.message, context.prompt_version) if context.first_turn else None
+        llm_start = time.perf_counter()
+        tokens = None
+        try:
+            if cached is None and context.first_turn and config.COALESCE_FIRST_TURN:
+                tokens = join_first_turn_reply(request, context, stream=True)
+                try:
+                    await tokens.wait_started()
+                except BaseException:
+                    # Also on disconnect while queued: the last follower out cancels the call
+                    await tokens.close()
+                    raise
+            elif cached is None:
+                tokens = await llm_client.stream(context.messages, visitor=context.visitor)
+        except LLMUnavailableError as e:
+            tokens = None
+            cached = degraded_answer(request, context, e)
+    except LLMOverloadedError as e:
+        logger.warning(f"Rejecting chat stream request: {str(e)}")
+        raise overloaded_error()
+    except LLMUnavailableError as e:
+        logger.error(f"LLM unavailable for chat stream request: {str(e)}")
+        raise unavailable_error()
+    except Exception as e:
+        logger.error(f"Error in chat stream endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
+    
+    async def event_stream():
+        parts = []
+        try:
+            yield sse_event({"session_id": context.session_id}, event="session")
+            if cached is not None:
+                CHAT_CACHED_REPLIES.inc()
+                parts.append(cached)
+                yield sse_event({"token": cached})
+            else:
+                async for token in tokens:
+                    if not parts:
+                        CHAT_STAGE_LATENCY.labels("llm_first_token").observe(time.perf_counter() - llm_start)
+                    parts.append(token)
+                    yield sse_event({"token": token})
+                CHAT_STAGE_LATENCY.labels("llm").observe(time.perf_counter() - llm_start)
+            
+            response_text = "".join(parts)
+            with CHAT_STAGE_LATENCY.labels("persist").time():
+                await db_manager.save_message(context.session_id, request.message, response_text, context.prompt_version)
+            summarizer.record_turn(context.session_id)
+            if cached is None and context.first_turn:
+                response_cache.set(request.message, context.prompt_version, response_text)
+            yield sse_event({"session_id": context.session_id}, event="done")
+        except Exception as e:
+            logger.error(f"Error while streaming chat response: {str(e)}")
+            yield sse_event({"detail": f"Error processing request: {str(e)}"}, event="error")
+        finally:
+            # Runs on completion, error and client disconnect (cancellation)
+            if tokens is not None:
+                await tokens.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest, http_request: Request):
+    """Answer many questions concurrently, streaming one NDJSON line per answer.
+    
+    Each question goes through the same path as /chat, at most `concurrency`
+    at a time. Lines arrive in completion order with the question's `index`
+    (and `id`), and hold `response` and `session_id` or an `error`; a final
+    line holds the `summary`. With persist=false nothing is saved. Answers
+    reused from the response cache carry `cached` and the `cached_question`
+    they matched; use_cache=false makes a fresh LLM call for every question.
+    
+    Off unless BATCH_TOKEN is set, and only for callers that send it.
+    """
+    if not config.BATCH_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    authorization = http_request.headers.get("authorization", "")
+    if not secrets.compare_digest(authorization.encode(), f"Bearer {config.BATCH_TOKEN}".encode()):
+        raise HTTPException(
+            status_code=401,
+            detail="A valid batch token is required",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    if not groq_client:
+        raise HTTPException(
+            status_code=500, 
+            detail="API not properly configured. Please set GROQ_API_KEY environment variable."
+        )
+    if len(request.questions) > config.BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many questions: {len(request.questions)} (at most {config.BATCH_MAX_QUESTIONS} per batch)"
+        )
+    # Every question is charged up front, so a batch can't spend more LLM calls
+    # than the same visitor could send to /chat; its calls then queue as one visitor
+    visitor = await admit(http_request, request.user_id, cost=len(request.questions))
+    
+    user_id = request.user_id or db_manager.generate_user_id()
+    questions = [BatchQuestion(message=q) if isinstance(q, str) else q for q in request.questions]
+    concurrency = min(request.concurrency or config.BATCH_MAX_CONCURRENCY, config.BATCH_MAX_CONCURRENCY)
+    
+    async def answer(index: int, question: BatchQuestion) -> Dict:
+        start = time.perf_counter()
+        result = {"index": index, "id": question.id, "message": question.message}
+        try:
+            reply, cached_question = await answer_chat(
+                ChatRequest(message=question.message, session_id=question.session_id, user_id=user_id),
+                visitor, request.persist, request.use_cache
+            )
+            result.update(response=reply.response, session_id=reply.session_id)
+            if cached_question is not None:
+                result.update(cached=True, cached_question=cached_question)
+        except LLMUnavailableError as e:
+            logger.error(f"LLM unavailable for batch question {index}: {str(e)}")
+            result["error"] = unavailable_error().detail
+        except Exception as e:
+            logger.error(f"Error answering batch question {index}: {str(e)}")
+            result["error"] = str(e) or type(e).__name__
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+    
+    async def lines():
+        start = time.perf_counter()
+        results: asyncio.Queue = asyncio.Queue()
+        pending = iter(enumerate(questions))
+        
+        async def worker():
+            for index, question in pending:
+                await results.put(await answer(index, question))
+        
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(questions)))]
+        errors = cached = 0
+        try:
+            for _ in questions:
+                result = await results.get()
+                errors += "error" in result
+                cached += "cached" in result
+                yield json.dumps(result) + "\n"
+            yield json.dumps({"summary": {
+                "questions": len(questions),
+                "errors": errors,
+                "concurrency": concurrency,
+                "persisted": request.persist,
+                "cached": cached,
+                "seconds": round(time.perf_counter() - start, 3),
+            }}) + "\n"
+        finally:
+            # Also runs when the client disconnects: stop answering
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @app.post("/sessions", response_model=SessionResponse)
 async def create_session(request: SessionRequest):
     """Create a new chat session"""
     try:
         user_id = request.user_id or db_manager.generate_user_id()
-        session_id = db_manager.create_session(user_id, request.title)
+        session_id = await db_manager.create_session(user_id, request.title)
         
         return SessionResponse(
             session_id=session_id,
@@ -193,46 +773,99 @@ async def create_session(request: SessionRequest):
 async def get_user_sessions(user_id: str):
     """Get recent sessions for a user"""
     try:
-        sessions = db_manager.get_user_sessions(user_id, limit=5)
+        sessions = await db_manager.get_user_sessions(user_id, limit=5)
         return UserSessionsResponse(sessions=sessions)
     except Exception as e:
         logger.error(f"Error getting user sessions: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting sessions: {str(e)}")
 
 @app.get("/sessions/{session_id}/history", response_model=SessionHistoryResponse)
-async def get_session_history(session_id: str):
-    """Get chat history for a specific session"""
+async def get_session_history(session_id: str, before_id: Optional[int] = None,
+                              limit: Optional[int] = Query(None, ge=1, le=config.HISTORY_PAGE_MAX)):
+    """Get chat history for a specific session.
+    
+    With `limit`, returns the latest `limit` exchanges before `before_id`;
+    follow `next_before_id` to page backwards.
+    """
     try:
-        if not db_manager.session_exists(session_id):
+        if not await db_manager.session_exists(session_id):
             raise HTTPException(status_code=404, detail="Session not found")
         
-        messages = db_manager.get_session_history(session_id)
-        return SessionHistoryResponse(session_id=session_id, messages=messages)
+        if limit is None:
+            messages = await db_manager.get_session_history(session_id, before_id)
+            return SessionHistoryResponse(session_id=session_id, messages=messages)
+        
+        # Queued write-behind rows have no id yet, so the newest page couldn't
+        # give a cursor; write them first
+        if before_id is None:
+            await db_manager.flush()
+        
+        # One extra exchange tells us whether an older page exists
+        messages = await db_manager.get_session_history(session_id, before_id, limit + 1)
+        next_before_id = None
+        if len(messages) > 2 * limit:
+            messages = messages[2:]
+            ids = [m["id"] for m in messages if m["id"] is not None]
+            # A page of rows queued since the flush: every written row is older
+            next_before_id = min(ids) if ids else MAX_ROW_ID
+        return SessionHistoryResponse(session_id=session_id, messages=messages, next_before_id=next_before_id)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error getting session history: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting history: {str(e)}")
 
+@app.get("/sessions/{session_id}/history/stream")
+async def stream_session_history(session_id: str):
+    """Stream a session's full history as NDJSON (one message per line), oldest first"""
+    if not await db_manager.session_exists(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    async def lines():
+        try:
+            async for message in db_manager.iter_session_history(session_id):
+                yield json.dumps(message) + "\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            logger.error(f"Error streaming session history: {str(e)}")
+            yield json.dumps({"error": f"Error getting history: {str(e)}"}) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @app.delete("/sessions/cleanup")
-async def cleanup_old_sessions(days_old: int = 30):
-    """Clean up sessions older than specified days"""
+async def cleanup_old_sessions(days_old: int = 30, vacuum: str = CLEANUP_VACUUM):
+    """Clean up sessions older than specified days (vacuum: off, incremental or full)"""
     try:
-        db_manager.cleanup_old_sessions(days_old)
-        return {"message": f"Cleaned up sessions older than {days_old} days"}
+        stats = await db_manager.cleanup_old_sessions(days_old, vacuum)
+        summarizer.clear()
+        return {"message": f"Cleaned up sessions older than {days_old} days", **stats}
     except Exception as e:
         logger.error(f"Error cleaning up sessions: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error cleaning up: {str(e)}")
 
+@app.post("/sessions/archive")
+async def archive_old_sessions(days_old: int = config.ARCHIVE_DAYS_OLD, vacuum: str = CLEANUP_VACUUM):
+    """Move sessions inactive for days_old days to compressed archive segments"""
+    try:
+        stats = await db_manager.archive_old_sessions(days_old, vacuum)
+        return {"message": f"Archived sessions inactive for {days_old} days", **stats}
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error archiving sessions: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error archiving: {str(e)}")
+
 @app.post("/update-resume")
 async def update_resume(request: ResumeUpdateRequest):
-    """Update the resume content for the AI agent"""
+    """Update the resume content for the AI agent (all workers pick it up)"""
     try:
-        # Update the resume content in config
-        config.RESUME_CONTENT = request.resume_content
+        # Stored as a new version; other workers switch on their next poll
+        resume_version = await resume_sync.publish(request.resume_content)
         
         return {
             "message": "Resume content updated successfully",
+            "version": prompt_builder.version,
+            "resume_version": resume_version,
             "preview": request.resume_content[:200] + "..." if len(request.resume_content) > 200 else request.resume_content
         }
     except Exception as e:
@@ -0,0 +1,306 @@
+import os
+import time
+import uuid
+import zlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from storage import ChatStore, history_messages
+
+# Connection pool per process; size it so workers x PG_POOL_MAX_SIZE stays
+# under the server's max_connections
+PG_POOL_MIN_SIZE = int(os.getenv("PG_POOL_MIN_SIZE", "2"))
+PG_POOL_MAX_SIZE = int(os.getenv("PG_POOL_MAX_SIZE", "10"))
+PG_COMMAND_TIMEOUT = float(os.getenv("PG_COMMAND_TIMEOUT", "10"))  # seconds
+
+# Same batch sizes as the SQLite cleanup
+CLEANUP_BATCH_ROWS = int(os.getenv("CLEANUP_BATCH_ROWS", "1000"))
+CLEANUP_BATCH_SESSIONS = int(os.getenv("CLEANUP_BATCH_SESSIONS", "200"))
+
+# Key of the advisory lock that serializes migrations across instances
+MIGRATION_LOCK_KEY = 0x6d796167656e74
+
+# Timestamps are returned in the SQLite backend's format
+TIMESTAMP_SQL = "to_char({} AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')"
+
+# Schema migrations, applied in order; never edit or reorder released entries
+MIGRATIONS = [
+    '''
+    CREATE TABLE sessions (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        last_activity TIMESTAMPTZ NOT NULL DEFAULT now(),
+        title TEXT DEFAULT 'New Chat',
+        message_count INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE messages (
+        id BIGSERIAL PRIMARY KEY,
+        session_id TEXT NOT NULL REFERENCES sessions (id),
+        user_message TEXT NOT NULL,
+        bot_response TEXT NOT NULL,
+        timestamp TIMESTAMPTZ NOT NULL DEFAULT now(),
+        prompt_version TEXT
+    );
+    CREATE TABLE session_summaries (
+        session_id TEXT PRIMARY KEY REFERENCES sessions (id),
+        summary TEXT NOT NULL,
+        last_message_id BIGINT NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    CREATE INDEX idx_messages_session_id ON messages (session_id, id);
+    CREATE INDEX idx_sessions_user_activity ON sessions (user_id, last_activity DESC);
+    CREATE INDEX idx_sessions_activity ON sessions (last_activity);
+    ''',
+    '''
+    CREATE TABLE resume_versions (
+        version BIGSERIAL PRIMARY KEY,
+        content TEXT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    ''',
+]
+
+
+class PostgresStore(ChatStore):
+    """PostgreSQL storage backend on an asyncpg connection pool.
+
+    Keeps no per-process session state (no context cache or write-behind),
+    so any number of workers and replicas can share one database.
+    """
+
+    def __init__(self, url: str, min_size: int = PG_POOL_MIN_SIZE, max_size: int = PG_POOL_MAX_SIZE):
+        self.url = url
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+
+    async def open(self):
+        """Create the connection pool and apply pending migrations"""
+        if self.pool is not None:
+            return
+        try:
+            import asyncpg
+        except ImportError:
+            raise RuntimeError("DATABASE_URL points at PostgreSQL but asyncpg is not installed (pip install asyncpg)")
+
+        self.pool = await asyncpg.create_pool(
+            self.url,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            command_timeout=PG_COMMAND_TIMEOUT,
+        )
+        await self.init_database()
+
+    async def init_database(self):
+        """Apply pending migrations; the advisory lock makes concurrent starts apply each once"""
+        async with self.pool.acquire() as conn, conn.transaction():
+            await conn.execute('SELECT pg_advisory_xact_lock($1)', MIGRATION_LOCK_KEY)
+            await conn.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+            version = await conn.fetchval('SELECT version FROM schema_version')
+            if version is None:
+                version = 0
+                await conn.execute('INSERT INTO schema_version (version) VALUES (0)')
+            for number, migration in enumerate(MIGRATIONS, start=1):
+                if version < number:
+                    await conn.execute(migration)
+                    await conn.execute('UPDATE schema_version SET version = $1', number)
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    def generate_session_id(self) -> str:
+        return str(uuid.uuid4())
+
+    def generate_user_id(self) -> str:
+        return str(uuid.uuid4())
+
+    async def create_session(self, user_id: str, title: str = "New Chat") -> str:
+        session_id = self.generate_session_id()
+        await self.pool.execute(
+            'INSERT INTO sessions (id, user_id, title) VALUES ($1, $2, $3)',
+            session_id, user_id, title
+        )
+        return session_id
+
+    async def ensure_session(self, session_id: Optional[str], user_id: str, title: str = "New Chat") -> str:
+        if session_id and await self.session_exists(session_id):
+            return session_id
+        return await self.create_session(user_id, title)
+
+    async def save_message(self, session_id: str, user_message: str, bot_response: str,
+                           prompt_version: Optional[str] = None):
+        # One statement (and round trip) updates the session and inserts the message
+        await self.pool.execute('''
+            WITH touched AS (
+                UPDATE sessions
+                SET last_activity = now(), message_count = message_count + 1
+                WHERE id = $1
+            )
+            INSERT INTO messages (session_id, user_message, bot_response, prompt_version)
+            VALUES ($1, $2, $3, $4)
+        ''', session_id, user_message, bot_response, prompt_version)
+
+    async def get_session_history(self, session_id: str, before_id: Optional[int] = None,
+                                  limit: Optional[int] = None) -> List[Dict]:
+        # LIMIT NULL means no limit
+        rows = await self.pool.fetch(f'''
+            SELECT id, user_message, bot_response, {TIMESTAMP_SQL.format("timestamp")}, prompt_version
+            FROM messages
+            WHERE session_id = $1 AND id < $2
+            ORDER BY id DESC
+            LIMIT $3
+        ''', session_id, before_id or 2 ** 63 - 1, limit)
+        rows.reverse()  # Chronological order
+        return history_messages(rows)
+
+    async def iter_session_history(self, session_id: str, batch_size: int = 500) -> AsyncIterator[Dict]:
+        # Separate queries per batch, so no connection is held while the caller consumes
+        after_id = 0
+        while True:
+            rows = await self.pool.fetch(f'''
+                SELECT id, user_message, bot_response, {TIMESTAMP_SQL.format("timestamp")}, prompt_version
+                FROM messages
+                WHERE session_id = $1 AND id > $2
+                ORDER BY id ASC
+                LIMIT $3
+            ''', session_id, after_id, batch_size)
+            for message in history_messages(rows):
+                yield message
+            if len(rows) < batch_size:
+                return
+            after_id = rows[-1][0]
+
+    async def get_user_sessions(self, user_id: str, limit: int = 5) -> List[Dict]:
+        rows = await self.pool.fetch(f'''
+            SELECT id, title, {TIMESTAMP_SQL.format("created_at")} AS created_at,
+                   {TIMESTAMP_SQL.format("last_activity")} AS last_activity, message_count
+            FROM sessions
+            WHERE user_id = $1
+            ORDER BY sessions.last_activity DESC
+            LIMIT $2
+        ''', user_id, limit)
+        return [dict(row) for row in rows]
+
+    async def session_exists(self, session_id: str) -> bool:
+        return await self.pool.fetchval('SELECT 1 FROM sessions WHERE id = $1', session_id) is not None
+
+    async def cleanup_old_sessions(self, days_old: int = 30, vacuum: str = "off") -> Dict:
+        """Delete expired sessions in short transactions.
+
+        `vacuum` is accepted for interface compatibility; PostgreSQL's
+        autovacuum reclaims the space.
+        """
+        start = time.perf_counter()
+        # No archive here, so its counters stay 0 (kept for the same shape as SQLite's stats)
+        stats = {"sessions": 0, "messages": 0, "summaries": 0, "archived_sessions": 0, "segments_removed": 0,
+                 "batches": 0, "pages_freed": 0}
+
+        while True:
+            async with self.pool.acquire() as conn, conn.transaction():
+                cutoff = await conn.fetchval('SELECT now() - make_interval(days => $1)', days_old)
+                deleted = await conn.execute('''
+                    DELETE FROM messages
+                    WHERE id IN (
+                        SELECT m.id FROM sessions s
+                        JOIN messages m ON m.session_id = s.id
+                        WHERE s.last_activity < $1
+                        LIMIT $2
+                    )
+                ''', cutoff, CLEANUP_BATCH_ROWS)
+                stats["messages"] += int(deleted.split()[-1])
+
+                if deleted == "DELETE 0":
+                    # Locked rows belong to sessions being written to right now; skip them
+                    session_ids = [row[0] for row in await conn.fetch('''
+                        SELECT id FROM sessions
+                        WHERE last_activity < $1
+                        LIMIT $2
+                        FOR UPDATE SKIP LOCKED
+                    ''', cutoff, CLEANUP_BATCH_SESSIONS)]
+                    if not session_ids:
+                        break
+                    # Messages written since the first DELETE can't be added now that the sessions are locked
+                    deleted = await conn.execute('DELETE FROM messages WHERE session_id = ANY($1::text[])', session_ids)
+                    stats["messages"] += int(deleted.split()[-1])
+                    summaries = await conn.execute(
+                        'DELETE FROM session_summaries WHERE session_id = ANY($1::text[])', session_ids
+                    )
+                    sessions = await conn.execute('DELETE FROM sessions WHERE id = ANY($1::text[])', session_ids)
+                    stats["summaries"] += int(summaries.split()[-1])
+                    stats["sessions"] += int(sessions.split()[-1])
+            stats["batches"] += 1
+
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+
+    @asynccontextmanager
+    async def exclusive_job(self, name: str) -> AsyncIterator[bool]:
+        """A session advisory lock per job name, held on one pooled connection while the job runs"""
+        key = MIGRATION_LOCK_KEY + zlib.crc32(name.encode())
+        async with self.pool.acquire() as conn:
+            if not await conn.fetchval('SELECT pg_try_advisory_lock($1)', key):
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                await conn.execute('SELECT pg_advisory_unlock($1)', key)
+
+    async def get_conversation_context(self, session_id: str, max_messages: int = 10) -> List[Dict]:
+        limit = max_messages // 2  # Divide by 2 since each row has user + bot message
+        rows = await self.pool.fetch('''
+            SELECT user_message, bot_response
+            FROM messages
+            WHERE session_id = $1
+            ORDER BY id DESC
+            LIMIT $2
+        ''', session_id, limit)
+
+        context = []
+        for row in reversed(rows):
+            context.append({"role": "user", "content": row[0]})
+            context.append({"role": "assistant", "content": row[1]})
+        return context
+
+    async def get_summary(self, session_id: str) -> Optional[Dict]:
+        row = await self.pool.fetchrow(
+            'SELECT summary, last_message_id FROM session_summaries WHERE session_id = $1', session_id
+        )
+        return dict(row) if row else None
+
+    async def save_summary(self, session_id: str, summary: str, last_message_id: int):
+        await self.pool.execute('''
+            INSERT INTO session_summaries (session_id, summary, last_message_id)
+            VALUES ($1, $2, $3)
+            ON CONFLICT (session_id) DO UPDATE SET
+                summary = excluded.summary,
+                last_message_id = excluded.last_message_id,
+                updated_at = now()
+        ''', session_id, summary, last_message_id)
+
+    async def get_messages_after(self, session_id: str, after_id: int, limit: int = 50) -> List[Dict]:
+        rows = await self.pool.fetch('''
+            SELECT id, user_message, bot_response
+            FROM messages
+            WHERE session_id = $1 AND id > $2
+            ORDER BY id ASC
+            LIMIT $3
+        ''', session_id, after_id, limit)
+        return [dict(row) for row in rows]
+
+    async def save_resume(self, content: str) -> int:
+        return await self.pool.fetchval(
+            'INSERT INTO resume_versions (content) VALUES ($1) RETURNING version', content
+        )
+
+    async def get_resume_version(self) -> Optional[int]:
+        return await self.pool.fetchval('SELECT MAX(version) FROM resume_versions')
+
+    async def get_resume(self) -> Optional[Dict]:
+        row = await self.pool.fetchrow(
+            'SELECT version, content FROM resume_versions ORDER BY version DESC LIMIT 1'
+        )
+        return dict(row) if row else None
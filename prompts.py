@@ -0,0 +1,121 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List
+
+import config
+from retrieval import ResumeIndex
+
+
+# Chat formatting overhead per message (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Don't bother keeping a trimmed turn smaller than this
+MIN_TRIMMED_TOKENS = 32
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast token estimate (~4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: Dict) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class ContextWindow:
+    messages: List[Dict]
+    tokens: int
+    dropped_turns: int
+    trimmed: bool
+
+
+def _trim(message: Dict, max_tokens: int) -> Dict:
+    """Cut a message down to roughly max_tokens, keeping its start"""
+    max_chars = max(0, (max_tokens - MESSAGE_OVERHEAD_TOKENS) * 4 - 1)
+    if len(message["content"]) <= max_chars:
+        return message
+    return {**message, "content": message["content"][:max_chars].rstrip() + "…"}
+
+
+def build_context_window(history: List[Dict], budget: int) -> ContextWindow:
+    """Pick the most recent conversation turns that fit in a token budget.
+    
+    Turns (a user message and its reply) are taken newest first. The first
+    turn that doesn't fit is trimmed into the remaining budget if enough is
+    left, and everything older is dropped.
+    """
+    turns = [history[i:i + 2] for i in range(0, len(history), 2)]
+    selected: List[List[Dict]] = []
+    used = 0
+    trimmed = False
+    
+    for turn in reversed(turns):
+        cost = sum(message_tokens(message) for message in turn)
+        if used + cost <= budget:
+            selected.append(turn)
+            used += cost
+            continue
+        
+        remaining = budget - used
+        if remaining >= MIN_TRIMMED_TOKENS:
+            share = remaining // len(turn)
+            turn = [_trim(message, share) for message in turn]
+            selected.append(turn)
+            used += sum(message_tokens(message) for message in turn)
+            trimmed = True
+        break
+    
+    messages = [message for turn in reversed(selected) for message in turn]
+    return ContextWindow(messages, used, len(turns) - len(selected), trimmed)
+
+
+@dataclass(frozen=True)
+class RenderedPrompt:
+    resume_content: str
+    system_prompt: str
+    version: str
+    index: ResumeIndex
+    prefix: str
+    suffix: str
+
+    def for_question(self, question: str, top_k: int = config.RESUME_TOP_K) -> str:
+        """System prompt carrying only the resume sections relevant to the question"""
+        if not config.RESUME_RETRIEVAL:
+            return self.system_prompt
+        return self.prefix + self.index.select(question, top_k) + self.suffix
+
+
+class PromptBuilder:
+    """Renders the system prompt once per resume change instead of once per request"""
+
+    def __init__(self, template: str = config.SYSTEM_PROMPT, resume_content: str = config.RESUME_CONTENT):
+        self.template = template
+        self.update_resume(resume_content)
+
+    def update_resume(self, resume_content: str) -> str:
+        """Re-render the prompt and re-index the resume, returning the new version"""
+        system_prompt = self.template.format(resume_content=resume_content)
+        version = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:12]
+
+        # Template text around the resume, so per-question prompts are a concatenation
+        prefix, _, suffix = self.template.partition("{resume_content}")
+        prefix, suffix = prefix.format(), suffix.format()
+
+        # Swapped in one assignment so readers never see a half-updated prompt
+        self.current = RenderedPrompt(
+            resume_content, system_prompt, version, ResumeIndex(resume_content), prefix, suffix
+        )
+        return version
+
+    @property
+    def system_prompt(self) -> str:
+        return self.current.system_prompt
+
+    @property
+    def version(self) -> str:
+        return self.current.version
+
+
+# Global prompt builder instance
+prompt_builder = PromptBuilder()
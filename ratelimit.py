@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# In-memory buckets kept at most; the least recently used are dropped (a dropped bucket is as good as full)
+MAX_BUCKETS = 100_000
+# The SQLite store deletes buckets that have refilled completely every this many takes
+PRUNE_EVERY = 1000
+
+
+def refill(tokens: float, updated_at: float, now: float, rate: float, burst: float,
+           cost: float = 1) -> Tuple[float, float]:
+    """Take `cost` tokens from a bucket last seen at `updated_at`.
+
+    Returns the tokens left and how long to wait (0 if the tokens were taken).
+    """
+    tokens = min(burst, tokens + (now - updated_at) * rate)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+
+class MemoryBuckets:
+    """Token buckets held by this worker"""
+
+    def __init__(self, max_buckets: int = MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated_at)
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (burst, now))
+        tokens, wait = refill(tokens, updated_at, now, rate, burst, cost)
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def close(self):
+        self._buckets.clear()
+
+
+class SQLiteBuckets:
+    """Token buckets in a SQLite file, shared by every worker on the host.
+
+    Each take is one short write transaction. The state is only throttling
+    bookkeeping, so it is kept in its own file with synchronous=OFF and
+    doesn't contend with chat writes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._takes = 0
+        # Autocommit mode: transactions are started explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("PRAGMA busy_timeout=1000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL) WITHOUT ROWID"
+        )
+
+    def _take(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        # Wall-clock time, since other processes update the same rows
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens, wait = refill(*(row or (burst, now)), now, rate, burst, cost)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    (key, tokens, now),
+                )
+                self._takes += 1
+                if self._takes % PRUNE_EVERY == 0:
+                    self._conn.execute(
+                        "DELETE FROM rate_limit_buckets WHERE updated_at < ?", (now - burst / rate,)
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        return await asyncio.to_thread(self._take, key, rate, burst, cost)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rate_limit_buckets").fetchone()[0]
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RateLimiter:
+    """Token-bucket admission control with one bucket per key in each scope.
+
+    `limits` maps a scope (e.g. "visitor", "ip") to (requests per minute,
+    burst); a scope with a rate of 0 is not limited. A request must get a
+    token in every scope it is checked against.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]], store=None):
+        self.limits = {scope: limit for scope, limit in limits.items() if limit[0] > 0}
+        self.store = store if store is not None else MemoryBuckets()
+        self.rejected: Dict[str, int] = {scope: 0 for scope in self.limits}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.limits)
+
+    async def check(self, keys: Dict[str, str], cost: float = 1) -> Optional[Tuple[str, float]]:
+        """Take `cost` tokens for each (scope, key); returns (scope, seconds to wait) for the first short of them"""
+        for scope, key in keys.items():
+            if scope not in self.limits:
+                continue
+            per_minute, burst = self.limits[scope]
+            wait = await self.store.take(f"{scope}:{key}", per_minute / 60, burst, cost)
+            if wait > 0:
+                self.rejected[scope] += 1
+                return scope, wait
+        return None
+
+    def stats(self) -> Dict:
+        return {
+            "limits": {scope: {"per_minute": rate, "burst": burst} for scope, (rate, burst) in self.limits.items()},
+            "rejected": dict(self.rejected),
+        }
+
+    async def close(self):
+        await self.store.close()
+
+
+def create_rate_limiter(limits: Dict[str, Tuple[float, float]], backend: str = "memory",
+                        path: str = "rate_limits.db") -> RateLimiter:
+    """Rate limiter with buckets per worker ("memory") or shared through a SQLite file ("sqlite")"""
+    if backend == "sqlite":
+        return RateLimiter(limits, SQLiteBuckets(path))
+    if backend != "memory":
+        logger.warning(f"Unknown rate limit backend {backend!r}, keeping buckets in memory")
+    return RateLimiter(limits)
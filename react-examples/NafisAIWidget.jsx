@@ -15,6 +15,7 @@ const NafisAIWidget = ({
   position = "bottom-right", // "bottom-right", "bottom-left", "fixed", "inline"
   title = "Chat with Nafis",
   icon = "👤", 
+  streaming = true, // render replies token by token as they are generated
   welcomeMessage = "Hey there! I'm Nafis Ahmed Khan 👋 Great to meet you! Feel free to ask me about my work, experiences, background, or just chat about anything. What would you like to know?"
 }) => {
   const [isOpen, setIsOpen] = useState(false);
@@ -46,6 +47,9 @@ const NafisAIWidget = ({
     if (welcomeMessage !== "Hey there! I'm Nafis Ahmed Khan 👋 Great to meet you! Feel free to ask me about my work, experiences, background, or just chat about anything. What would you like to know?") {
       url.searchParams.set('welcome', encodeURIComponent(welcomeMessage));
     }
+    if (!streaming) {
+      url.searchParams.set('stream', '0');
+    }
     
     return url.toString();
   };
@@ -0,0 +1,112 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+from groq import APIConnectionError, APIStatusError
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, server errors, timeouts and connection failures are worth retrying"""
+    if isinstance(error, (APIConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def retry_delay(attempt: int, error: BaseException, base_ms: float, max_ms: float) -> float:
+    """Seconds to wait before retry number `attempt` (0-based).
+
+    Uses the server's Retry-After when it sends one, otherwise exponential
+    backoff with full jitter so retrying clients don't stampede together.
+    """
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return random.uniform(0, min(max_ms, base_ms * 2 ** attempt)) / 1000
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker for one upstream model.
+
+    The circuit opens once at least `failure_rate` of the last `window`
+    calls failed (after at least half a window of calls, so a couple of
+    early errors don't trip it), and calls are then rejected without being
+    tried. After `reset_seconds` a single trial call is let through
+    (half-open); its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, window: int, failure_rate: float, reset_seconds: float,
+                 on_change: Optional[Callable[[str], None]] = None):
+        self.failure_rate = failure_rate
+        self.min_calls = max(1, window // 2)
+        self.reset_seconds = reset_seconds
+        self.on_change = on_change
+        self.outcomes: Deque[bool] = deque(maxlen=window)  # True for a failure
+        self.opened_at: Optional[float] = None
+        self.trial_started: Optional[float] = None
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; in half-open state only one trial at a time does"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        now = time.monotonic()
+        # A trial that never reported back (e.g. cancelled) doesn't block the next one forever
+        if self.trial_started is None or now - self.trial_started > self.reset_seconds:
+            self.trial_started = now
+            return True
+        return False
+
+    def record_success(self):
+        self.outcomes.append(False)
+        self.trial_started = None
+        if self.opened_at is not None:
+            # The trial worked: start over with a clean window
+            self.opened_at = None
+            self.outcomes.clear()
+            self._changed()
+
+    def record_failure(self):
+        self.outcomes.append(True)
+        self.trial_started = None
+        if self.opened_at is not None:
+            # A failed trial reopens the circuit for another reset period
+            self.opened_at = time.monotonic()
+            self._changed()
+        elif len(self.outcomes) >= self.min_calls and self.failures() >= self.failure_rate * len(self.outcomes):
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+            self._changed()
+
+    def failures(self) -> int:
+        return sum(self.outcomes)
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change(self.state)
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "recent_calls": len(self.outcomes),
+            "recent_failures": self.failures(),
+            "times_opened": self.times_opened,
+        }
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from typing import Callable, Optional
+
+import config
+from prompts import PromptBuilder
+
+logger = logging.getLogger(__name__)
+
+
+class ResumeSync:
+    """Keeps this worker's prompt on the latest resume stored in the database.
+
+    /update-resume stores a new numbered version; every worker polls the
+    latest version number every RESUME_POLL_SECONDS (one indexed lookup) and
+    reloads the resume only when it changed. Only the prompt is synced this
+    way; the other per-worker caches are listed in config.py.
+    """
+
+    def __init__(self, db, builder: PromptBuilder, on_change: Optional[Callable[[], None]] = None,
+                 poll_seconds: float = config.RESUME_POLL_SECONDS):
+        self.db = db
+        self.builder = builder
+        self.on_change = on_change
+        self.poll_seconds = poll_seconds
+        self.version: Optional[int] = None  # None until a stored resume is loaded
+        self._task: Optional[asyncio.Task] = None
+
+    def _apply(self, version: int, content: str):
+        # Versions only move forward, even if a slow poll returns after a publish
+        if self.version is not None and version <= self.version:
+            return
+        config.RESUME_CONTENT = content
+        prompt_version = self.builder.update_resume(content)
+        self.version = version
+        if self.on_change:
+            self.on_change()
+        logger.info(f"Loaded resume version {version} (prompt {prompt_version})")
+
+    async def refresh(self) -> bool:
+        """Load the stored resume if it is newer than ours; True if it changed"""
+        latest = await self.db.get_resume_version()
+        if latest is None or latest == self.version:
+            return False
+        stored = await self.db.get_resume()
+        self._apply(stored["version"], stored["content"])
+        return True
+
+    async def publish(self, content: str) -> int:
+        """Store a new resume version and switch to it right away"""
+        version = await self.db.save_resume(content)
+        self._apply(version, content)
+        return version
+
+    async def start(self):
+        """Load the stored resume (if any) and start polling for new versions"""
+        await self.refresh()
+        if self.poll_seconds > 0:
+            self._task = asyncio.create_task(self._poll())
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error checking for resume updates: {str(e)}")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
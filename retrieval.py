@@ -0,0 +1,130 @@
+import math
+import re
+from collections import Counter
+from typing import List, NamedTuple
+
+SECTION_HEADER = re.compile(r"^=== (.+?) ===\s*$", re.MULTILINE)
+
+# Common words that only add noise to BM25 scores
+STOPWORDS = frozenset("""
+a about an and are as at be by can do does for from have how i in is it me my
+of on or so tell that the to was what when where which who with you your
+""".split())
+
+
+# Words visitors use that the resume expresses differently
+QUERY_EXPANSIONS = {
+    "study": "education university degree",
+    "studied": "education university degree",
+    "college": "education university",
+    "school": "education",
+    "qualification": "education degree",
+    "job": "work experience",
+    "career": "work experience",
+    "company": "work experience",
+    "hobby": "interests",
+    "hobbies": "interests",
+    "family": "personal background",
+    "hometown": "personal background",
+    "tech": "technologies skills",
+    "stack": "technologies skills",
+}
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping so 'projects' matches 'project'"""
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+class Section(NamedTuple):
+    title: str
+    text: str
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(word) for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS]
+
+
+def expand_query(query: str) -> str:
+    words = re.findall(r"[a-z0-9]+", query.lower())
+    return " ".join([query] + [QUERY_EXPANSIONS[word] for word in words if word in QUERY_EXPANSIONS])
+
+
+def split_sections(resume_content: str) -> List[Section]:
+    """Split the resume on its `=== SECTION ===` headers.
+
+    Text before the first header (name and contact lines) becomes a section
+    titled "" so it can always be included.
+    """
+    sections = []
+    matches = list(SECTION_HEADER.finditer(resume_content))
+    preamble = resume_content[:matches[0].start()] if matches else resume_content
+    if preamble.strip():
+        sections.append(Section("", preamble.strip()))
+
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(resume_content)
+        sections.append(Section(match.group(1).strip(), resume_content[match.start():end].strip()))
+    return sections
+
+
+class ResumeIndex:
+    """BM25 index over resume sections, used to pick the ones relevant to a question"""
+
+    def __init__(self, resume_content: str, k1: float = 1.5, b: float = 0.75):
+        self.resume_content = resume_content
+        self.sections = split_sections(resume_content)
+        self.k1 = k1
+        self.b = b
+
+        self._term_counts = [Counter(tokenize(f"{s.title} {s.text}")) for s in self.sections]
+        self._lengths = [sum(counts.values()) for counts in self._term_counts]
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+
+        document_frequency = Counter()
+        for counts in self._term_counts:
+            document_frequency.update(counts.keys())
+        n = len(self.sections)
+        self._idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    def scores(self, query: str) -> List[float]:
+        """BM25 score of every section for the query"""
+        terms = set(tokenize(expand_query(query)))
+        scores = []
+        for counts, length in zip(self._term_counts, self._lengths):
+            score = 0.0
+            for term in terms:
+                tf = counts.get(term)
+                if tf:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / self._avg_length)
+                    score += self._idf[term] * tf * (self.k1 + 1) / norm
+            scores.append(score)
+        return scores
+
+    def select(self, query: str, top_k: int) -> str:
+        """Resume text limited to the preamble and the top_k matching sections.
+
+        Falls back to the full resume when nothing matches (greetings, small
+        talk) or the resume has no section headers.
+        """
+        titled = [i for i, section in enumerate(self.sections) if section.title]
+        if not titled or top_k <= 0:
+            return self.resume_content
+
+        scores = self.scores(query)
+        ranked = sorted((i for i in titled if scores[i] > 0), key=lambda i: scores[i], reverse=True)
+        if not ranked:
+            return self.resume_content
+
+        # Keep the preamble and the original section order
+        chosen = set(ranked[:top_k])
+        return "\n\n".join(
+            section.text for i, section in enumerate(self.sections)
+            if not section.title or i in chosen
+        )
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from typing import Optional, Set
+
+import config
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """You maintain a compact running summary of a chat between a website visitor and Nafis Ahmed Khan.
+Update the existing summary with the new exchanges below. Keep facts the visitor shared about themselves, \
+what they asked about, and anything Nafis promised or recommended. Write at most 120 words in plain sentences."""
+
+# Cached "this session has no summary yet", distinct from a cache miss
+NO_SUMMARY = ""
+
+
+class SessionSummarizer:
+    """Maintains a rolling summary per session, updated in the background.
+
+    Every SUMMARY_EVERY_TURNS saved turns, messages older than the last
+    SUMMARY_KEEP_TURNS are folded into the session's stored summary with one
+    LLM call, off the request path.
+    """
+
+    def __init__(self, db, llm, every_turns: int = config.SUMMARY_EVERY_TURNS,
+                 keep_turns: int = config.SUMMARY_KEEP_TURNS,
+                 max_concurrency: int = config.SUMMARY_MAX_CONCURRENCY):
+        self.db = db
+        self.llm = llm
+        self.every_turns = every_turns
+        self.keep_turns = keep_turns
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._turns_since_update = LRUCache(10000)
+        self._summaries = LRUCache(1000, ttl=300)
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.every_turns > 0 and self.llm is not None
+
+    async def get(self, session_id: str) -> Optional[str]:
+        """Current summary text for a session, if any"""
+        summary = self._summaries.get(session_id)
+        if summary is None:
+            stored = await self.db.get_summary(session_id)
+            summary = stored["summary"] if stored else NO_SUMMARY
+            self._summaries.set(session_id, summary)
+        return summary or None
+
+    def record_turn(self, session_id: str):
+        """Count a saved turn and schedule a summary update when enough have piled up"""
+        if not self.enabled:
+            return
+        with self._turns_since_update.lock:
+            turns = self._turns_since_update.peek(session_id, 0) + 1
+            self._turns_since_update.set(session_id, turns)
+        if turns < self.every_turns or session_id in self._running:
+            return
+
+        self._turns_since_update.set(session_id, 0)
+        self._running.add(session_id)
+        task = asyncio.create_task(self._update(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _update(self, session_id: str):
+        try:
+            async with self._semaphore:
+                stored = await self.db.get_summary(session_id)
+                previous = stored["summary"] if stored else ""
+                after_id = stored["last_message_id"] if stored else 0
+
+                rows = await self.db.get_messages_after(session_id, after_id)
+                # Recent turns are still sent verbatim, so leave them out
+                rows = rows[:-self.keep_turns] if self.keep_turns else rows
+                if not rows:
+                    return
+
+                exchanges = "\n".join(
+                    f"Visitor: {row['user_message']}\nNafis: {row['bot_response']}" for row in rows
+                )
+                completion = await self.llm.complete(
+                    [
+                        {"role": "system", "content": SUMMARY_PROMPT},
+                        {"role": "user", "content": f"Existing summary:\n{previous or '(none)'}\n\nNew exchanges:\n{exchanges}"},
+                    ],
+                    temperature=0.2,
+                    max_tokens=300,
+                )
+                summary = completion.choices[0].message.content.strip()
+                await self.db.save_summary(session_id, summary, rows[-1]["id"])
+                self._summaries.set(session_id, summary)
+        except Exception as e:
+            logger.error(f"Error updating summary for session {session_id}: {str(e)}")
+        finally:
+            self._running.discard(session_id)
+
+    def clear(self):
+        """Forget cached summaries (e.g. after sessions are cleaned up)"""
+        self._summaries.clear()
+
+    async def close(self):
+        """Cancel in-progress updates (call on shutdown)"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,170 @@
+import asyncio
+import os
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Importing database (or main) opens DATABASE_PATH; keep it off the working-tree database
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="myagent-tests-"), "chat.db")
+os.environ.setdefault("STATIC_PIPELINE", "false")
+
+from storage import create_store  # noqa: E402
+
+# A scratch PostgreSQL database for the storage contract tests; its tables are dropped
+POSTGRES_URL = os.getenv("POSTGRES_URL") or (
+    os.getenv("DATABASE_URL", "") if os.getenv("DATABASE_URL", "").startswith(("postgres://", "postgresql://")) else ""
+)
+
+PG_TABLES = "messages, session_summaries, sessions, resume_versions, schema_version"
+
+
+class Backend:
+    """A ChatStore under test, driven on its own event loop.
+
+    `run(coroutine)` awaits storage calls from plain test functions, and
+    the helpers do what the ChatStore interface has no call for (backdating
+    a session, reading the schema version, reopening the database).
+    """
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+        self.loop = asyncio.new_event_loop()
+        self.store = None
+
+    def run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def open(self):
+        self.store = create_store(self.url)
+        self.run(self.store.open())
+        return self.store
+
+    def reopen(self):
+        """Close the store and open the same database again (migrations run again)"""
+        self.run(self.store.close())
+        return self.open()
+
+    def close(self):
+        if self.store is not None:
+            self.run(self.store.close())
+        self.loop.close()
+
+    def age_session(self, session_id: str, days: int):
+        """Move a session's last activity `days` days into the past"""
+        if self.name == "sqlite":
+            with self.store.manager.connection() as conn:
+                conn.execute(
+                    "UPDATE sessions SET last_activity = datetime('now', ?) WHERE id = ?",
+                    (f"-{days} days", session_id),
+                )
+        else:
+            self.run(self.store.pool.execute(
+                "UPDATE sessions SET last_activity = now() - make_interval(days => $1) WHERE id = $2",
+                days, session_id,
+            ))
+
+    def schema_version(self) -> int:
+        if self.name == "sqlite":
+            with self.store.manager.connection() as conn:
+                return conn.execute("PRAGMA user_version").fetchone()[0]
+        return self.run(self.store.pool.fetchval("SELECT version FROM schema_version"))
+
+
+def _drop_postgres_tables(url: str):
+    import asyncpg
+
+    async def drop():
+        conn = await asyncpg.connect(url)
+        try:
+            await conn.execute(f"DROP TABLE IF EXISTS {PG_TABLES} CASCADE")
+        finally:
+            await conn.close()
+
+    asyncio.run(drop())
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def backend(request, tmp_path):
+    """Each storage backend with a fresh database; PostgreSQL only when POSTGRES_URL (or DATABASE_URL) is set"""
+    if request.param == "sqlite":
+        backend = Backend("sqlite", f"sqlite:///{tmp_path / 'chat.db'}")
+    else:
+        if not POSTGRES_URL:
+            pytest.skip("set POSTGRES_URL to a scratch PostgreSQL database to run the PostgreSQL backend")
+        pytest.importorskip("asyncpg")
+        _drop_postgres_tables(POSTGRES_URL)
+        backend = Backend("postgres", POSTGRES_URL)
+    backend.open()
+    yield backend
+    backend.close()
+
+
+class StubLLM:
+    """Stands in for LLMClient: answers "answer <n>" for the n-th call, or raises `error` if set"""
+
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+
+    async def complete(self, messages, visitor=""):
+        if self.error is not None:
+            raise self.error
+        self.calls += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"answer {self.calls}"))])
+
+
+class App:
+    """main.app on a scratch SQLite database, with a StubLLM and fresh rate limit buckets"""
+
+    def __init__(self, main, store, llm, monkeypatch):
+        self.main = main
+        self.store = store
+        self.manager = store.manager
+        self.llm = llm
+        self.monkeypatch = monkeypatch
+        self.client = TestClient(main.app)
+
+    def post_batch(self, body: dict):
+        """POST /chat/batch with batches switched on and the token sent"""
+        self.monkeypatch.setattr(self.main.config, "BATCH_TOKEN", "test-batch-token")
+        return self.client.post("/chat/batch", json=body, headers={"Authorization": "Bearer test-batch-token"})
+
+    def set_rate_limits(self, **limits):
+        """Replace the limits, e.g. set_rate_limits(visitor=(60, 2)); scopes left out are not limited"""
+        from ratelimit import RateLimiter
+        self.monkeypatch.setattr(self.main, "rate_limiter", RateLimiter(limits))
+
+
+@pytest.fixture
+def app(request, tmp_path, monkeypatch):
+    """The FastAPI app with its database, LLM client and rate limiter replaced.
+
+    Parametrize indirectly with {"write_behind": True} for a write-behind
+    store whose background flusher stays out of the way.
+    """
+    import database
+    import main
+    from ratelimit import RateLimiter
+
+    options = getattr(request, "param", {})
+    if options.get("write_behind"):
+        # The background flusher would otherwise write the queue before the request does
+        monkeypatch.setattr(database, "WRITE_BEHIND_INTERVAL_MS", 60_000)
+    store = database.AsyncDatabaseManager(
+        database.DatabaseManager(str(tmp_path / "chat.db"), write_behind=options.get("write_behind", False))
+    )
+    llm = StubLLM()
+    monkeypatch.setattr(main, "db_manager", store)
+    monkeypatch.setattr(main, "groq_client", object())
+    monkeypatch.setattr(main, "llm_client", llm)
+    monkeypatch.setattr(main, "rate_limiter", RateLimiter({
+        "visitor": (main.config.RATE_LIMIT_PER_MINUTE, main.config.RATE_LIMIT_BURST),
+        "ip": (main.config.RATE_LIMIT_IP_PER_MINUTE, main.config.RATE_LIMIT_IP_BURST),
+    }))
+    main.response_cache.clear()
+    yield App(main, store, llm, monkeypatch)
+    main.response_cache.clear()
+    asyncio.run(store.close())
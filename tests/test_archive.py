@@ -0,0 +1,66 @@
+"""Which sessions count as inactive when the server's clock isn't on UTC."""
+
+import asyncio
+import time
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def tokyo_time(monkeypatch):
+    """Run with local time 9 hours ahead of SQLite's UTC CURRENT_TIMESTAMP"""
+    monkeypatch.setenv("TZ", "Asia/Tokyo")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = database.DatabaseManager(str(tmp_path / "chat.db"), write_behind=False)
+    yield manager
+    manager.close()
+
+
+def seed_sessions(manager: database.DatabaseManager) -> dict:
+    """Sessions last active 7 days minus 5 hours ago ("recent") and 7 days plus 1 hour ago ("old")"""
+    ages = {"recent": "+5 hours", "old": "-1 hours"}
+    session_ids = {}
+    for name, offset in ages.items():
+        session_ids[name] = manager.create_session("user-1")
+        manager.save_message(session_ids[name], "question", "answer")
+        with manager.connection() as conn:
+            conn.execute(
+                "UPDATE sessions SET last_activity = datetime('now', '-7 days', ?) WHERE id = ?",
+                (offset, session_ids[name]),
+            )
+    return session_ids
+
+
+def test_archive_cutoff_is_utc(tokyo_time, manager):
+    session_ids = seed_sessions(manager)
+    stats = manager.archive_old_sessions(days_old=7, vacuum="off")
+    assert stats["sessions"] == 1
+    with manager.connection() as conn:
+        remaining = [row[0] for row in conn.execute("SELECT id FROM sessions")]
+    assert remaining == [session_ids["recent"]]
+
+
+def test_async_archive_cutoff_is_utc(tokyo_time, manager):
+    session_ids = seed_sessions(manager)
+    store = database.AsyncDatabaseManager(manager)
+    stats = asyncio.run(store.archive_old_sessions(days_old=7, vacuum="off"))
+    assert stats["sessions"] == 1
+    with manager.connection() as conn:
+        assert conn.execute("SELECT id FROM sessions").fetchall() == [(session_ids["recent"],)]
+
+
+def test_cleanup_cutoff_is_utc(tokyo_time, manager):
+    session_ids = seed_sessions(manager)
+    stats = manager.cleanup_old_sessions(days_old=7, vacuum="off")
+    assert stats["sessions"] == 1
+    assert manager.session_exists(session_ids["recent"])
+    assert not manager.session_exists(session_ids["old"])
@@ -0,0 +1,56 @@
+"""POST /chat/batch: fresh answers with use_cache=false, marked cached answers otherwise."""
+
+import json
+
+QUESTIONS = ["What are your Python skills?", "What are your Python skills?", "what are your python skills"]
+
+
+def run_batch(app, **options):
+    body = {"questions": QUESTIONS, "persist": False, "concurrency": 1, **options}
+    response = app.post_batch(body)
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    return sorted(lines[:-1], key=lambda line: line["index"]), lines[-1]["summary"]
+
+
+def test_use_cache_false_calls_the_llm_for_every_question(app):
+    results, summary = run_batch(app, use_cache=False)
+    assert app.llm.calls == 3
+    assert [r["response"] for r in results] == ["answer 1", "answer 2", "answer 3"]
+    assert not any("cached" in r for r in results)
+    assert summary["cached"] == 0
+
+
+def test_cached_answers_are_marked_with_the_matched_question(app):
+    results, summary = run_batch(app)
+    assert app.llm.calls == 1
+    assert [r["response"] for r in results] == ["answer 1"] * 3
+    assert "cached" not in results[0]
+    assert [r["cached_question"] for r in results[1:]] == ["what are your python skills"] * 2
+    assert summary["cached"] == 2
+
+
+def test_batches_are_off_without_a_token(app):
+    assert app.client.post("/chat/batch", json={"questions": ["Hi"]}).status_code == 404
+    assert "/chat/batch" not in app.client.get("/api").json()["endpoints"]
+
+
+def test_batches_need_the_token(app, monkeypatch):
+    monkeypatch.setattr(app.main.config, "BATCH_TOKEN", "test-batch-token")
+    for headers in ({}, {"Authorization": "Bearer wrong"}):
+        assert app.client.post("/chat/batch", json={"questions": ["Hi"]}, headers=headers).status_code == 401
+    assert app.llm.calls == 0
+
+
+def test_every_question_is_charged_to_the_rate_limits(app):
+    app.set_rate_limits(visitor=(60, 5))
+    body = {"questions": [f"Question {i}?" for i in range(6)], "persist": False, "user_id": "user-1"}
+    response = app.post_batch(body)
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    assert app.llm.calls == 0
+
+    body["questions"] = body["questions"][:5]
+    assert app.post_batch(body).status_code == 200
+    assert app.llm.calls == 5
+    # The batch used up the visitor's burst
+    assert app.client.post("/chat", json={"message": "Hi", "user_id": "user-1"}).status_code == 429
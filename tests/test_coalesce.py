@@ -0,0 +1,87 @@
+"""ReplyCoalescer: shared replies, and cancelling the producer once nobody follows it."""
+
+import asyncio
+
+import pytest
+
+from coalesce import ReplyCoalescer
+
+
+def test_followers_share_one_call():
+    async def scenario():
+        coalescer = ReplyCoalescer()
+        calls = []
+
+        async def produce(reply):
+            calls.append(1)
+            reply.start()
+            await asyncio.sleep(0)
+            reply.append("shared answer")
+
+        first, shared_first = coalescer.join("q", produce)
+        second, shared_second = coalescer.join("q", produce)
+        texts = await asyncio.gather(first.text(), second.text())
+        return coalescer, calls, (shared_first, shared_second), texts
+
+    coalescer, calls, shared, texts = asyncio.run(scenario())
+    assert calls == [1]
+    assert shared == (False, True)
+    assert texts == ["shared answer", "shared answer"]
+    assert coalescer.stats() == {"in_flight": 0, "calls": 1, "shared": 1, "abandoned": 0}
+
+
+def test_producer_is_cancelled_when_the_last_follower_leaves():
+    async def scenario():
+        coalescer = ReplyCoalescer()
+        upstream_closed = asyncio.Event()
+
+        async def produce(reply):
+            reply.start()
+            try:
+                await asyncio.sleep(60)
+            finally:
+                upstream_closed.set()
+
+        first, _ = coalescer.join("q", produce)
+        second, _ = coalescer.join("q", produce)
+        await first.wait_started()
+
+        await first.close()
+        await asyncio.sleep(0)
+        assert not upstream_closed.is_set()
+
+        await second.close()
+        # A request arriving now starts a fresh call instead of joining the cancelled one
+        fresh, shared = coalescer.join("q", produce)
+        await asyncio.wait_for(upstream_closed.wait(), 1)
+        await fresh.close()
+        await coalescer.close()
+        return coalescer, second, shared
+
+    coalescer, abandoned, shared = asyncio.run(scenario())
+    assert shared is False
+    assert abandoned.finished and isinstance(abandoned.error, asyncio.CancelledError)
+    assert coalescer.stats()["abandoned"] == 2
+    assert coalescer.stats()["in_flight"] == 0
+
+
+def test_cancelled_text_reader_releases_the_producer():
+    async def scenario():
+        coalescer = ReplyCoalescer()
+
+        async def produce(reply):
+            reply.start()
+            await asyncio.sleep(60)
+
+        reply, _ = coalescer.join("q", produce)
+        reader = asyncio.create_task(reply.text())
+        await reply.wait_started()
+        reader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await reader
+        await asyncio.sleep(0)
+        return coalescer, reply
+
+    coalescer, reply = asyncio.run(scenario())
+    assert reply.finished
+    assert coalescer.stats()["abandoned"] == 1
@@ -0,0 +1,57 @@
+"""While no model can answer: close-enough cached answers, otherwise an explicit 503."""
+
+import json
+
+import pytest
+
+from llm import LLMUnavailableError
+from prompts import prompt_builder
+
+CACHED = {
+    "What are your Python skills?": "Python, FastAPI and SQLite.",
+    "Where did you work before?": "At a data consultancy.",
+    "What databases have you used?": "SQLite and PostgreSQL.",
+    "Do you know JavaScript?": "Enough for the chat widget.",
+}
+
+
+@pytest.fixture
+def client(app, monkeypatch):
+    app.llm.error = LLMUnavailableError("Circuit breakers are open for every model")
+    monkeypatch.setattr(app.main.config, "COALESCE_FIRST_TURN", False)
+    # Misses the response cache's lookup at 0.8, so only the degraded path can serve them
+    monkeypatch.setattr(app.main.response_cache, "similarity", 0.99)
+    for question, answer in CACHED.items():
+        app.main.response_cache.set(question, prompt_builder.version, answer)
+    return app.client
+
+
+def test_serves_a_cached_answer_to_a_rewording(client):
+    # TF-IDF similarity ~0.82 to "What are your Python skills?"
+    response = client.post("/chat", json={"message": "What Python skills do you have?"})
+    assert response.status_code == 200
+    assert response.json()["response"] == "Python, FastAPI and SQLite."
+
+
+def test_a_merely_related_question_gets_the_unavailable_error(client):
+    # Similarity ~0.72: the Python-only answer would not answer it
+    response = client.post("/chat", json={"message": "What are your Python and Go skills?"})
+    assert response.status_code == 503
+    assert response.json()["detail"] == "The assistant is temporarily unavailable. Please try again shortly."
+    assert "Retry-After" in response.headers
+
+
+def test_batch_lines_carry_the_unavailable_message(client, app):
+    response = app.post_batch({"questions": ["What are your Python and Go skills?"], "persist": False})
+    first = json.loads(response.text.splitlines()[0])
+    assert first["error"] == "The assistant is temporarily unavailable. Please try again shortly."
+
+
+def test_disabled_degraded_answers_skip_the_cache_lookup(client, app, monkeypatch):
+    monkeypatch.setattr(app.main.config, "DEGRADED_SIMILARITY", 0.0)
+    lookups = app.main.response_cache.lookups
+    # A rewording the degraded path would otherwise serve (~0.82)
+    response = client.post("/chat", json={"message": "What Python skills do you have?"})
+    assert response.status_code == 503
+    # Only the regular first-turn lookup; the degraded path doesn't look again
+    assert app.main.response_cache.lookups == lookups + 1
@@ -0,0 +1,55 @@
+"""Paging GET /sessions/{id}/history, including rows still queued by write-behind."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+write_behind = pytest.mark.parametrize("app", [{"write_behind": True}], ids=["write_behind"], indirect=True)
+
+
+def read_all_pages(client: TestClient, session_id: str, limit: int):
+    pages, before_id = [], None
+    while True:
+        params = {"limit": limit} if before_id is None else {"limit": limit, "before_id": before_id}
+        body = client.get(f"/sessions/{session_id}/history", params=params).json()
+        pages.append([m["content"] for m in body["messages"] if m["role"] == "user"])
+        before_id = body["next_before_id"]
+        if before_id is None or len(pages) > 10:
+            return pages
+
+
+@write_behind
+def test_newest_page_of_queued_rows_still_pages_back(app):
+    manager = app.manager
+    session_id = manager.create_session("user-1")
+    manager.save_message(session_id, "q0", "a0")
+    manager.flush()
+    for i in range(1, 4):
+        manager.save_message(session_id, f"q{i}", f"a{i}")
+    assert len(manager._pending) == 3
+
+    pages = read_all_pages(app.client, session_id, limit=2)
+    assert pages == [["q2", "q3"], ["q0", "q1"]]
+
+
+@write_behind
+def test_cursor_survives_a_page_queued_after_the_flush(app, monkeypatch):
+    manager = app.manager
+    session_id = manager.create_session("user-1")
+    for i in range(3):
+        manager.save_message(session_id, f"q{i}", f"a{i}")
+    manager.flush()
+
+    # A message queued between the flush and the read fills the newest page
+    async def flush_then_queue():
+        manager.flush()
+        manager.save_message(session_id, "q3", "a3")
+        return 0
+    monkeypatch.setattr(app.store, "flush", flush_then_queue)
+
+    client = app.client
+    first = client.get(f"/sessions/{session_id}/history", params={"limit": 1}).json()
+    assert [m["content"] for m in first["messages"]] == ["q3", "a3"]
+    assert first["messages"][0]["id"] is None
+    second = client.get(f"/sessions/{session_id}/history",
+                        params={"limit": 2, "before_id": first["next_before_id"]}).json()
+    assert [m["content"] for m in second["messages"] if m["role"] == "user"] == ["q1", "q2"]
@@ -0,0 +1,32 @@
+"""Per-IP rate limiting behind a proxy, with client-written X-Forwarded-For entries."""
+
+import pytest
+
+
+@pytest.fixture
+def behind_proxy(app, monkeypatch):
+    monkeypatch.setattr(app.main.config, "TRUSTED_PROXY_HOPS", 1)
+    app.set_rate_limits(visitor=(60, 5), ip=(60, 2))
+    return app
+
+
+def chat(app, user_id: str, forwarded_for: str):
+    return app.client.post("/chat", json={"message": "Hi", "user_id": user_id},
+                           headers={"X-Forwarded-For": forwarded_for})
+
+
+def test_spoofed_forwarded_for_is_still_limited(behind_proxy):
+    # A fresh user_id and a made-up leftmost address each time; the proxy appends the real one
+    statuses = [chat(behind_proxy, f"user-{i}", f"6.6.6.{i}, 203.0.113.7").status_code for i in range(3)]
+    assert statuses == [200, 200, 429]
+
+
+def test_clients_behind_the_proxy_get_their_own_buckets(behind_proxy):
+    statuses = [chat(behind_proxy, f"user-{i}", f"203.0.113.{i}").status_code for i in range(4)]
+    assert statuses == [200] * 4
+
+
+def test_without_trusted_proxies_the_header_is_ignored(app):
+    app.set_rate_limits(ip=(60, 2))
+    statuses = [chat(app, f"user-{i}", f"203.0.113.{i}").status_code for i in range(3)]
+    assert statuses == [200, 200, 429]
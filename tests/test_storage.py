@@ -0,0 +1,225 @@
+"""
+Contract tests every ChatStore backend must pass.
+
+Run against SQLite always, and against PostgreSQL when POSTGRES_URL (or a
+postgresql:// DATABASE_URL) points at a scratch database:
+
+    python -m pytest tests
+    POSTGRES_URL=postgresql://localhost/myagent_test python -m pytest tests
+"""
+
+import re
+import sqlite3
+
+import database
+import postgres_store
+from storage import create_store
+
+TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+
+
+def save_exchanges(backend, session_id: str, count: int, prefix: str = "q"):
+    for i in range(count):
+        backend.run(backend.store.save_message(session_id, f"{prefix}{i}", f"answer {prefix}{i}", "v1"))
+
+
+def contents(messages):
+    return [message["content"] for message in messages]
+
+
+# Sessions
+
+def test_create_and_ensure_session(backend):
+    store = backend.store
+    session_id = backend.run(store.create_session("user-1", "First"))
+    assert backend.run(store.session_exists(session_id))
+    assert backend.run(store.ensure_session(session_id, "user-1")) == session_id
+
+    unknown = backend.run(store.ensure_session("no-such-session", "user-1"))
+    assert unknown != "no-such-session"
+    assert backend.run(store.session_exists(unknown))
+    assert not backend.run(store.session_exists("no-such-session"))
+    assert backend.run(store.ensure_session(None, "user-1")) not in (session_id, unknown)
+
+
+def test_user_sessions_newest_first_with_counts(backend):
+    store = backend.store
+    older = backend.run(store.create_session("user-1", "Older"))
+    newer = backend.run(store.create_session("user-1", "Newer"))
+    backend.run(store.create_session("user-2"))
+    save_exchanges(backend, older, 3)
+    save_exchanges(backend, newer, 1)
+    backend.age_session(older, 2)
+
+    sessions = backend.run(store.get_user_sessions("user-1", limit=5))
+    assert [s["id"] for s in sessions] == [newer, older]
+    assert [s["title"] for s in sessions] == ["Newer", "Older"]
+    assert [s["message_count"] for s in sessions] == [1, 3]
+    assert all(TIMESTAMP.match(s["last_activity"]) for s in sessions)
+    assert [s["id"] for s in backend.run(store.get_user_sessions("user-1", limit=1))] == [newer]
+
+
+# Messages
+
+def test_history_is_chronological_with_roles_and_versions(backend):
+    store = backend.store
+    session_id = backend.run(store.create_session("user-1"))
+    save_exchanges(backend, session_id, 2)
+
+    messages = backend.run(store.get_session_history(session_id))
+    assert contents(messages) == ["q0", "answer q0", "q1", "answer q1"]
+    assert [m["role"] for m in messages] == ["user", "assistant"] * 2
+    assert messages[1]["prompt_version"] == "v1"
+    assert messages[0]["id"] == messages[1]["id"] < messages[2]["id"]
+    assert all(TIMESTAMP.match(m["timestamp"]) for m in messages)
+    assert backend.run(store.get_session_history(backend.run(store.create_session("user-1")))) == []
+
+
+def test_conversation_context_and_messages_after(backend):
+    store = backend.store
+    session_id = backend.run(store.create_session("user-1"))
+    save_exchanges(backend, session_id, 3)
+
+    context = backend.run(store.get_conversation_context(session_id, max_messages=4))
+    assert context == [
+        {"role": "user", "content": "q1"}, {"role": "assistant", "content": "answer q1"},
+        {"role": "user", "content": "q2"}, {"role": "assistant", "content": "answer q2"},
+    ]
+
+    first_id = backend.run(store.get_session_history(session_id))[0]["id"]
+    after = backend.run(store.get_messages_after(session_id, first_id, limit=1))
+    assert [(row["user_message"], row["bot_response"]) for row in after] == [("q1", "answer q1")]
+
+
+def test_summaries(backend):
+    store = backend.store
+    session_id = backend.run(store.create_session("user-1"))
+    assert backend.run(store.get_summary(session_id)) is None
+    backend.run(store.save_summary(session_id, "first summary", 3))
+    backend.run(store.save_summary(session_id, "second summary", 7))
+    assert backend.run(store.get_summary(session_id)) == {"summary": "second summary", "last_message_id": 7}
+
+
+# History paging
+
+def test_history_pages_backwards(backend):
+    store = backend.store
+    session_id = backend.run(store.create_session("user-1"))
+    save_exchanges(backend, session_id, 5)
+
+    latest = backend.run(store.get_session_history(session_id, limit=2))
+    assert contents(latest) == ["q3", "answer q3", "q4", "answer q4"]
+    before = min(m["id"] for m in latest)
+    older = backend.run(store.get_session_history(session_id, before_id=before, limit=2))
+    assert contents(older) == ["q1", "answer q1", "q2", "answer q2"]
+    oldest = backend.run(store.get_session_history(session_id, before_id=min(m["id"] for m in older), limit=2))
+    assert contents(oldest) == ["q0", "answer q0"]
+    assert backend.run(store.get_session_history(session_id, before_id=min(m["id"] for m in oldest), limit=2)) == []
+
+
+def test_iter_history_streams_every_message_in_batches(backend):
+    store = backend.store
+    session_id = backend.run(store.create_session("user-1"))
+    save_exchanges(backend, session_id, 5)
+
+    async def collect():
+        return [message async for message in store.iter_session_history(session_id, batch_size=2)]
+
+    streamed = backend.run(collect())
+    assert streamed == backend.run(store.get_session_history(session_id))
+    assert len(streamed) == 10
+
+
+# Cleanup
+
+def test_cleanup_deletes_only_expired_sessions(backend):
+    store = backend.store
+    expired = backend.run(store.create_session("user-1"))
+    live = backend.run(store.create_session("user-1"))
+    save_exchanges(backend, expired, 3)
+    save_exchanges(backend, live, 2)
+    backend.run(store.save_summary(expired, "old summary", 1))
+    backend.age_session(expired, 40)
+
+    stats = backend.run(store.cleanup_old_sessions(30, "off"))
+    assert (stats["sessions"], stats["messages"], stats["summaries"]) == (1, 3, 1)
+    assert not backend.run(store.session_exists(expired))
+    assert backend.run(store.get_session_history(expired)) == []
+    assert backend.run(store.get_summary(expired)) is None
+    assert len(backend.run(store.get_session_history(live))) == 4
+
+    assert backend.run(store.cleanup_old_sessions(30, "off"))["sessions"] == 0
+
+
+def test_scheduled_jobs_are_exclusive_across_stores(backend):
+    """A second store on the same database stands in for another worker"""
+    other = create_store(backend.url)
+    backend.run(other.open())
+
+    async def scenario():
+        async with backend.store.exclusive_job("cleanup") as acquired:
+            async with other.exclusive_job("cleanup") as blocked:
+                async with other.exclusive_job("archive") as unrelated:
+                    held = (acquired, blocked, unrelated)
+        async with other.exclusive_job("cleanup") as released:
+            return held, released
+
+    try:
+        assert backend.run(scenario()) == ((True, False, True), True)
+    finally:
+        backend.run(other.close())
+
+
+# Resume versions
+
+def test_resume_versions(backend):
+    store = backend.store
+    assert backend.run(store.get_resume()) is None
+    assert backend.run(store.get_resume_version()) is None
+
+    first = backend.run(store.save_resume("resume v1"))
+    second = backend.run(store.save_resume("resume v2"))
+    assert second > first
+    assert backend.run(store.get_resume_version()) == second
+    assert backend.run(store.get_resume()) == {"version": second, "content": "resume v2"}
+
+
+# Migrations
+
+def test_migrations_apply_once_and_keep_data(backend):
+    migrations = database.MIGRATIONS if backend.name == "sqlite" else postgres_store.MIGRATIONS
+    assert backend.schema_version() == len(migrations)
+
+    session_id = backend.run(backend.store.create_session("user-1"))
+    save_exchanges(backend, session_id, 2)
+    backend.run(backend.store.save_resume("resume v1"))
+
+    store = backend.reopen()
+    assert backend.schema_version() == len(migrations)
+    assert len(backend.run(store.get_session_history(session_id))) == 4
+    assert backend.run(store.get_resume())["content"] == "resume v1"
+
+
+def test_sqlite_upgrade_from_first_schema(tmp_path):
+    """A database created by the first release upgrades in place, backfilling message counts"""
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    database._migration_base_schema(conn.cursor())
+    conn.execute("PRAGMA user_version = 1")
+    conn.execute("INSERT INTO sessions (id, user_id) VALUES ('old-session', 'user-1')")
+    conn.executemany(
+        "INSERT INTO messages (session_id, user_message, bot_response) VALUES ('old-session', ?, ?)",
+        [("q0", "a0"), ("q1", "a1")],
+    )
+    conn.commit()
+    conn.close()
+
+    manager = database.DatabaseManager(path, write_behind=False)
+    try:
+        with manager.connection() as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == len(database.MIGRATIONS)
+        assert manager.get_user_sessions("user-1")[0]["message_count"] == 2
+        assert contents(manager.get_session_history("old-session")) == ["q0", "a0", "q1", "a1"]
+        assert manager.get_session_history("old-session")[1]["prompt_version"] is None
+    finally:
+        manager.close()
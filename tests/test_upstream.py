@@ -0,0 +1,31 @@
+"""UpstreamPool connection counts, and the fallback when httpx's pool can't be read."""
+
+import asyncio
+import math
+
+import main
+from upstream import UpstreamPool
+
+
+def test_counts_an_empty_pool():
+    pool = UpstreamPool("test-key", warm_connections=0, ping_seconds=0)
+    try:
+        assert pool.connections() == {"total": 0, "idle": 0, "active": 0}
+    finally:
+        asyncio.run(pool.close())
+
+
+def test_unreadable_pool_reports_unknown(monkeypatch):
+    pool = UpstreamPool("test-key", warm_connections=0, ping_seconds=0)
+    try:
+        # As if a future httpx moved or renamed its transport internals
+        monkeypatch.setattr(pool.http, "_transport", object())
+        assert pool.connections() == {"total": None, "idle": None, "active": None}
+        assert pool.stats()["connections"]["total"] is None
+
+        monkeypatch.setattr(main, "upstream", pool)
+        assert math.isnan(main.upstream_connection_count("idle"))
+        assert "upstream_idle_connections NaN" in main.REGISTRY.render()
+    finally:
+        monkeypatch.undo()
+        asyncio.run(pool.close())
@@ -0,0 +1,86 @@
+"""Two DatabaseManagers on one file, as two uvicorn workers: caches are checked against the database."""
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def workers(tmp_path):
+    path = str(tmp_path / "chat.db")
+    managers = [database.DatabaseManager(path, write_behind=False) for _ in range(2)]
+    yield managers
+    for manager in managers:
+        manager.close()
+
+
+def age_session(manager: database.DatabaseManager, session_id: str, offset: str):
+    with manager.connection() as conn:
+        conn.execute("UPDATE sessions SET last_activity = datetime('now', ?) WHERE id = ?", (offset, session_id))
+
+
+def test_cached_context_picks_up_another_workers_message(workers):
+    first, second = workers
+    session_id = first.create_session("user-1")
+    first.save_message(session_id, "question 1", "answer 1")
+    assert len(second.get_conversation_context(session_id)) == 2
+
+    first.save_message(session_id, "question 2", "answer 2")
+    context = second.get_conversation_context(session_id)
+    assert [message["content"] for message in context] == ["question 1", "answer 1", "question 2", "answer 2"]
+    assert second.context_cache_stats()["stale"] == 1
+
+
+def test_session_archived_by_another_worker_is_restored(workers):
+    first, second = workers
+    session_id = second.create_session("user-1")
+    second.save_message(session_id, "question 1", "answer 1")
+    age_session(first, session_id, "-8 days")
+    assert first.archive_old_sessions(days_old=7, vacuum="off")["sessions"] == 1
+
+    # The second worker still has the session cached, but continues the archived conversation
+    assert second.ensure_session(session_id, "user-1") == session_id
+    second.save_message(session_id, "question 2", "answer 2")
+    history = first.get_session_history(session_id)
+    assert [message["content"] for message in history if message["role"] == "user"] == ["question 1", "question 2"]
+
+
+def test_no_orphan_messages_for_a_session_another_worker_deleted(workers, tmp_path):
+    first, second = workers
+    second.close()
+    second = database.DatabaseManager(str(tmp_path / "chat.db"), write_behind=True)
+    try:
+        session_id = second.create_session("user-1")
+        second.save_message(session_id, "question 1", "answer 1")
+        second.flush()
+        age_session(first, session_id, "-31 days")
+        second.save_message(session_id, "question 2", "answer 2")
+        assert first.cleanup_old_sessions(days_old=30, vacuum="off")["sessions"] == 1
+
+        assert second.flush() == 0
+        with first.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 0
+        assert second.get_conversation_context(session_id) == []
+    finally:
+        second.close()
+
+
+def test_ensure_session_marks_an_idle_session_active(workers):
+    first, second = workers
+    session_id = first.create_session("user-1")
+    age_session(first, session_id, "-8 days")
+    assert second.ensure_session(session_id, "user-1") == session_id
+    # A scheduled archive in the other worker no longer picks it
+    assert first.archive_old_sessions(days_old=7, vacuum="off")["sessions"] == 0
+
+
+def test_scheduled_jobs_run_in_one_worker_at_a_time(workers):
+    first, second = workers
+    with first.job_lock("archive") as acquired:
+        assert acquired
+        with second.job_lock("archive") as other:
+            assert not other
+        with second.job_lock("cleanup") as other:
+            assert other
+    with second.job_lock("archive") as acquired:
+        assert acquired
@@ -0,0 +1,140 @@
+import asyncio
+import importlib.util
+import logging
+import time
+from typing import Dict, Optional
+
+import httpx
+from groq import AsyncGroq
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# httpx speaks HTTP/2 only with the optional h2 package
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+# Warm-up and keep-alive pings give up after this long
+PING_TIMEOUT = 5.0
+
+
+class UpstreamPool:
+    """The Groq client and the HTTP connection pool under it, managed with the app's lifespan.
+
+    start() opens `warm_connections` connections with a cheap request (the
+    model list), so the first chats after a deploy don't pay for DNS, TLS
+    and connection setup, then pings every `ping_seconds` while no chat has
+    used the pool, so idle connections aren't dropped by either side.
+    close() closes the pool on shutdown.
+    """
+
+    def __init__(self, api_key: str, max_connections: int = config.UPSTREAM_MAX_CONNECTIONS,
+                 keepalive_seconds: float = config.UPSTREAM_KEEPALIVE_SECONDS,
+                 http2: bool = config.UPSTREAM_HTTP2, warm_connections: int = config.UPSTREAM_WARM_CONNECTIONS,
+                 ping_seconds: float = config.UPSTREAM_PING_SECONDS):
+        self.max_connections = max_connections
+        self.keepalive_seconds = keepalive_seconds
+        self.http2 = http2 and HTTP2_AVAILABLE
+        if http2 and not HTTP2_AVAILABLE:
+            logger.info("UPSTREAM_HTTP2 is on but the h2 package isn't installed; using HTTP/1.1")
+        self.warm_connections = warm_connections
+        self.ping_seconds = ping_seconds
+        self.http = httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_seconds,
+            ),
+            event_hooks={"request": [self._on_request]},
+        )
+        self.client = AsyncGroq(api_key=api_key, max_retries=0, http_client=self.http)
+        self.last_used = time.monotonic()
+        self.warmed = False
+        self.pings = 0
+        self.ping_failures = 0
+        self.last_ping_ms: Optional[float] = None
+        self._ping_task: Optional[asyncio.Task] = None
+        self._pool_unreadable = False
+
+    async def _on_request(self, request: httpx.Request):
+        # Pings don't count as use, or they would keep postponing themselves
+        if not request.url.path.endswith("/models"):
+            self.last_used = time.monotonic()
+
+    async def start(self):
+        if self.warm_connections > 0:
+            start = time.perf_counter()
+            self.warmed = await self.ping(self.warm_connections)
+            if self.warmed:
+                logger.info(
+                    f"Warmed {self.warm_connections} upstream connection(s) in "
+                    f"{(time.perf_counter() - start) * 1000:.0f} ms"
+                )
+        if self.ping_seconds > 0:
+            self._ping_task = asyncio.create_task(self._ping_loop())
+
+    async def ping(self, connections: int = 1) -> bool:
+        """Send `connections` concurrent model list requests, each on its own connection (HTTP/1.1)"""
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(self.client.models.list(timeout=PING_TIMEOUT) for _ in range(connections)),
+            return_exceptions=True,
+        )
+        self.pings += 1
+        self.last_ping_ms = (time.perf_counter() - start) * 1000
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            self.ping_failures += 1
+            logger.warning(f"Upstream ping failed: {str(errors[0]) or type(errors[0]).__name__}")
+        return not errors
+
+    async def _ping_loop(self):
+        while True:
+            await asyncio.sleep(self.ping_seconds)
+            if time.monotonic() - self.last_used >= self.ping_seconds:
+                await self.ping(max(1, self.warm_connections))
+
+    def connections(self) -> Dict[str, Optional[int]]:
+        """Open connections in the pool by state and protocol.
+
+        httpx doesn't expose its pool, so this reads httpcore's (tested with
+        httpx 0.28 / httpcore 1.0, pinned in requirements.txt); if that ever
+        fails, the counts are None: unknown rather than zero.
+        """
+        try:
+            pool = self.http._transport._pool
+            counts = {"total": 0, "idle": 0, "active": 0}
+            for connection in list(pool.connections):
+                counts["total"] += 1
+                counts["idle" if connection.is_idle() else "active"] += 1
+                # e.g. "'https://api.groq.com:443', HTTP/1.1, IDLE, Request Count: 3"
+                protocol = next((part.strip() for part in connection.info().split(",") if "HTTP/" in part), None)
+                if protocol is not None:
+                    counts[protocol] = counts.get(protocol, 0) + 1
+            return counts
+        except Exception as e:
+            if not self._pool_unreadable:
+                self._pool_unreadable = True
+                logger.warning(f"Can't read upstream pool connections (httpx internals changed?): {str(e)}")
+            return {"total": None, "idle": None, "active": None}
+
+    def stats(self) -> Dict:
+        """Pool settings and state, for health checks"""
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "keepalive_seconds": self.keepalive_seconds,
+            "connections": self.connections(),
+            "warmed": self.warmed,
+            "pings": self.pings,
+            "ping_failures": self.ping_failures,
+            "last_ping_ms": round(self.last_ping_ms, 1) if self.last_ping_ms is not None else None,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+        }
+
+    async def close(self):
+        """Stop pinging and close every pooled connection (call on shutdown)"""
+        if self._ping_task is not None:
+            self._ping_task.cancel()
+            await asyncio.gather(self._ping_task, return_exceptions=True)
+        await self.http.aclose()